@@ -7,13 +7,16 @@ from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical, VerticalScroll
 from textual.widgets import (
     Header, Footer, TabbedContent, TabPane, TextArea, Label, 
-    Static, Log, Collapsible, SelectionList, Select, MarkdownViewer, Button
+    Static, Log, Collapsible, SelectionList, Select, MarkdownViewer, Button, Input
 )
 from textual.binding import Binding
+from textual.screen import ModalScreen
 from textual.reactive import reactive
 from textual.message import Message
 from textual import events, on
-from typing import Any, Optional
+from typing import Any, List, Optional
+import re
+import time
 import asyncio
 import logging
 from copykitten import copy as clipboard_copy
@@ -23,9 +26,23 @@ from kestrabot.openai_bot import (
     KestraBotOpenAIClient,
     KestraBotFlowResponse
 )
+from kestrabot.decompose import generate_decomposed_flow, KestraBotDecomposedFlowResponse
+from kestrabot.plugin_catalog import get_plugin_catalog
+from kestrabot.deploy import deploy_flows, KestraDeploySummary
+from kestrabot.sessions import BuildSession, BuildSupervisor, PendingPatch, RefinementChain, SpeculativeBuild
+from kestrabot.templates import render_template_flow
+from kestrabot.artifacts import fetch_execution_artifacts
+from kestrabot.janitor import run_janitor
+from kestrabot.schema_infer import infer_schemas, format_schema_metadata, merge_schema_metadata
+from kestrabot.validation import get_validation_service
+from kestrabot.search_policy import get_search_policy
 from kestrabot.settings import settings, _MODELS_
 
 
+_PROMPT_PLACEHOLDER_ = "Enter your prompt here."
+_FLOW_PLACEHOLDER_ = "- wait_for_it: Generated Kestra Flow YAML will appear here..."
+
+
 class TextualLogHandler(logging.Handler):
     """Custom logging handler that writes to a Textual Log widget."""
     
@@ -86,7 +103,7 @@ class PromptTab(TabPane):
         super().__init__(title, id=id)
     
     def compose(self) -> ComposeResult:
-        text = "Enter your prompt here."
+        text = _PROMPT_PLACEHOLDER_
         # Create a TextArea for user input
         textarea = TextArea.code_editor(
             text,
@@ -117,9 +134,17 @@ class MetadataTab(TabPane):
 
 class KestraFlowTab(TabPane):
     """Tab for Kestra Flow YAML display/editing."""
+
+    BINDINGS = [
+        Binding("ctrl+t", "complete_type", "Complete Type"),
+    ]
+
+    # Matches a `type:` value being typed up to the cursor
+    TYPE_PATTERN = re.compile(r"^\s*(?:-\s+)?type:\s*([\w.]*)$")
     
     def __init__(self, title: str, id: str | None = None):
         super().__init__(title, id=id)
+        self.completions: list[str] = []
     
     def compose(self) -> ComposeResult:
         textarea = TextArea(
@@ -130,12 +155,39 @@ class KestraFlowTab(TabPane):
             tab_behavior="indent",
         )
         textarea.indent_type = "spaces"
-        textarea.text = "- wait_for_it: Generated Kestra Flow YAML will appear here..."
+        textarea.text = _FLOW_PLACEHOLDER_
         yield textarea
 
+        yield Label("", id="flow-completions")
+        yield Label("", id="flow-validation", markup=False)
+
         button = Button("Copy", id="copy-flow-btn", variant="primary", compact=True)
         yield button
 
+    @on(TextArea.SelectionChanged, "#flow-textarea")
+    def on_flow_cursor_moved(self, event: TextArea.SelectionChanged) -> None:
+        """Update plugin type completions for the `type:` value under the cursor."""
+        self.completions = []
+        catalog = get_plugin_catalog()
+        textarea = event.text_area
+        if catalog is not None:
+            row, column = textarea.cursor_location
+            match = self.TYPE_PATTERN.match(textarea.document.get_line(row)[:column])
+            if match and match.group(1):
+                self.completions = catalog.complete(match.group(1), limit=5)
+        label = self.query_one("#flow-completions", Label)
+        label.update(("Ctrl+T: " + " | ".join(self.completions)) if self.completions else "")
+
+    def action_complete_type(self) -> None:
+        """Complete the `type:` value under the cursor with the first catalog match."""
+        if not self.completions:
+            return
+        textarea = self.query_one("#flow-textarea", TextArea)
+        row, column = textarea.cursor_location
+        match = self.TYPE_PATTERN.match(textarea.document.get_line(row)[:column])
+        if match:
+            textarea.insert(self.completions[0][len(match.group(1)):])
+
     @on(Button.Pressed)
     def on_copy_flow_pressed(self, event: Button.Pressed) -> None:
         """Handle copy flow button press."""
@@ -152,11 +204,72 @@ class KestraFlowTab(TabPane):
         
 
 
+class FlowDiffScreen(ModalScreen[bool]):
+    """Modal screen showing a flow patch diff for acceptance."""
+
+    BINDINGS = [
+        Binding("escape", "dismiss(False)", "Reject"),
+    ]
+
+    def __init__(self, summary: str, diff: str):
+        super().__init__()
+        self.summary = summary
+        self.diff = diff
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="flow-diff-dialog"):
+            yield Label(f"Proposed change: {self.summary}", classes="label")
+            textarea = TextArea(
+                self.diff or "No changes.",
+                id="flow-diff-textarea",
+                read_only=True,
+                show_line_numbers=False,
+                theme="dracula",
+            )
+            yield textarea
+            with Horizontal(id="flow-diff-buttons"):
+                yield Button("Accept", id="accept-diff-btn", variant="success", compact=True)
+                yield Button("Reject", id="reject-diff-btn", variant="error", compact=True)
+
+    @on(Button.Pressed)
+    def on_diff_button_pressed(self, event: Button.Pressed) -> None:
+        """Handle accept/reject button press."""
+        self.dismiss(event.button.id == "accept-diff-btn")
+
+
+class ExecutionIdScreen(ModalScreen[str]):
+    """Modal screen asking for the id of the execution to fetch outputs from."""
+
+    BINDINGS = [
+        Binding("escape", "dismiss('')", "Cancel"),
+    ]
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="execution-id-dialog"):
+            yield Label("Fetch the output files of execution:", classes="label")
+            yield Input(placeholder="Execution id", id="execution-id-input")
+
+    @on(Input.Submitted, "#execution-id-input")
+    def on_execution_id_submitted(self, event: Input.Submitted) -> None:
+        """Return the entered execution id."""
+        self.dismiss(event.value.strip())
+
+
+class ExecutionHistoryEntry(Collapsible):
+    """Execution history section, keeping the flow generated by the entry, if any."""
+
+    def __init__(self, *children, flow: Optional[str] = None, **kwargs):
+        super().__init__(*children, **kwargs)
+        self.flow = flow
+
+
 class ExecutionLogsTab(TabPane):
     """Tab for execution logs and console output."""
     
     def __init__(self, title: str, id: str | None = None):
         super().__init__(title, id=id)
+        # Last expanded history entry with a flow, deployed by Add to Kestra from this tab
+        self.selected_entry: Optional[ExecutionHistoryEntry] = None
     
     def compose(self) -> ComposeResult:
         with Horizontal():
@@ -171,15 +284,26 @@ class ExecutionLogsTab(TabPane):
                 yield Label("Console Logs", classes="label")
                 yield Log(id="console-log", max_lines=500, highlight=True, auto_scroll=True)
     
-    def add_execution_log(self, execution_id: str, content: str) -> None:
+    def add_execution_log(self, execution_id: str, content: str, flow: Optional[str] = None) -> None:
         """Add a new collapsible execution log section."""
         container = self.query_one("#execution-history-scroll", VerticalScroll)
-        collapsible = Collapsible(
+        collapsible = ExecutionHistoryEntry(
             Label(content, classes="execution-content"),
             title=f"Execution {execution_id}",
-            collapsed=True
+            collapsed=True,
+            flow=flow,
         )
         container.mount(collapsible)
+
+    @on(Collapsible.Expanded)
+    def on_history_entry_expanded(self, event: Collapsible.Expanded) -> None:
+        if isinstance(event.collapsible, ExecutionHistoryEntry) and event.collapsible.flow:
+            self.selected_entry = event.collapsible
+
+    @on(Collapsible.Collapsed)
+    def on_history_entry_collapsed(self, event: Collapsible.Collapsed) -> None:
+        if event.collapsible is self.selected_entry:
+            self.selected_entry = None
     
     def add_console_log(self, message: str) -> None:
         """Add a message to the console log."""
@@ -246,6 +370,15 @@ class KestraBotApp(App):
         text-overflow: ellipsis; 
     }
 
+    #session-bar {
+        height: auto;
+        padding: 0 2;
+    }
+
+    #session-select {
+        width: 50;
+    }
+
     #main-tabs {
         height: 90%;
         padding: 1 2;
@@ -263,6 +396,42 @@ class KestraBotApp(App):
         padding: 1 1;
     }
 
+    #flow-validation {
+        padding: 0 1;
+        text-wrap: wrap;
+    }
+
+    #flow-validation.-invalid {
+        color: $error;
+    }
+
+    FlowDiffScreen {
+        align: center middle;
+    }
+
+    #flow-diff-dialog {
+        width: 90%;
+        height: 80%;
+        border: thick $primary;
+        background: $surface;
+    }
+
+    ExecutionIdScreen {
+        align: center middle;
+    }
+
+    #execution-id-dialog {
+        width: 60;
+        height: auto;
+        border: thick $primary;
+        background: $surface;
+    }
+
+    #flow-diff-buttons {
+        height: auto;
+        padding: 0 1;
+    }
+
     .label {
         padding: 1 1;
         text-style: bold;
@@ -277,18 +446,44 @@ class KestraBotApp(App):
         Binding("4", "switch_tab('logs')", "Logs"),
         Binding("5", "switch_tab('settings')", "Settings"),
         Binding("ctrl+b", "build_flow", "Build Flow"),
+        Binding("ctrl+r", "modify_flow", "Modify Flow"),
+        Binding("ctrl+f", "refine_flow", "Refine Flow"),
+        Binding("ctrl+d", "build_flow_decomposed", "Decomposed Build"),
         Binding("ctrl+a", "add_to_kestra", "Add to Kestra"),
         Binding("ctrl+e", "execute_flow", "Execute Flow"),
+        Binding("ctrl+n", "new_session", "New Session"),
+        Binding("ctrl+k", "cancel_build", "Cancel Build"),
+        Binding("ctrl+g", "infer_metadata", "Infer Schemas"),
+        Binding("ctrl+o", "fetch_outputs", "Fetch Outputs"),
     ]
     
     def __init__(self):
         super().__init__()
         self.title = "Kestra Bot Demo"
         self.sub_title = "An OpenAI agent for building Kestra ETL Flows"
+        self.supervisor = BuildSupervisor(
+            max_concurrent=settings.max_concurrent_builds,
+            on_change=lambda session: self.refresh_sessions(),
+        )
+        self.sessions: list[BuildSession] = [BuildSession("session-1")]
+        self.active_session: BuildSession = self.sessions[0]
+        self.speculative: Optional[SpeculativeBuild] = None
+        self._speculative_timer = None
+        self._janitor_task: Optional[asyncio.Task] = None
+        self._validation_timer = None
     
     def compose(self) -> ComposeResult:
         """Compose the application layout."""
         yield KestraBotHeader()
+
+        with Horizontal(id="session-bar"):
+            yield Label("Session", classes="label")
+            yield Select(
+                [(session.label, session.name) for session in self.sessions],
+                value=self.active_session.name,
+                allow_blank=False,
+                id="session-select",
+            )
         
         with TabbedContent(initial="prompt", id="main-tabs"):
             yield PromptTab("Prompt", id="prompt")
@@ -317,10 +512,235 @@ class KestraBotApp(App):
         root_logger.setLevel(settings.get_logging_level())
         logging.info("Kestra Bot Demo application started")
 
+        # Load the plugin catalog used for validation and type completion
+        get_plugin_catalog()
+
+        # Initialize the first session from the editors
+        self.save_session()
+        # Refresh session progress while builds are running
+        self.set_interval(1.0, lambda: self.refresh_sessions() if any(s.busy for s in self.sessions) else None)
+
+        # Create the OpenAI client and open its connection in the background
+        self.supervisor.track(asyncio.to_thread(self._warm_up_client), name="warm-up")
+
+        # Apply the workspace retention policies periodically
+        if settings.janitor_interval > 0:
+            self.set_interval(settings.janitor_interval * 60, self.start_janitor)
+
         # Set initial status
         status_bar = self.query_one(StatusBar)
-        asyncio.create_task(status_bar.update_status("Application started"))
+        self.supervisor.track(status_bar.update_status("Application started"))
+
+    def _warm_up_client(self) -> None:
+        """Create the OpenAI client and pre-warm its connection pool."""
+        try:
+            get_kestrabot_client().warm_up()
+        except Exception as e:
+            logging.warning(f"Could not initialize OpenAI client: {str(e)}")
+
+    async def on_unmount(self) -> None:
+        """Cancel and clean up background tasks when the app exits."""
+        await self.supervisor.shutdown()
+
+    def save_session(self) -> None:
+        """Save the editor contents into the active session."""
+        session = self.active_session
+        session.prompt = self.query_one("#prompt-textarea", TextArea).text
+        session.metadata = self.query_one("#metadata-textarea", TextArea).text
+        session.flow = self.query_one("#flow-textarea", TextArea).text
+
+    def load_session(self, session: BuildSession) -> None:
+        """Make a session active and load its contents into the editors."""
+        self.save_session()
+        self.cancel_speculative()
+        self.active_session = session
+        self.query_one("#prompt-textarea", TextArea).text = session.prompt
+        self.query_one("#metadata-textarea", TextArea).text = session.metadata
+        self.query_one("#flow-textarea", TextArea).text = session.flow
+        self.refresh_sessions()
+        # Patches finished in the background are reviewed once their session is shown
+        if session.pending_patch is not None:
+            self.supervisor.track(self.review_patch(session), name=f"review:{session.name}")
+
+    def refresh_sessions(self) -> None:
+        """Refresh the session list labels with each session's progress."""
+        try:
+            select = self.query_one("#session-select", Select)
+        except Exception:
+            # Session list not yet mounted, ignore
+            return
+        with select.prevent(Select.Changed):
+            select.set_options([(session.label, session.name) for session in self.sessions])
+            select.value = self.active_session.name
+
+    def set_session_flow(self, session: BuildSession, flow: str) -> None:
+        """Store a generated flow in its session, and show it if the session is active."""
+        session.flow = flow
+        if session is self.active_session:
+            self.query_one("#flow-textarea", TextArea).text = flow
 
+    def is_active(self, session: BuildSession) -> bool:
+        """Whether the session is the one shown in the editors."""
+        return session is self.active_session
+
+    @on(TextArea.Changed, "#prompt-textarea, #metadata-textarea")
+    def on_prompt_changed(self, event: TextArea.Changed) -> None:
+        """Restart the speculative build debounce timer on prompt or metadata edits."""
+        if not settings.speculative_build:
+            return
+        prompt_text = self.query_one("#prompt-textarea", TextArea).text
+        metadata_text = self.query_one("#metadata-textarea", TextArea).text
+        # Ignore text loaded into the editors, e.g. when switching sessions
+        if prompt_text == self.active_session.prompt and metadata_text == self.active_session.metadata:
+            return
+        prompt, metadata = prompt_text.strip(), metadata_text.strip()
+        if self.speculative and self.speculative.matches(self.active_session, prompt, metadata):
+            return
+        self.cancel_speculative()
+        self._speculative_timer = self.set_timer(settings.speculative_debounce, self.start_speculative)
+
+    def start_speculative(self) -> None:
+        """Start generating the flow for the idle prompt before the user asks for a build."""
+        self._speculative_timer = None
+        session = self.active_session
+        prompt = self.query_one("#prompt-textarea", TextArea).text.strip()
+        metadata = self.query_one("#metadata-textarea", TextArea).text.strip()
+        if not prompt or prompt == _PROMPT_PLACEHOLDER_ or session.busy:
+            return
+        # Prompts answered by a flow template do not need the model
+        if settings.template_fast_path and render_template_flow(prompt, metadata) is not None:
+            return
+        # Only one speculative build runs at a time; the previous one gives up its inputs
+        self.cancel_speculative()
+        task = self.supervisor.speculate(
+            session, get_kestrabot_client().generate_kestra_flow, user_input=prompt, metadata=metadata
+        )
+        if task is None:
+            logging.info(f"No free build slot, skipping the speculative build for {session.name}")
+            return
+        logging.info(f"Starting speculative build for {session.name}...")
+        self.speculative = SpeculativeBuild(session, prompt, metadata, task)
+
+    def cancel_speculative(self) -> None:
+        """Cancel the pending or running speculative build, if any."""
+        if self._speculative_timer is not None:
+            self._speculative_timer.stop()
+            self._speculative_timer = None
+        if self.speculative is not None:
+            # The request already sent cannot be aborted; its result is discarded
+            if not self.speculative.task.done():
+                self.speculative.task.cancel()
+                logging.info("Speculative build discarded after prompt edit")
+            self.speculative = None
+
+    def adopt_speculative(self, session: BuildSession, prompt: str, metadata: str) -> Optional[asyncio.Task]:
+        """Return the speculative build for these inputs, if one was started."""
+        speculative, self.speculative = self.speculative, None
+        if speculative is not None and speculative.matches(session, prompt, metadata):
+            logging.info(f"Adopting speculative build started {time.time() - speculative.started_at:.1f}s ago")
+            return speculative.task
+        if speculative is not None:
+            speculative.task.cancel()
+        return None
+
+    def backend_log_lines(self, backend: Optional[str]) -> List[str]:
+        """Execution log lines with the backend used and the latency stats of every backend called so far."""
+        # Template answers do not call any backend
+        if not backend:
+            return []
+        stats = get_kestrabot_client().router.stats_summary()
+        return [f"Backend: {backend}", "Backend latency:", *(f"  {line}" for line in stats.splitlines())]
+
+    def search_log_lines(self, response: KestraBotFlowResponse) -> List[str]:
+        """Execution log lines with the web search decision and the search impact so far."""
+        # Template answers do not call any backend
+        if not response.backend:
+            return []
+        return [
+            f"Web search: {'on' if response.web_search else 'off'} ({response.web_search_reason}), {response.web_search_calls} search call(s)",
+            f"Search impact: {get_search_policy().impact_summary()}",
+        ]
+
+    @on(TextArea.Changed, "#flow-textarea")
+    def on_flow_changed(self, event: TextArea.Changed) -> None:
+        """Restart the server-side validation debounce timer on flow edits."""
+        if settings.validation_debounce <= 0:
+            return
+        if self._validation_timer is not None:
+            self._validation_timer.stop()
+        self._validation_timer = self.set_timer(settings.validation_debounce, self.start_validation)
+
+    def start_validation(self) -> None:
+        """Validate the flow shown in the editor with the Kestra server in the background."""
+        self._validation_timer = None
+        source = self.query_one("#flow-textarea", TextArea).text
+        if not source.strip() or source == _FLOW_PLACEHOLDER_:
+            self.query_one("#flow-validation", Label).update("")
+            return
+        self.supervisor.track(self._validate_flow(source), name="validation")
+
+    async def _validate_flow(self, source: str) -> None:
+        label = self.query_one("#flow-validation", Label)
+        try:
+            # Run the blocking validation in a thread
+            result = await asyncio.to_thread(get_validation_service().validate, source)
+            text, invalid = str(result), not result.valid
+        except Exception as e:
+            logging.warning(f"Server-side flow validation unavailable: {str(e)}")
+            text, invalid = f"Server-side validation unavailable: {str(e)}", False
+        # Drop the result if the flow was edited meanwhile
+        if self.query_one("#flow-textarea", TextArea).text == source:
+            label.update(f"Kestra: {text}")
+            label.set_class(invalid, "-invalid")
+
+    def start_janitor(self) -> None:
+        """Clean the workspace directories in the background, unless a previous run is still going."""
+        if self._janitor_task is not None and not self._janitor_task.done():
+            return
+        self._janitor_task = self.supervisor.track(self._run_janitor(), name="janitor")
+
+    async def _run_janitor(self) -> None:
+        try:
+            # Run the blocking scans and deletes in a thread
+            reports = await asyncio.to_thread(run_janitor)
+            if any(report.deleted or report.errors for report in reports):
+                await self.add_execution_log(f"janitor {int(time.time())}", "\n".join(map(str, reports)))
+        except Exception as e:
+            logging.error(f"Janitor failed: {str(e)}")
+
+    @on(Select.Changed, "#session-select")
+    def on_session_selected(self, event: Select.Changed) -> None:
+        """Switch to the selected session."""
+        for session in self.sessions:
+            if session.name == event.value and session is not self.active_session:
+                self.load_session(session)
+                set_status(f"Switched to {session.name}")
+
+    def action_new_session(self) -> None:
+        """Create a new session, sharing the current metadata."""
+        session = BuildSession(
+            f"session-{len(self.sessions) + 1}",
+            prompt=_PROMPT_PLACEHOLDER_,
+            metadata=self.active_session.metadata,
+        )
+        self.sessions.append(session)
+        self.load_session(session)
+        set_status(f"Created {session.name}")
+
+    def action_cancel_build(self) -> None:
+        """Cancel the build of the active session."""
+        if self.active_session.busy:
+            self.supervisor.cancel(self.active_session)
+            set_status(f"Cancelled build of {self.active_session.name}")
+
+    def submit_build(self, coro, description: str = "building") -> Optional[asyncio.Task]:
+        """Run a build coroutine for the active session under the supervisor."""
+        session = self.active_session
+        try:
+            return self.supervisor.submit(session, coro, description)
+        except RuntimeError as e:
+            set_status(f"Error: {str(e)}")
+            return None
     
     async def action_switch_tab(self, tab_id: str) -> None:
         """Switch to a specific tab."""
@@ -333,36 +753,106 @@ class KestraBotApp(App):
     
     async def action_build_flow(self) -> None:
         """Handle Build Flow action."""
-        # Get prompt tab text area content
-        prompt_textarea = self.query_one("#prompt-textarea", TextArea)
-        prompt = prompt_textarea.text.strip()
-        # Get Metadata tab text area content
-        metadata_textarea = self.query_one("#metadata-textarea", TextArea)
-        metadata = metadata_textarea.text.strip()
+        # Save the prompt and metadata of the active session
+        self.save_session()
+        session = self.active_session
+        prompt = session.prompt.strip()
+        metadata = session.metadata.strip()
 
         # set status
-        logging.info("Building Kestra Flow...")
+        logging.info(f"Building Kestra Flow for {session.name}...")
         set_status("Building Kestra Flow...")
 
-        # Call the async method to build the flow
-        asyncio.create_task(self._build_flow(prompt, metadata))
-        
+        # Run the build under the supervisor, reusing a matching speculative build
+        speculative = self.adopt_speculative(session, prompt, metadata)
+        self.submit_build(self._build_flow(session, prompt, metadata, speculative=speculative))
+
+    async def action_build_flow_decomposed(self) -> None:
+        """Handle Decomposed Build action: split the prompt and generate sub-flows in parallel."""
+        self.save_session()
+        session = self.active_session
+        prompt = session.prompt.strip()
+        metadata = session.metadata.strip()
 
+        # set status
+        logging.info(f"Building Kestra Flow with prompt decomposition for {session.name}...")
+        set_status("Building Kestra Flow with prompt decomposition...")
+
+        # Run the build under the supervisor
+        self.submit_build(self._build_flow_decomposed(session, prompt, metadata), "decomposing")
+
+    async def action_modify_flow(self) -> None:
+        """Handle Modify Flow action: patch the current flow using the prompt as a change request."""
+        # The prompt holds the change request, the flow tab holds the flow to modify
+        self.save_session()
+        session = self.active_session
+        change_request = session.prompt.strip()
+        metadata = session.metadata.strip()
+        flow = session.flow
+
+        # set status
+        logging.info(f"Modifying Kestra Flow for {session.name}...")
+        set_status("Modifying Kestra Flow...")
+
+        # Run the modification under the supervisor
+        self.submit_build(self._modify_flow(session, flow, change_request, metadata), "patching")
     
+    async def action_refine_flow(self) -> None:
+        """Handle Refine Flow action: apply the prompt as a follow-up instruction, chained to the previous response."""
+        # The prompt holds the follow-up instruction, the flow tab holds the flow to refine
+        self.save_session()
+        session = self.active_session
+        instruction = session.prompt.strip()
+        metadata = session.metadata.strip()
+        flow = session.flow
+
+        # set status
+        logging.info(f"Refining Kestra Flow for {session.name}...")
+        set_status("Refining Kestra Flow...")
+
+        # Run the refinement under the supervisor
+        self.submit_build(self._refine_flow(session, flow, instruction, metadata), "refining")
+
     async def action_add_to_kestra(self) -> None:
-        """Handle Add to Kestra action."""
-        # Placeholder for add to Kestra functionality
-        status_bar = self.query_one(StatusBar)
-        await status_bar.update_status("Adding flow to Kestra...")
-        
-        # Add console log
+        """Handle Add to Kestra action: deploy the flow(s) in the Kestra Flow tab, or the selected history entry."""
+        flow_textarea = self.query_one("#flow-textarea", TextArea)
+        source = flow_textarea.text
+        # From the Execution Logs tab, deploy the flow of the expanded history entry
         logs_tab = self.query_one("#logs", ExecutionLogsTab)
-        logs_tab.add_console_log("Add to Kestra action triggered")
-        
-        # Simulate some work
-        await asyncio.sleep(1)
-        await status_bar.update_status("Flow added to Kestra")
+        if self.query_one("#main-tabs", TabbedContent).active == "logs" and logs_tab.selected_entry is not None:
+            source = logs_tab.selected_entry.flow
+            logging.info(f"Deploying the flow of history entry '{logs_tab.selected_entry.title}'")
+
+        # set status
+        logging.info("Adding flow to Kestra...")
+        set_status("Adding flow to Kestra...")
+
+        # Call the async method to deploy the flow
+        self.supervisor.track(self._add_to_kestra(source), name="deploy")
     
+    async def action_infer_metadata(self) -> None:
+        """Handle Infer Schemas action: add table schemas inferred from local data files to the metadata."""
+        # set status
+        logging.info(f"Inferring table schemas from {settings.data_dir}...")
+        set_status("Inferring table schemas...")
+
+        # Call the async method to infer the schemas
+        self.supervisor.track(self._infer_metadata(), name="infer-metadata")
+
+    async def action_fetch_outputs(self) -> None:
+        """Handle Fetch Outputs action: download the output files of an execution."""
+        def on_execution_id(execution_id: str | None) -> None:
+            if not execution_id:
+                return
+            # set status
+            logging.info(f"Fetching output files of execution {execution_id}...")
+            set_status(f"Fetching output files of execution {execution_id}...")
+
+            # Call the async method to download the files
+            self.supervisor.track(self._fetch_outputs(execution_id), name=f"fetch:{execution_id}")
+
+        self.push_screen(ExecutionIdScreen(), on_execution_id)
+
     async def action_execute_flow(self) -> None:
         """Handle Execute Flow action."""
         # Placeholder for execute flow functionality
@@ -374,7 +864,6 @@ class KestraBotApp(App):
         logging.debug("This is a debug message for flow execution")
         
         # Add execution log
-        import time
         execution_id = str(int(time.time()))
         logs_tab.add_execution_log(
             execution_id,
@@ -384,46 +873,296 @@ class KestraBotApp(App):
         # Simulate some work
         await self.set_status("Flow execution completed")
 
-    async def _build_flow(self, prompt: str, metadata: Optional[str] = None) -> str:
-        client: KestraBotOpenAIClient = get_kestrabot_client()
+    async def _build_flow(
+        self,
+        session: BuildSession,
+        prompt: str,
+        metadata: Optional[str] = None,
+        speculative: Optional[asyncio.Task] = None,
+    ) -> str:
+        # Common requests are answered locally from a flow template, without the model
+        template_response: Optional[KestraBotFlowResponse] = None
+        if speculative is None and settings.template_fast_path:
+            template_response = render_template_flow(prompt, metadata)
+        # A finished speculative build or a template flow is shown right away
+        ready = template_response is not None or (
+            speculative is not None and speculative.done() and not speculative.cancelled()
+        )
+        path = "template" if template_response is not None else "LLM"
         try:
             # switch to logs tab
-            await asyncio.sleep(0.25)
-            await self.switch_tab("logs")
+            if not ready:
+                await asyncio.sleep(0.25)
+                if self.is_active(session):
+                    await self.switch_tab("logs")
 
-            # Run the blocking generate_kestra_flow in a thread
-            response: KestraBotFlowResponse = await asyncio.to_thread(
-                client.generate_kestra_flow,
-                user_input=prompt,
-                metadata=metadata
-            )
+            response: Optional[KestraBotFlowResponse] = template_response
+            if speculative is not None:
+                try:
+                    response = await speculative
+                    # None when the speculative run found no free slot
+                    if response is not None:
+                        path = "LLM (speculative)"
+                except Exception as e:
+                    logging.warning(f"Speculative build failed, building again: {str(e)}")
+            if response is None:
+                # Run the blocking generate_kestra_flow in a thread
+                client: KestraBotOpenAIClient = get_kestrabot_client()
+                response = await self.supervisor.to_thread(
+                    session,
+                    client.generate_kestra_flow,
+                    user_input=prompt,
+                    metadata=metadata
+                )
             if response.output:
-                flow_textarea = self.query_one("#flow-textarea", TextArea)
-                flow_textarea.text = response.output
+                self.set_session_flow(session, response.output)
+                # Follow-up refinements are chained to the stored response, templates have none
+                session.refinement = None
+                if response.backend and response.id:
+                    session.refinement = RefinementChain(response.id, response.backend, response.output)
 
                 # sleep for a moement
-                await asyncio.sleep(1.0)
+                if not ready:
+                    await asyncio.sleep(1.0)
                 # set status
-                set_status("Flow generated successfully")
+                set_status(f"Flow generated successfully for {session.name}")
                 # add execution log
                 resp_id = str(response.id)
                 exec_log_content = (
                     f"Completed. Time: {response.execution_time:.2f}s",
                     f"Input tokens: {response.input_tokens}, Output tokens: {response.output_tokens}, Total tokens: {response.total_tokens}",
                     f"Model: {response.model}",
+                    f"Path: {path}",
+                    *self.backend_log_lines(response.backend),
+                    *self.search_log_lines(response),
                 )
                 exec_log_content = "\n".join(exec_log_content)
-                await self.add_execution_log(resp_id, exec_log_content)
-                await self.switch_tab("flow")
+                await self.add_execution_log(f"{session.name} {resp_id}", exec_log_content, flow=response.output)
+                if self.is_active(session):
+                    await self.switch_tab("flow")
 
                 return response.output
             else:
                 raise ValueError("No output generated from the flow")
         except Exception as e:
+            session.status = "failed"
+            set_status(f"Error: {str(e)}")
+            logging.error(f"{str(e)}")
+            return ""
+    
+    async def _build_flow_decomposed(self, session: BuildSession, prompt: str, metadata: Optional[str] = None) -> str:
+        client: KestraBotOpenAIClient = get_kestrabot_client()
+        try:
+            # switch to logs tab
+            await asyncio.sleep(0.25)
+            if self.is_active(session):
+                await self.switch_tab("logs")
+
+            # Run the blocking decomposed generation in a thread
+            response: KestraBotDecomposedFlowResponse = await self.supervisor.to_thread(
+                session,
+                generate_decomposed_flow,
+                client,
+                user_input=prompt,
+                metadata=metadata,
+                max_workers=settings.decompose_max_workers
+            )
+            self.set_session_flow(session, response.output)
+
+            # set status
+            set_status(f"Flow generated successfully for {session.name}")
+            # add execution log with per-part timing
+            exec_log_content = [
+                f"Completed. Time: {response.execution_time:.2f}s (plan: {response.plan_time:.2f}s)",
+                f"Input tokens: {response.input_tokens}, Output tokens: {response.output_tokens}, Total tokens: {response.total_tokens}",
+            ]
+            for part, part_response in zip(response.plan.parts, response.parts):
+                exec_log_content.append(
+                    f"  [stage {part.stage}] {part.id}: {part_response.execution_time:.2f}s, {part_response.total_tokens} tokens, "
+                    f"{part_response.backend}, web search {'on' if part_response.web_search else 'off'}"
+                )
+            exec_log_content.extend(self.backend_log_lines(", ".join(sorted({part.backend for part in response.parts if part.backend}))))
+            await self.add_execution_log(f"{session.name} {response.plan.flow_id}", "\n".join(exec_log_content), flow=response.output)
+            if self.is_active(session):
+                await self.switch_tab("flow")
+
+            return response.output
+        except Exception as e:
+            session.status = "failed"
+            set_status(f"Error: {str(e)}")
+            logging.error(f"{str(e)}")
+            return ""
+
+    async def _infer_metadata(self) -> None:
+        try:
+            # Run the blocking file sampling in a thread
+            schemas = await asyncio.to_thread(infer_schemas, [settings.data_dir])
+            if not schemas:
+                raise ValueError(f"No CSV or JSON-lines files found in {settings.data_dir}")
+
+            metadata_textarea = self.query_one("#metadata-textarea", TextArea)
+            metadata_textarea.text = merge_schema_metadata(metadata_textarea.text, format_schema_metadata(schemas))
+
+            # set status
+            set_status(f"Inferred {len(schemas)} table schema(s)")
+            # add execution log
+            exec_log_content = "\n".join(
+                f"{schema.path}: {len(schema.columns)} columns, {schema.sampled_rows} rows sampled "
+                f"of {schema.size_bytes / 1024 / 1024:.1f}MB in {schema.inference_time:.2f}s"
+                for schema in schemas
+            )
+            await self.add_execution_log(f"schemas {int(time.time())}", exec_log_content)
+            await self.switch_tab("metadata")
+        except Exception as e:
+            set_status(f"Error: {str(e)}")
+            logging.error(f"{str(e)}")
+
+    async def _fetch_outputs(self, execution_id: str) -> None:
+        try:
+            # Run the blocking downloads in a thread
+            summary = await asyncio.to_thread(fetch_execution_artifacts, execution_id)
+
+            # set status
+            if summary.failed:
+                set_status(f"Error: {len(summary.failed)} output file(s) of {execution_id} failed to download")
+            else:
+                set_status(f"Fetched {len(summary.downloads)} output file(s) to {settings.artifacts_dir / execution_id}")
+            # add execution log with per-file throughput
+            await self.add_execution_log(f"{execution_id} outputs", str(summary))
+        except Exception as e:
+            set_status(f"Error: {str(e)}")
+            logging.error(f"{str(e)}")
+
+    async def _add_to_kestra(self, source: str) -> None:
+        try:
+            # Run the blocking deployment in a thread
+            summary: KestraDeploySummary = await asyncio.to_thread(deploy_flows, [source])
+            set_status(f"Flow added to Kestra. {str(summary).splitlines()[0]}")
+            await self.add_execution_log(f"deploy {int(time.time())}", str(summary))
+        except Exception as e:
+            set_status(f"Error: {str(e)}")
+            logging.error(f"{str(e)}")
+
+    async def _modify_flow(self, session: BuildSession, flow: str, change_request: str, metadata: Optional[str] = None) -> str:
+        client: KestraBotOpenAIClient = get_kestrabot_client()
+        try:
+            # Run the blocking modify_kestra_flow in a thread
+            response: KestraBotFlowResponse = await self.supervisor.to_thread(
+                session,
+                client.modify_kestra_flow,
+                flow=flow,
+                change_request=change_request,
+                metadata=metadata
+            )
+
+            # add execution log
+            resp_id = str(response.id)
+            exec_log_content = (
+                f"Patch completed. Time: {response.execution_time:.2f}s",
+                f"Input tokens: {response.input_tokens}, Output tokens: {response.output_tokens}, Total tokens: {response.total_tokens}",
+                f"Model: {response.model}",
+                *self.backend_log_lines(response.backend),
+            )
+            exec_log_content = "\n".join(exec_log_content)
+            await self.add_execution_log(f"{session.name} {resp_id}", exec_log_content, flow=response.output)
+
+            # Review the diff now, or once the session is shown again
+            session.pending_patch = PendingPatch(
+                f"{session.name}: {change_request.splitlines()[0]}", flow, response.output, response.diff
+            )
+            if self.is_active(session):
+                await self.review_patch(session)
+            else:
+                set_status(f"Patch for {session.name} is ready, switch to the session to review it")
+            return response.output
+        except Exception as e:
+            session.status = "failed"
             set_status(f"Error: {str(e)}")
             logging.error(f"{str(e)}")
             return ""
     
+    async def review_patch(self, session: BuildSession) -> None:
+        """Show the pending patch of the active session and apply it if accepted."""
+        patch = session.pending_patch
+        if patch is None or not self.is_active(session):
+            return
+        session.pending_patch = None
+
+        def on_review(accepted: bool | None) -> None:
+            if not accepted:
+                set_status("Flow modification rejected")
+                logging.info("Flow modification rejected")
+                return
+            # The patch only applies to the flow it was computed against
+            current = self.query_one("#flow-textarea", TextArea).text if self.is_active(session) else session.flow
+            if current != patch.base_flow:
+                set_status(f"Error: the flow of {session.name} changed since the patch was requested, patch not applied")
+                logging.error(f"Flow of {session.name} changed since the patch was requested, patch not applied")
+                return
+            self.set_session_flow(session, patch.flow)
+            set_status("Flow modification accepted")
+            logging.info("Flow modification accepted")
+
+        self.refresh_sessions()
+        await self.switch_tab("flow")
+        self.push_screen(FlowDiffScreen(patch.summary, patch.diff), on_review)
+
+    async def _refine_flow(self, session: BuildSession, flow: str, instruction: str, metadata: Optional[str] = None) -> str:
+        client: KestraBotOpenAIClient = get_kestrabot_client()
+        chain = session.refinement
+        # Start over when the flow was edited since the last response, or the chain is too long
+        chainable = chain is not None and chain.continues(flow) and chain.length <= settings.refine_max_turns
+        try:
+            # Run the blocking refine_kestra_flow in a thread
+            response: KestraBotFlowResponse = await self.supervisor.to_thread(
+                session,
+                client.refine_kestra_flow,
+                flow=flow,
+                instruction=instruction,
+                metadata=metadata,
+                previous_response_id=chain.response_id if chainable else None,
+                backend=chain.backend if chainable else None,
+            )
+            chained = response.previous_response_id is not None
+            self.set_session_flow(session, response.output)
+
+            # Track the turn in the session chain
+            if chain is None:
+                chain = session.refinement = RefinementChain(response.id, response.backend, response.output)
+            chain.backend = response.backend
+            chain.add_turn(
+                response.id,
+                response.output,
+                chained=chained,
+                input_bytes=response.input_bytes,
+                context_bytes=response.context_bytes,
+                cached_tokens=response.cached_tokens,
+                latency=response.execution_time,
+            )
+
+            # set status
+            set_status(f"Flow refined for {session.name}")
+            # add execution log with the turn savings
+            saved = 1 - response.input_bytes / response.context_bytes if response.context_bytes else 0.0
+            exec_log_content = (
+                f"Refinement turn {chain.turns} ({'chained to ' + response.previous_response_id if chained else 'fresh request'}). Time: {response.execution_time:.2f}s",
+                f"Sent: {response.input_bytes / 1024:.1f}KB of {response.context_bytes / 1024:.1f}KB context ({saved:.0%} saved)",
+                f"Input tokens: {response.input_tokens} ({response.cached_tokens} cached), Output tokens: {response.output_tokens}, Total tokens: {response.total_tokens}",
+                f"Model: {response.model}",
+                *self.backend_log_lines(response.backend),
+                *self.search_log_lines(response),
+                f"Session: {chain}",
+            )
+            await self.add_execution_log(f"{session.name} {response.id}", "\n".join(exec_log_content), flow=response.output)
+            if self.is_active(session):
+                await self.switch_tab("flow")
+            return response.output
+        except Exception as e:
+            session.status = "failed"
+            set_status(f"Error: {str(e)}")
+            logging.error(f"{str(e)}")
+            return ""
+
     def action_quit(self) -> None:
         """Quit the application."""
         self.exit()
@@ -439,10 +1178,10 @@ class KestraBotApp(App):
         # await main_tabs.action_toggle(tab_id)
         main_tabs.active = tab_id
 
-    async def add_execution_log(self, execution_id: str, content: str) -> None:
-        """Add a new execution log entry."""
+    async def add_execution_log(self, execution_id: str, content: str, flow: Optional[str] = None) -> None:
+        """Add a new execution log entry, with the flow it generated, if any."""
         logs_tab = self.query_one("#logs", ExecutionLogsTab)
-        logs_tab.add_execution_log(execution_id, content)
+        logs_tab.add_execution_log(execution_id, content, flow=flow)
 
 
 app: Optional[KestraBotApp] = None
@@ -451,7 +1190,7 @@ app: Optional[KestraBotApp] = None
 def set_status(message: str) -> None:
     """Set the status message in the application."""
     global app
-    asyncio.create_task(app.set_status(message)) if app else None
+    app.supervisor.track(app.set_status(message)) if app else None
 
 
 def run_app():
@@ -0,0 +1,306 @@
+"""
+Kestra Execution Artifacts Module
+
+This module fetches the output files of a Kestra execution from the server internal
+storage. Outputs are listed from the execution task runs, then downloaded concurrently
+over the pooled Kestra client. Files are streamed in chunks straight to a `.part` file
+on disk, interrupted downloads resume from the bytes already written, and throughput is
+reported per file. Each file goes to `<task_id>/<taskrun_id>/<name>`, so the outputs of
+repeated task runs, e.g. ForEach iterations, do not overwrite each other.
+
+Usage:
+    python -m kestrabot.artifacts <execution_id> [--dest data/artifacts]
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import time
+import logging
+import argparse
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Any, Iterator, List, Optional, Union
+from pydantic import BaseModel, Field
+
+from kestrabot.settings import settings
+from kestrabot.kestra_client import KestraClient, get_kestra_client
+
+
+__all__ = [
+    "KestraArtifact",
+    "KestraArtifactDownload",
+    "KestraFetchSummary",
+    "list_execution_artifacts",
+    "download_artifact",
+    "fetch_execution_artifacts",
+]
+
+
+_STORAGE_SCHEME_ = "kestra://"
+
+
+class KestraArtifact(BaseModel):
+    """An output file of an execution in the Kestra internal storage."""
+    task_id: str                = Field(..., description="Id of the task which produced the file, or `outputs` for flow outputs.")
+    uri: str                    = Field(..., description="The `kestra://` URI of the file.")
+    taskrun_id: Optional[str]   = Field(None, description="Id of the task run which produced the file, unset for flow outputs.")
+
+    @property
+    def name(self) -> str:
+        """File name of the artifact."""
+        return PurePosixPath(self.uri[len(_STORAGE_SCHEME_):]).name
+
+    @property
+    def relative_path(self) -> PurePosixPath:
+        """Download path of the artifact, relative to the execution download directory."""
+        # Storage URIs end with `<taskrun_id>/<name>`, which also tells flow outputs apart
+        run = self.taskrun_id or PurePosixPath(self.uri[len(_STORAGE_SCHEME_):]).parent.name
+        return PurePosixPath(self.task_id, run, self.name) if run else PurePosixPath(self.task_id, self.name)
+
+
+class KestraArtifactDownload(BaseModel):
+    """Result of downloading a single artifact."""
+    artifact: KestraArtifact = Field(..., description="The downloaded artifact.")
+    path: str                = Field(..., description="Local path of the downloaded file.")
+    size: int                = Field(0, description="Size of the file in bytes.")
+    downloaded: int          = Field(0, description="Bytes transferred by this run.")
+    resumed_from: int        = Field(0, description="Bytes already on disk when the download started.")
+    elapsed: float           = Field(0.0, description="Download time in seconds.")
+    skipped: bool            = Field(False, description="Whether the file was already fully downloaded.")
+
+    @property
+    def throughput(self) -> float:
+        """Transfer rate in bytes per second."""
+        return self.downloaded / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class KestraFetchSummary(BaseModel):
+    """Summary of fetching the artifacts of an execution."""
+    execution_id: str                       = Field(..., description="The execution the artifacts belong to.")
+    downloads: List[KestraArtifactDownload] = Field(default_factory=list, description="Completed downloads.")
+    failed: dict                            = Field(default_factory=dict, description="Errors keyed by artifact URI.")
+    elapsed: float                          = Field(0.0, description="Total time in seconds.")
+
+    @property
+    def downloaded(self) -> int:
+        """Total bytes transferred."""
+        return sum(download.downloaded for download in self.downloads)
+
+    def __str__(self) -> str:
+        mb = self.downloaded / 1024 / 1024
+        lines = [
+            f"Downloaded {len(self.downloads)} file(s), {mb:.1f}MB in {self.elapsed:.2f}s"
+            + (f" ({mb / self.elapsed:.1f}MB/s)" if self.elapsed > 0 else "")
+            + (f", {len(self.failed)} failed" if self.failed else ""),
+        ]
+        for download in self.downloads:
+            line = f"  {download.artifact.relative_path}: "
+            if download.skipped:
+                line += "already downloaded"
+            else:
+                line += f"{download.downloaded / 1024 / 1024:.1f}MB in {download.elapsed:.2f}s ({download.throughput / 1024 / 1024:.1f}MB/s)"
+                if download.resumed_from:
+                    line += f", resumed at {download.resumed_from / 1024 / 1024:.1f}MB"
+            lines.append(line)
+        lines += [f"  ! {uri}: {error}" for uri, error in self.failed.items()]
+        return "\n".join(lines)
+
+
+def _iter_storage_uris(value: Any) -> Iterator[str]:
+    """Yield the `kestra://` URIs found in a (possibly nested) outputs value."""
+    if isinstance(value, str):
+        if value.startswith(_STORAGE_SCHEME_):
+            yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_storage_uris(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_storage_uris(item)
+
+
+def list_execution_artifacts(execution_id: str, client: Optional[KestraClient] = None) -> List[KestraArtifact]:
+    """
+    List the output files of an execution.
+
+    Args:
+        execution_id (str): The execution id.
+        client (Optional[KestraClient]): Kestra API client. Defaults to the global client.
+    Returns:
+        List[KestraArtifact]: The task and flow output files, without duplicates.
+    """
+    client = client or get_kestra_client()
+    execution = client.get_execution(execution_id)
+    artifacts, seen = [], set()
+    sources = [
+        (task_run.get("taskId", "task"), task_run.get("id"), task_run.get("outputs"))
+        for task_run in execution.get("taskRunList") or []
+    ]
+    sources.append(("outputs", None, execution.get("outputs")))
+    for task_id, taskrun_id, outputs in sources:
+        for uri in _iter_storage_uris(outputs):
+            if uri not in seen:
+                seen.add(uri)
+                artifacts.append(KestraArtifact(task_id=task_id, uri=uri, taskrun_id=taskrun_id))
+    return artifacts
+
+
+def download_artifact(
+    execution_id: str,
+    artifact: KestraArtifact,
+    dest: Union[str, Path],
+    client: Optional[KestraClient] = None,
+    chunk_size: Optional[int] = None,
+    retries: int = 3,
+) -> KestraArtifactDownload:
+    """
+    Download an artifact to `dest/<task_id>/<taskrun_id>/<name>`, streaming it in chunks.
+
+    Data is written to a `.part` file which is renamed once complete. An existing `.part`
+    file, e.g. from an interrupted run, is resumed with a `Range` request, and connection
+    errors are retried from the bytes already written. A stale `.part` file larger than
+    the remote file is discarded and the download restarts from byte 0.
+
+    Args:
+        execution_id (str): The execution owning the artifact.
+        artifact (KestraArtifact): The artifact to download.
+        dest (Union[str, Path]): The execution download directory.
+        client (Optional[KestraClient]): Kestra API client. Defaults to the global client.
+        chunk_size (Optional[int]): Chunk size in bytes. Defaults to settings.
+        retries (int): Number of times a failed transfer is resumed.
+    Returns:
+        KestraArtifactDownload: The download result.
+    """
+    client = client or get_kestra_client()
+    chunk_size = chunk_size or settings.artifact_chunk_size
+    path = Path(dest) / artifact.relative_path
+    part = path.with_name(path.name + ".part")
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    size = client.get_file_metas(execution_id, artifact.uri).get("size")
+    if path.exists() and (size is None or path.stat().st_size == size):
+        return KestraArtifactDownload(artifact=artifact, path=str(path), size=path.stat().st_size, skipped=True)
+
+    start_time = time.time()
+    resumed_from = part.stat().st_size if part.exists() else 0
+    # A part file larger than the remote file is stale, e.g. from an older output of the same name
+    if size is not None and resumed_from > size:
+        logging.info(f"Discarding stale partial download of {artifact.name}")
+        part.unlink()
+        resumed_from = 0
+    offset = resumed_from
+    attempt = 0
+    while True:
+        # The part file may already be complete if the previous run stopped before renaming it
+        if size is not None and offset == size:
+            break
+        try:
+            with client.stream_file(execution_id, artifact.uri, offset=offset) as response:
+                # The part file is past the end of the remote file: start over from byte 0.
+                # This is not a failed attempt and happens at most once, as resumed_from is reset
+                if resumed_from and response.status_code == 416:
+                    logging.info(f"Discarding stale partial download of {artifact.name}, restarting")
+                    part.unlink(missing_ok=True)
+                    offset = resumed_from = 0
+                    continue
+                # A server ignoring the Range header sends the whole file again
+                if offset and response.status_code != 206:
+                    offset = 0
+                    if resumed_from:
+                        logging.info(f"Server does not support resuming {artifact.name}, restarting")
+                        resumed_from = 0
+                response.raise_for_status()
+                with open(part, "ab" if offset else "wb") as f:
+                    for chunk in response.iter_bytes(chunk_size):
+                        f.write(chunk)
+                        offset += len(chunk)
+            break
+        except httpx.TransportError as e:
+            if attempt == retries:
+                raise
+            attempt += 1
+            logging.warning(f"Download of {artifact.name} interrupted at {offset} bytes, resuming: {str(e)}")
+
+    if size is not None and offset != size:
+        raise ValueError(f"Incomplete download of {artifact.uri}: {offset} of {size} bytes")
+    part.replace(path)
+    return KestraArtifactDownload(
+        artifact=artifact,
+        path=str(path),
+        size=offset,
+        downloaded=offset - resumed_from,
+        resumed_from=resumed_from,
+        elapsed=time.time() - start_time,
+    )
+
+
+def fetch_execution_artifacts(
+    execution_id: str,
+    dest: Optional[Union[str, Path]] = None,
+    client: Optional[KestraClient] = None,
+    max_workers: Optional[int] = None,
+) -> KestraFetchSummary:
+    """
+    Download all output files of an execution concurrently.
+
+    Args:
+        execution_id (str): The execution id.
+        dest (Optional[Union[str, Path]]): Download directory. Defaults to `settings.artifacts_dir/<execution_id>`.
+        client (Optional[KestraClient]): Kestra API client. Defaults to the global client.
+        max_workers (Optional[int]): Maximum concurrent downloads. Defaults to the connection pool size.
+    Returns:
+        KestraFetchSummary: The downloads, failures and throughput.
+    """
+    client = client or get_kestra_client()
+    dest = Path(dest) if dest else settings.artifacts_dir / execution_id
+    summary = KestraFetchSummary(execution_id=execution_id)
+    start_time = time.time()
+
+    artifacts = list_execution_artifacts(execution_id, client)
+    logging.info(f"Found {len(artifacts)} output file(s) for execution {execution_id}")
+
+    # Concurrent downloads to the same path would share and corrupt its `.part` file
+    targets = {}
+    for artifact in artifacts:
+        other = targets.setdefault(artifact.relative_path, artifact)
+        if other is not artifact:
+            summary.failed[artifact.uri] = f"same download path as {other.uri}: {artifact.relative_path}"
+    artifacts = list(targets.values())
+
+    def fetch(artifact: KestraArtifact):
+        try:
+            return download_artifact(execution_id, artifact, dest, client)
+        except (httpx.HTTPError, OSError, ValueError) as e:
+            logging.error(f"Failed to download {artifact.uri}: {str(e)}")
+            return e
+
+    if artifacts:
+        max_workers = max(1, min(max_workers or settings.kestra_max_connections, len(artifacts)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for artifact, result in zip(artifacts, executor.map(fetch, artifacts)):
+                if isinstance(result, Exception):
+                    summary.failed[artifact.uri] = str(result)
+                else:
+                    summary.downloads.append(result)
+
+    summary.elapsed = time.time() - start_time
+    logging.info(str(summary).splitlines()[0])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download the output files of a Kestra execution")
+    parser.add_argument("execution_id", help="The execution id")
+    parser.add_argument("--dest", type=Path, default=None, help="Download directory")
+    parser.add_argument("--url", default=None, help="Kestra server URL")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.get_logging_level(), format="%(levelname)s: %(message)s")
+    client = KestraClient(url=args.url) if args.url else None
+    summary = fetch_execution_artifacts(args.execution_id, dest=args.dest, client=client)
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
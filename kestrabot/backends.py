@@ -0,0 +1,381 @@
+"""
+Kestra Bot Generation Backends Module
+
+This module lets flow generation target any OpenAI-compatible endpoint, e.g. a locally
+hosted model server next to the public OpenAI API. Each backend has its own base URL,
+model list, connection pool and limits, and talks either the Responses API or the Chat
+Completions API. Routing rules send short or templated requests to a low-latency backend
+while complex ones use the reasoning model, and the latency of every backend is tracked.
+
+Backends and routes are configured in `settings.yaml`, e.g.:
+
+    backends:
+      local:
+        base_url: http://localhost:11434/v1
+        api: chat
+        models: [qwen2.5-coder:14b]
+        max_connections: 4
+    backend_routes:
+      - backend: local
+        max_input_chars: 600
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Literal, Optional, Type
+from pydantic import BaseModel, Field
+from openai import OpenAI, DefaultHttpxClient
+import httpx
+
+from kestrabot.settings import settings, _MODELS_
+
+
+__all__ = [
+    "BackendConfig",
+    "BackendRoute",
+    "BackendResponse",
+    "GenerationBackend",
+    "BackendRouter",
+]
+
+
+class BackendConfig(BaseModel):
+    """Configuration of an OpenAI-compatible generation backend."""
+    base_url: Optional[str]          = Field(None, description="API base URL. None uses the public OpenAI API.")
+    api_key_env: Optional[str]       = Field(None, description="Environment variable holding the API key. The public OpenAI API defaults to the OpenAI key.")
+    api: Literal["responses", "chat"] = Field("responses", description="API used for generation: the Responses API or Chat Completions.")
+    models: List[str]                = Field(default_factory=list, description="Models served by the backend. The first one is the default.")
+    reasoning: bool                  = Field(False, description="Whether the models accept reasoning effort options.")
+    web_search: bool                 = Field(False, description="Whether the backend supports the web search tool.")
+    max_connections: int             = Field(10, description="Size of the backend connection pool.")
+    timeout: float                   = Field(600.0, description="Request timeout in seconds.")
+    max_retries: int                 = Field(2, description="Retries of failed requests.")
+
+
+class BackendRoute(BaseModel):
+    """
+    Rule routing matching requests to a backend.
+
+    Every condition set on the rule must hold for a request to match.
+    """
+    backend: str                         = Field(..., description="Name of the backend requests are routed to.")
+    operations: List[str]                = Field(["generate"], description="Operations the rule applies to: generate, modify, decompose.")
+    max_input_chars: Optional[int]       = Field(None, description="Match requests whose prompt and metadata are at most this long.")
+    template_confidence: Optional[float] = Field(None, description="Match requests resembling a flow template with at least this confidence.")
+
+
+class BackendResponse(BaseModel):
+    """Normalized response of a backend call."""
+    id: Optional[str]      = Field(None, description="Response id, if available.")
+    output_text: str       = Field("", description="Generated text.")
+    output_parsed: Any     = Field(None, description="Parsed structured output, for structured calls.")
+    model: str             = Field("unknown", description="Model which generated the response.")
+    input_tokens: int      = Field(0, description="Input tokens used.")
+    output_tokens: int     = Field(0, description="Output tokens generated.")
+    total_tokens: int      = Field(0, description="Total tokens used.")
+    cached_tokens: int     = Field(0, description="Input tokens served from the prompt cache.")
+    web_search_calls: int  = Field(0, description="Number of web searches the model ran.")
+    latency: float         = Field(0.0, description="Call latency in seconds.")
+
+
+class _LatencyStats:
+    """Thread-safe latency samples of a backend."""
+
+    _MAX_SAMPLES_ = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: List[float] = []
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, latency: float, ok: bool = True) -> None:
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+                return
+            self._samples.append(latency)
+            del self._samples[:-self._MAX_SAMPLES_]
+
+    def percentile(self, percent: float) -> float:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+    def __str__(self) -> str:
+        text = f"p50 {self.percentile(50):.2f}s, p95 {self.percentile(95):.2f}s over {self.calls} call(s)"
+        return text + (f", {self.errors} failed" if self.errors else "")
+
+
+class GenerationBackend:
+    """An OpenAI-compatible endpoint with its own connection pool and latency stats."""
+
+    def __init__(self, name: str, config: BackendConfig, api_key: Optional[str] = None):
+        """
+        Initialize the backend. The SDK client is only created on first use.
+
+        Args:
+            name (str): The backend name used by routing rules.
+            config (BackendConfig): The backend configuration.
+            api_key (Optional[str]): API key overriding the configured one.
+        """
+        self.name = name
+        self.config = config
+        self._api_key = api_key
+        self.stats = _LatencyStats()
+        self._client: Optional[OpenAI] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> OpenAI:
+        """
+        The OpenAI SDK client of the backend, created on first use.
+
+        Raises:
+            ValueError: If no API key is found for the public OpenAI API.
+        """
+        with self._lock:
+            if self._client is None:
+                api_key = self._api_key or (os.getenv(self.config.api_key_env) if self.config.api_key_env else None)
+                if self.config.base_url is None:
+                    # Never send the OpenAI key to other endpoints
+                    api_key = api_key or settings.openai_api_key or os.getenv("KESTRABOT_OPENAI_API_KEY")
+                if not api_key and self.config.base_url is None:
+                    raise ValueError("OpenAI API key is required. Please set the KESTRABOT_OPENAI_API_KEY environment variable.")
+                limits = httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_connections,
+                )
+                self._client = OpenAI(
+                    api_key=api_key or "not-needed",
+                    base_url=self.config.base_url,
+                    timeout=self.config.timeout,
+                    max_retries=self.config.max_retries,
+                    http_client=DefaultHttpxClient(limits=limits),
+                )
+                logging.info(f"Generation backend '{self.name}' initialized for {self.config.base_url or 'OpenAI'}")
+            return self._client
+
+    @property
+    def supports_chaining(self) -> bool:
+        """Whether follow-up requests can be chained to stored responses with `previous_response_id`."""
+        return self.config.api == "responses"
+
+    def model(self, requested: Optional[str] = None) -> str:
+        """Return the requested model if the backend serves it, otherwise its default model."""
+        if not self.config.models:
+            raise ValueError(f"Backend '{self.name}' has no models configured")
+        return requested if requested in self.config.models else self.config.models[0]
+
+    def _reasoning(self, model: str, effort: str, summary: bool) -> Optional[dict]:
+        if not self.config.reasoning or not model.startswith("o4-"):
+            return None
+        return {"effort": effort, "summary": "auto"} if summary else {"effort": effort}
+
+    def _call(self, call) -> BackendResponse:
+        start_time = time.time()
+        try:
+            response = call()
+        except Exception:
+            self.stats.record(time.time() - start_time, ok=False)
+            raise
+        response.latency = time.time() - start_time
+        self.stats.record(response.latency)
+        return response
+
+    def create(
+        self,
+        instructions: str,
+        input: str,
+        model: Optional[str] = None,
+        effort: str = "medium",
+        web_search: bool = False,
+        previous_response_id: Optional[str] = None,
+    ) -> BackendResponse:
+        """
+        Generate text.
+
+        Args:
+            instructions (str): The developer instructions.
+            input (str): The user input.
+            model (Optional[str]): Requested model. Defaults to the backend default model.
+            effort (str): Reasoning effort, for reasoning models.
+            web_search (bool): Whether to enable the web search tool, where supported.
+            previous_response_id (Optional[str]): Stored response to continue from, see `supports_chaining`.
+        Returns:
+            BackendResponse: The normalized response.
+        """
+        model = self.model(model)
+        if self.config.api == "chat":
+            return self._call(lambda: self._from_chat(self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "system", "content": instructions}, {"role": "user", "content": input}],
+            )))
+        tools = [{"type": "web_search_preview", "search_context_size": "medium"}] if web_search and self.config.web_search else None
+        return self._call(lambda: self._from_responses(self.client.responses.create(
+            model=model,
+            instructions=instructions,
+            input=input,
+            reasoning=self._reasoning(model, effort, summary=True),
+            tools=tools,
+            previous_response_id=previous_response_id,
+            store=True,
+        )))
+
+    def parse(
+        self,
+        instructions: str,
+        input: str,
+        text_format: Type[BaseModel],
+        model: Optional[str] = None,
+        effort: str = "medium",
+    ) -> BackendResponse:
+        """
+        Generate a structured output parsed into a pydantic model.
+
+        Args:
+            instructions (str): The developer instructions.
+            input (str): The user input.
+            text_format (Type[BaseModel]): The output model.
+            model (Optional[str]): Requested model. Defaults to the backend default model.
+            effort (str): Reasoning effort, for reasoning models.
+        Returns:
+            BackendResponse: The normalized response with `output_parsed` set.
+        """
+        model = self.model(model)
+        if self.config.api == "chat":
+            return self._call(lambda: self._from_chat(self.client.chat.completions.parse(
+                model=model,
+                messages=[{"role": "system", "content": instructions}, {"role": "user", "content": input}],
+                response_format=text_format,
+            )))
+        return self._call(lambda: self._from_responses(self.client.responses.parse(
+            model=model,
+            instructions=instructions,
+            input=input,
+            reasoning=self._reasoning(model, effort, summary=effort != "low"),
+            text_format=text_format,
+            store=True,
+        )))
+
+    def warm_up(self) -> None:
+        """Open a connection to the backend ahead of the first generation with a cheap model lookup."""
+        start_time = time.time()
+        self.client.models.retrieve(self.model(settings.openai_model))
+        logging.info(f"Backend '{self.name}' connection pre-warmed in {time.time() - start_time:.2f}s")
+
+    @staticmethod
+    def _from_responses(response) -> BackendResponse:
+        usage = getattr(response, "usage", None)
+        return BackendResponse(
+            id=getattr(response, "id", None),
+            output_text=getattr(response, "output_text", "") or "",
+            output_parsed=getattr(response, "output_parsed", None),
+            model=getattr(response, "model", "unknown"),
+            input_tokens=getattr(usage, "input_tokens", 0) if usage else 0,
+            output_tokens=getattr(usage, "output_tokens", 0) if usage else 0,
+            total_tokens=getattr(usage, "total_tokens", 0) if usage else 0,
+            cached_tokens=getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", 0) or 0,
+            web_search_calls=sum(getattr(item, "type", "") == "web_search_call" for item in getattr(response, "output", None) or []),
+        )
+
+    @staticmethod
+    def _from_chat(completion) -> BackendResponse:
+        usage = getattr(completion, "usage", None)
+        message = completion.choices[0].message
+        return BackendResponse(
+            id=getattr(completion, "id", None),
+            output_text=message.content or "",
+            output_parsed=getattr(message, "parsed", None),
+            model=getattr(completion, "model", "unknown"),
+            input_tokens=getattr(usage, "prompt_tokens", 0) if usage else 0,
+            output_tokens=getattr(usage, "completion_tokens", 0) if usage else 0,
+            total_tokens=getattr(usage, "total_tokens", 0) if usage else 0,
+            cached_tokens=getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0,
+        )
+
+
+class BackendRouter:
+    """Routes generation requests to the configured backends."""
+
+    def __init__(
+        self,
+        backends: Optional[Dict[str, dict]] = None,
+        routes: Optional[List[dict]] = None,
+        default: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ):
+        """
+        Initialize the router.
+
+        The public OpenAI API is always available as the `openai` backend, unless a
+        backend of that name is configured.
+
+        Args:
+            backends (Optional[Dict[str, dict]]): Backend configurations by name. Defaults to settings.
+            routes (Optional[List[dict]]): Routing rules, first match wins. Defaults to settings.
+            default (Optional[str]): Backend used when no rule matches. Defaults to settings.
+            api_key (Optional[str]): API key of the built-in `openai` backend.
+        Raises:
+            ValueError: If a route or the default refers to an unknown backend.
+        """
+        configs = {
+            "openai": {"models": [settings.openai_model, *sorted(_MODELS_ - {settings.openai_model})], "reasoning": True, "web_search": True},
+            **(settings.backends if backends is None else backends),
+        }
+        self.backends: Dict[str, GenerationBackend] = {
+            name: GenerationBackend(name, BackendConfig.model_validate(config), api_key=api_key if name == "openai" else None)
+            for name, config in configs.items()
+        }
+        self.routes = [BackendRoute.model_validate(route) for route in (settings.backend_routes if routes is None else routes)]
+        self.default = default or settings.default_backend
+        for name in [self.default, *(route.backend for route in self.routes)]:
+            if name not in self.backends:
+                raise ValueError(f"Unknown generation backend '{name}'")
+
+    def get(self, name: Optional[str] = None) -> GenerationBackend:
+        """Return a backend by name, or the default backend."""
+        name = name or self.default
+        if name not in self.backends:
+            raise ValueError(f"Unknown generation backend '{name}'")
+        return self.backends[name]
+
+    def route(self, operation: str, user_input: str, metadata: Optional[str] = None) -> GenerationBackend:
+        """
+        Pick the backend for a request.
+
+        Args:
+            operation (str): The operation: generate, modify or decompose.
+            user_input (str): The user prompt.
+            metadata (Optional[str]): The metadata sent with the prompt.
+        Returns:
+            GenerationBackend: The first matching route's backend, or the default backend.
+        """
+        size = len(user_input) + len(metadata or "")
+        for route in self.routes:
+            if operation not in route.operations:
+                continue
+            if route.max_input_chars is not None and size > route.max_input_chars:
+                continue
+            if route.template_confidence is not None:
+                # Imported here as the templates module depends on the OpenAI client module
+                from kestrabot.templates import match_template
+                match = match_template(user_input, metadata)
+                if match is None or match.confidence < route.template_confidence:
+                    continue
+            logging.info(f"Routing {operation} request to backend '{route.backend}'")
+            return self.backends[route.backend]
+        return self.backends[self.default]
+
+    def stats_summary(self) -> str:
+        """Latency stats of the backends which served requests, one line each."""
+        return "\n".join(
+            f"{name}: {backend.stats}" for name, backend in self.backends.items() if backend.stats.calls
+        )
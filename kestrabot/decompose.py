@@ -0,0 +1,235 @@
+"""
+Kestra Flow Decomposition Module
+
+This module splits large, multi-part prompts into independent sections, generates a
+Kestra sub-flow for each section concurrently, and stitches the results into a parent
+flow which runs the sub-flows using Kestra Subflow and Parallel tasks.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import re
+import time
+import yaml
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from kestrabot.plugin_catalog import validate_flow_plugins
+
+
+__all__ = [
+    "KestraFlowPart",
+    "KestraFlowPlan",
+    "KestraBotDecomposedFlowResponse",
+    "KESTRA_DECOMPOSE_INSTRUCTIONS",
+    "generate_decomposed_flow",
+    "stitch_flows",
+    "validate_flow_bundle",
+]
+
+
+KESTRA_DECOMPOSE_INSTRUCTIONS = """
+You are a data engineering expert planning Kestra flows. Split the user's ETL task description into independent parts, where each part will be generated as its own Kestra sub-flow.
+Rules:
+- Only split when the parts can run without each other's task outputs. Steps that pass data to each other belong in the same part.
+- Each part's `prompt` must be self-contained: repeat any shared upstream steps (downloads, conversions) needed by that part.
+- Parts with the same `stage` number run in parallel. Lower stages run before higher stages.
+- Use short snake_case ids for parts.
+- If the task cannot be split, return a single part containing the full task.
+- `flow_id` is a kebab-case id for the parent flow. `namespace` defaults to `company.team` unless the user specifies one.
+"""
+
+SUBFLOW_TASK_TYPE = "io.kestra.plugin.core.flow.Subflow"
+PARALLEL_TASK_TYPE = "io.kestra.plugin.core.flow.Parallel"
+
+
+class KestraFlowPart(BaseModel):
+    """A single independent section of a decomposed prompt."""
+    id: str     = Field(..., description="Short snake_case identifier of the part.")
+    title: str  = Field(..., description="Short human readable title of the part.")
+    prompt: str = Field(..., description="Self-contained ETL task description used to generate the sub-flow.")
+    stage: int  = Field(1, description="Execution stage. Parts of the same stage run in parallel.")
+
+
+class KestraFlowPlan(BaseModel):
+    """The decomposition plan returned by the model."""
+    flow_id: str                = Field(..., description="Kebab-case id of the parent flow.")
+    namespace: str              = Field(..., description="Kestra namespace of the parent flow and its sub-flows.")
+    parts: List[KestraFlowPart] = Field(..., description="Independent parts of the ETL task.")
+
+
+class KestraBotDecomposedFlowResponse(BaseModel):
+    """
+    The result of a decomposed generation: the stitched bundle plus per-part responses.
+    """
+    output: str           = Field(..., description="The stitched multi-document YAML: the parent flow followed by its sub-flows.")
+    plan: KestraFlowPlan  = Field(..., description="The decomposition plan used for generation.")
+    parts: list           = Field(default_factory=list, description="The KestraBotFlowResponse of each generated sub-flow, in plan order.")
+    plan_time: float      = Field(0.0, description="Time spent decomposing the prompt in seconds.")
+    execution_time: float = Field(0.0, description="Total wall-clock time of the decomposed generation in seconds.")
+    input_tokens: int     = Field(0, description="Input tokens used across the plan and all sub-flows.")
+    output_tokens: int    = Field(0, description="Output tokens used across the plan and all sub-flows.")
+    total_tokens: int     = Field(0, description="Total tokens used across the plan and all sub-flows.")
+
+
+def _subflow_id(plan: KestraFlowPlan, part: KestraFlowPart) -> str:
+    return f"{plan.flow_id}-{part.id}".replace("_", "-")
+
+
+def _set_top_level_key(content: str, key: str, value: str) -> str:
+    """Replace (or prepend) a top-level scalar key without reformatting the rest of the YAML."""
+    pattern = re.compile(rf"^{key}:.*$", re.MULTILINE)
+    if pattern.search(content):
+        return pattern.sub(f"{key}: {value}", content, count=1)
+    return f"{key}: {value}\n{content}"
+
+
+def stitch_flows(plan: KestraFlowPlan, subflows: List[str]) -> str:
+    """
+    Stitch generated sub-flows into a parent flow.
+
+    Each sub-flow gets a deterministic id within the plan namespace. The parent flow runs
+    the stages in order; parts sharing a stage are wrapped in a Parallel task.
+
+    Args:
+        plan (KestraFlowPlan): The decomposition plan.
+        subflows (List[str]): The generated sub-flow YAML, in plan order.
+    Returns:
+        str: A multi-document YAML string: the parent flow followed by the sub-flows.
+    """
+    if len(subflows) != len(plan.parts):
+        raise ValueError(f"Expected {len(plan.parts)} sub-flows, got {len(subflows)}")
+
+    documents = []
+    stages: dict[int, list] = {}
+    for part, content in zip(plan.parts, subflows):
+        flow_id = _subflow_id(plan, part)
+        content = _set_top_level_key(content, "id", flow_id)
+        content = _set_top_level_key(content, "namespace", plan.namespace)
+        documents.append(content.strip())
+        stages.setdefault(part.stage, []).append({
+            "id": f"run_{part.id}",
+            "type": SUBFLOW_TASK_TYPE,
+            "description": part.title,
+            "namespace": plan.namespace,
+            "flowId": flow_id,
+            "wait": True,
+            "transmitFailed": True,
+        })
+
+    tasks = []
+    for stage in sorted(stages):
+        stage_tasks = stages[stage]
+        if len(stage_tasks) == 1:
+            tasks.extend(stage_tasks)
+        else:
+            tasks.append({
+                "id": f"stage_{stage}",
+                "type": PARALLEL_TASK_TYPE,
+                "tasks": stage_tasks,
+            })
+
+    parent = {
+        "id": plan.flow_id,
+        "namespace": plan.namespace,
+        "tasks": tasks,
+    }
+    parent_yaml = yaml.safe_dump(parent, sort_keys=False, allow_unicode=True).strip()
+    return "\n---\n".join([parent_yaml] + documents) + "\n"
+
+
+def _iter_tasks(tasks: Optional[list]):
+    """Yield every task of a task list, including nested flowable tasks."""
+    for task in tasks or []:
+        if not isinstance(task, dict):
+            continue
+        yield task
+        for key in ("tasks", "then", "else", "errors", "finally"):
+            nested = task.get(key)
+            if isinstance(nested, list):
+                yield from _iter_tasks(nested)
+
+
+def validate_flow_bundle(content: str) -> str:
+    """
+    Validate a multi-document Kestra Flow YAML bundle as a whole.
+
+    Every document must be a valid Kestra flow, flow ids must be unique per namespace,
+    and every Subflow task must reference a flow in the bundle.
+
+    Args:
+        content (str): The multi-document YAML content.
+    Returns:
+        str: The validated content.
+    Raises:
+        ValueError: If the bundle is invalid.
+    """
+    try:
+        documents = [doc for doc in yaml.safe_load_all(content) if doc is not None]
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid Kestra YAML content: {str(e)}")
+    if not documents:
+        raise ValueError("Kestra YAML Content cannot be empty")
+
+    required_keys = ["id", "namespace", "tasks"]
+    flows = set()
+    for doc in documents:
+        if not isinstance(doc, dict) or any(key not in doc for key in required_keys):
+            raise ValueError(f"Invalid Kestra YAML structure. Missing one of the required keys: {required_keys}")
+        key = (doc["namespace"], doc["id"])
+        if key in flows:
+            raise ValueError(f"Duplicate flow '{doc['namespace']}.{doc['id']}' in bundle")
+        flows.add(key)
+        validate_flow_plugins(doc)
+
+    for doc in documents:
+        for task in _iter_tasks(doc.get("tasks")):
+            if task.get("type") == SUBFLOW_TASK_TYPE:
+                ref = (task.get("namespace"), task.get("flowId"))
+                if ref not in flows:
+                    raise ValueError(f"Task '{task.get('id')}' references unknown sub-flow '{ref[0]}.{ref[1]}'")
+    return content
+
+
+def generate_decomposed_flow(client, user_input: str, metadata: Optional[str] = None, max_workers: int = 4) -> KestraBotDecomposedFlowResponse:
+    """
+    Decompose a prompt, generate its sub-flows concurrently and stitch them together.
+
+    Args:
+        client (KestraBotOpenAIClient): The client used for planning and generation.
+        user_input (str): The user's prompt describing the ETL task.
+        metadata (Optional[str]): Additional metadata shared by all sub-flows.
+        max_workers (int): Maximum number of sub-flows generated concurrently.
+    Returns:
+        KestraBotDecomposedFlowResponse: The stitched, validated bundle and per-part responses.
+    """
+    start_time = time.time()
+    plan_response = client.decompose_kestra_flow(user_input, metadata=metadata)
+    plan = KestraFlowPlan.model_validate_json(plan_response.output)
+    plan_time = time.time() - start_time
+    logging.info(f"Decomposed prompt into {len(plan.parts)} part(s) in {plan_time:.2f}s")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(plan.parts)))) as executor:
+        futures = [
+            executor.submit(client.generate_kestra_flow, user_input=part.prompt, metadata=metadata)
+            for part in plan.parts
+        ]
+        # Collect in plan order, re-raising the first failure
+        parts = [future.result() for future in futures]
+
+    for part, response in zip(plan.parts, parts):
+        logging.info(f"Sub-flow '{part.id}' generated in {response.execution_time:.2f}s ({response.total_tokens} tokens)")
+
+    output = validate_flow_bundle(stitch_flows(plan, [response.output for response in parts]))
+    return KestraBotDecomposedFlowResponse(
+        output=output,
+        plan=plan,
+        parts=parts,
+        plan_time=plan_time,
+        execution_time=time.time() - start_time,
+        input_tokens=plan_response.input_tokens + sum(r.input_tokens for r in parts),
+        output_tokens=plan_response.output_tokens + sum(r.output_tokens for r in parts),
+        total_tokens=plan_response.total_tokens + sum(r.total_tokens for r in parts),
+    )
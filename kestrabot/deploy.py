@@ -0,0 +1,267 @@
+"""
+Kestra Flow Deployment Module
+
+This module deploys many generated flows to a Kestra server at once. Each flow is
+canonicalized and hashed, compared with the flows currently on the server, and only
+new or changed flows are uploaded using one bulk request per namespace.
+
+Usage:
+    python -m kestrabot.deploy flows/ [--namespace company.team] [--dry-run]
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import io
+import json
+import time
+import yaml
+import hashlib
+import logging
+import zipfile
+import argparse
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+from pydantic import BaseModel, Field
+
+from kestrabot.settings import settings
+from kestrabot.kestra_client import KestraClient, get_kestra_client
+
+
+__all__ = [
+    "KestraFlowSource",
+    "KestraDeploySummary",
+    "canonicalize_flow",
+    "flow_hash",
+    "load_flow_sources",
+    "deploy_flows",
+]
+
+
+# Keys managed by the Kestra server which must not affect the flow hash
+_SERVER_KEYS_ = {"revision", "deleted", "tenantId", "updated"}
+
+_FLOW_FILE_PATTERNS_ = ("*.yml", "*.yaml")
+
+
+class KestraFlowSource(BaseModel):
+    """A single flow to deploy, with its canonical hash."""
+    namespace: str = Field(..., description="Namespace of the flow.")
+    id: str        = Field(..., description="Id of the flow.")
+    source: str    = Field(..., description="The YAML source of the flow as written by the user or the model.")
+    hash: str      = Field(..., description="SHA-256 of the canonicalized flow.")
+    origin: str    = Field("", description="Where the flow was loaded from, e.g. a file path.")
+
+
+class KestraDeploySummary(BaseModel):
+    """Summary of a deployment run."""
+    created: List[str]   = Field(default_factory=list, description="Flows created on the server, as `namespace.id`.")
+    updated: List[str]   = Field(default_factory=list, description="Flows updated on the server, as `namespace.id`.")
+    unchanged: List[str] = Field(default_factory=list, description="Flows skipped because the server already has them.")
+    dry_run: bool        = Field(False, description="Whether the run only computed the changes without uploading.")
+    timings: dict        = Field(default_factory=dict, description="Time spent per phase in seconds.")
+
+    def __str__(self) -> str:
+        lines = [
+            f"Created: {len(self.created)}, Updated: {len(self.updated)}, Unchanged: {len(self.unchanged)}"
+            + (" (dry run)" if self.dry_run else ""),
+            "Timings: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.timings.items()),
+        ]
+        lines += [f"  + {flow}" for flow in self.created]
+        lines += [f"  ~ {flow}" for flow in self.updated]
+        return "\n".join(lines)
+
+
+def canonicalize_flow(flow: Union[str, dict]) -> str:
+    """
+    Return the canonical form of a flow: its parsed content as key-sorted compact JSON.
+
+    Formatting, comments, key order and server-managed keys do not affect the result.
+
+    Args:
+        flow (Union[str, dict]): The flow YAML source or its parsed content.
+    Returns:
+        str: The canonical flow representation.
+    """
+    if isinstance(flow, str):
+        flow = yaml.safe_load(flow)
+    if not isinstance(flow, dict):
+        raise ValueError("Invalid Kestra YAML structure. A flow must be a mapping")
+    content = {key: value for key, value in flow.items() if key not in _SERVER_KEYS_}
+    return json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def flow_hash(flow: Union[str, dict]) -> str:
+    """Return the SHA-256 hex digest of the canonicalized flow."""
+    return hashlib.sha256(canonicalize_flow(flow).encode("utf-8")).hexdigest()
+
+
+def _split_documents(source: str, origin: str = "") -> List[KestraFlowSource]:
+    """Split a (possibly multi-document) YAML source into flows."""
+    flows = []
+    # Split on document markers so each flow keeps its original formatting
+    chunks, current = [], []
+    for line in source.splitlines(keepends=True):
+        if line.rstrip() == "---":
+            chunks.append("".join(current))
+            current = []
+        else:
+            current.append(line)
+    chunks.append("".join(current))
+
+    for chunk in chunks:
+        content = yaml.safe_load(chunk) if chunk.strip() else None
+        if content is None:
+            continue
+        if not isinstance(content, dict) or "id" not in content or "namespace" not in content:
+            raise ValueError(f"Invalid Kestra flow in {origin or 'source'}: missing id or namespace")
+        flows.append(KestraFlowSource(
+            namespace=str(content["namespace"]),
+            id=str(content["id"]),
+            source=chunk.strip() + "\n",
+            hash=flow_hash(content),
+            origin=origin,
+        ))
+    return flows
+
+
+def load_flow_sources(sources: Iterable[Union[str, Path]]) -> List[KestraFlowSource]:
+    """
+    Load flows from directories, files or raw YAML strings.
+
+    Directories are searched recursively for `*.yml`/`*.yaml` files. Multi-document
+    YAML is split into one flow per document.
+
+    Args:
+        sources (Iterable[Union[str, Path]]): Paths or raw YAML flow sources.
+    Returns:
+        List[KestraFlowSource]: The loaded flows.
+    Raises:
+        ValueError: If the same flow is loaded twice.
+    """
+    flows: List[KestraFlowSource] = []
+    for source in sources:
+        path = Path(source) if isinstance(source, Path) or "\n" not in str(source) else None
+        if path is not None and path.is_dir():
+            for pattern in _FLOW_FILE_PATTERNS_:
+                for file in sorted(path.rglob(pattern)):
+                    flows.extend(_split_documents(file.read_text(encoding="utf-8"), str(file)))
+        elif path is not None and path.is_file():
+            flows.extend(_split_documents(path.read_text(encoding="utf-8"), str(path)))
+        else:
+            flows.extend(_split_documents(str(source), "editor"))
+
+    seen = {}
+    for flow in flows:
+        key = f"{flow.namespace}.{flow.id}"
+        if key in seen:
+            raise ValueError(f"Flow '{key}' is defined twice: {seen[key]} and {flow.origin}")
+        seen[key] = flow.origin
+    return flows
+
+
+def _fetch_server_hashes(client: KestraClient, namespace: str) -> dict[str, str]:
+    """Return the hashes of the flows currently on the server for a namespace, keyed by flow id."""
+    hashes = {}
+    try:
+        archive = client.export_flows(namespace)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return hashes
+        raise
+    if not archive:
+        return hashes
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        for name in zf.namelist():
+            content = yaml.safe_load(zf.read(name).decode("utf-8"))
+            if isinstance(content, dict) and content.get("namespace") == namespace:
+                hashes[str(content["id"])] = flow_hash(content)
+    return hashes
+
+
+def deploy_flows(
+    sources: Iterable[Union[str, Path]],
+    client: Optional[KestraClient] = None,
+    namespace: Optional[str] = None,
+    dry_run: bool = False,
+) -> KestraDeploySummary:
+    """
+    Deploy flows to the Kestra server, uploading only new or changed flows.
+
+    Args:
+        sources (Iterable[Union[str, Path]]): Directories, files or raw YAML flow sources.
+        client (Optional[KestraClient]): Kestra API client. Defaults to the global client.
+        namespace (Optional[str]): Only deploy flows of this namespace.
+        dry_run (bool): Compute and report the changes without uploading.
+    Returns:
+        KestraDeploySummary: The created, updated and unchanged flows plus timings.
+    """
+    client = client or get_kestra_client()
+    summary = KestraDeploySummary(dry_run=dry_run)
+    start_time = time.time()
+
+    # Load and hash the local flows
+    flows = load_flow_sources(sources)
+    if namespace:
+        flows = [flow for flow in flows if flow.namespace == namespace]
+    by_namespace: dict[str, List[KestraFlowSource]] = {}
+    for flow in flows:
+        by_namespace.setdefault(flow.namespace, []).append(flow)
+    summary.timings["load"] = time.time() - start_time
+    logging.info(f"Loaded {len(flows)} flow(s) in {len(by_namespace)} namespace(s)")
+    if not flows:
+        return summary
+
+    max_workers = max(1, min(settings.kestra_max_connections, len(by_namespace)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Compare against what the server currently has, one export per namespace
+        phase_time = time.time()
+        server_hashes = dict(zip(by_namespace, executor.map(
+            lambda ns: _fetch_server_hashes(client, ns), by_namespace
+        )))
+        summary.timings["compare"] = time.time() - phase_time
+
+        changes: dict[str, List[KestraFlowSource]] = {}
+        for ns, ns_flows in by_namespace.items():
+            for flow in ns_flows:
+                key = f"{flow.namespace}.{flow.id}"
+                current = server_hashes[ns].get(flow.id)
+                if current == flow.hash:
+                    summary.unchanged.append(key)
+                    continue
+                (summary.created if current is None else summary.updated).append(key)
+                changes.setdefault(ns, []).append(flow)
+
+        # Upload only the changed flows, one bulk request per namespace
+        phase_time = time.time()
+        if changes and not dry_run:
+            list(executor.map(
+                lambda item: client.update_namespace_flows(
+                    item[0], "---\n".join(flow.source for flow in item[1]), delete=False
+                ),
+                changes.items(),
+            ))
+        summary.timings["upload"] = time.time() - phase_time
+
+    summary.timings["total"] = time.time() - start_time
+    logging.info(f"Deployment finished. {str(summary).splitlines()[0]}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy Kestra flows, uploading only changed flows")
+    parser.add_argument("paths", nargs="+", type=Path, help="Flow files or directories")
+    parser.add_argument("--namespace", default=None, help="Only deploy flows of this namespace")
+    parser.add_argument("--url", default=None, help="Kestra server URL")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without uploading")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.get_logging_level(), format="%(levelname)s: %(message)s")
+    client = KestraClient(url=args.url) if args.url else None
+    summary = deploy_flows(args.paths, client=client, namespace=args.namespace, dry_run=args.dry_run)
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Kestra Bot Developer Prompt Evaluation
+
+This module evaluates developer prompt versions against a suite of user prompts. Each
+version runs the whole suite concurrently, either live against OpenAI or through a replay
+stand-in which serves recorded responses. Generated flows are validated in a process pool
+and the validity rate, latency percentiles and token usage of each version are reported
+and stored, so regressions between prompt versions are visible.
+
+Usage:
+    python -m kestrabot.evaluation --record data/eval/replay.jsonl          # live run, recorded
+    python -m kestrabot.evaluation --replay data/eval/replay.jsonl          # replay run
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import json
+import time
+import yaml
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from kestrabot.settings import settings, _DATA_DIR_
+from kestrabot.decompose import validate_flow_bundle
+from kestrabot.openai_bot import get_kestrabot_client
+
+
+__all__ = [
+    "EvaluationCase",
+    "EvaluationResult",
+    "EvaluationSummary",
+    "ReplayGenerator",
+    "discover_prompt_versions",
+    "load_suite",
+    "run_evaluation",
+    "summarize",
+    "format_report",
+]
+
+
+_PROMPTS_DIR_ = Path(__file__).parent.parent / "prompts"
+_SUITE_FILE_ = _PROMPTS_DIR_ / "eval_suite.yaml"
+_RESULTS_DIR_ = _DATA_DIR_ / "eval"
+
+# Relative increase of latency or tokens reported as a regression
+_REGRESSION_THRESHOLD_ = 0.2
+
+
+class EvaluationCase(BaseModel):
+    """A single user prompt of the evaluation suite."""
+    id: str                  = Field(..., description="Unique id of the case.")
+    prompt: str              = Field(..., description="The user prompt.")
+    metadata: Optional[str]  = Field(None, description="Metadata sent with the prompt. Defaults to the settings metadata.")
+
+
+class EvaluationResult(BaseModel):
+    """The outcome of one generation of one case with one prompt version."""
+    version: str        = Field(..., description="Developer prompt version.")
+    case: str           = Field(..., description="Evaluation case id.")
+    run: int            = Field(0, description="Repeat number of the case.")
+    latency: float      = Field(0.0, description="Generation latency in seconds.")
+    input_tokens: int   = Field(0, description="Input tokens used.")
+    output_tokens: int  = Field(0, description="Output tokens generated.")
+    total_tokens: int   = Field(0, description="Total tokens used.")
+    valid: bool         = Field(False, description="Whether the generated flow passed validation.")
+    error: Optional[str] = Field(None, description="Generation or validation error, if any.")
+
+
+class EvaluationSummary(BaseModel):
+    """Aggregated metrics of a prompt version."""
+    version: str             = Field(..., description="Developer prompt version.")
+    runs: int                = Field(0, description="Number of generations.")
+    validity_rate: float     = Field(0.0, description="Share of generations producing a valid flow.")
+    latency_p50: float       = Field(0.0, description="Median latency in seconds.")
+    latency_p90: float       = Field(0.0, description="90th percentile latency in seconds.")
+    latency_p99: float       = Field(0.0, description="99th percentile latency in seconds.")
+    mean_input_tokens: float = Field(0.0, description="Mean input tokens per generation.")
+    mean_output_tokens: float = Field(0.0, description="Mean output tokens per generation.")
+    regressions: List[str]   = Field(default_factory=list, description="Regressions against the previous stored run of the same mode.")
+
+
+class ReplayGenerator:
+    """
+    Stand-in for the OpenAI client which serves recorded generations.
+
+    Records are read from a JSON-lines file written by a live run with `--record`.
+    """
+
+    def __init__(self, path: Path, speed: float = 0.0):
+        """
+        Load recorded generations.
+
+        Args:
+            path (Path): JSON-lines file of recorded generations.
+            speed (float): Fraction of the recorded latency to wait before replying.
+        """
+        self.speed = speed
+        self.records: Dict[tuple, dict] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    # Recordings made before repeats were keyed hold a single run
+                    self.records[(record["version"], record["case"], record.get("run", 0))] = record
+
+    def generate(self, version: str, case: EvaluationCase, run: int = 0) -> dict:
+        record = self.records.get((version, case.id, run))
+        if record is None:
+            raise ValueError(f"No recorded generation for version '{version}', case '{case.id}' and run {run}")
+        if self.speed:
+            time.sleep(record["latency"] * self.speed)
+        return record
+
+
+def discover_prompt_versions() -> Dict[str, str]:
+    """
+    Return the available developer prompt versions.
+
+    Returns:
+        Dict[str, str]: The prompt text keyed by version: `settings` for the inline
+                        prompt of settings.yaml, and `v1`, `v2`, ... for the prompt files.
+    """
+    versions = {"settings": settings.developer_prompt}
+    for path in sorted(_PROMPTS_DIR_.glob("kestra_developer_prompt_*.md")):
+        versions[path.stem.rsplit("_", 1)[-1]] = path.read_text(encoding="utf-8")
+    return versions
+
+
+def load_suite(path: Optional[Path] = None) -> List[EvaluationCase]:
+    """Load the evaluation cases from a YAML suite file."""
+    content = yaml.safe_load(Path(path or _SUITE_FILE_).read_text(encoding="utf-8"))
+    return [EvaluationCase(**case) for case in content["cases"]]
+
+
+def _generate_live(client, version: str, developer_prompt: str, case: EvaluationCase, run: int = 0) -> dict:
+    """Generate a flow with the OpenAI client, without validating it."""
+    response = client.generate_kestra_flow(
+        user_input=case.prompt,
+        metadata=case.metadata if case.metadata is not None else settings.metadata,
+        developer_prompt=developer_prompt,
+        validate=False,
+    )
+    return {
+        "version": version,
+        "case": case.id,
+        "run": run,
+        "output": response.output,
+        "latency": response.execution_time,
+        "input_tokens": response.input_tokens,
+        "output_tokens": response.output_tokens,
+        "total_tokens": response.total_tokens,
+    }
+
+
+def _validate_output(output: str) -> Optional[str]:
+    """Validate a generated flow. Runs in a worker process; returns the error, if any."""
+    try:
+        validate_flow_bundle(output)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = (len(values) - 1) * percent / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(version: str, results: List[EvaluationResult]) -> EvaluationSummary:
+    """Aggregate the results of a prompt version."""
+    # Failed generations have no latency
+    latencies = [r.latency for r in results if r.latency]
+    return EvaluationSummary(
+        version=version,
+        runs=len(results),
+        validity_rate=(sum(r.valid for r in results) / len(results)) if results else 0.0,
+        latency_p50=_percentile(latencies, 50),
+        latency_p90=_percentile(latencies, 90),
+        latency_p99=_percentile(latencies, 99),
+        mean_input_tokens=(sum(r.input_tokens for r in results) / len(results)) if results else 0.0,
+        mean_output_tokens=(sum(r.output_tokens for r in results) / len(results)) if results else 0.0,
+    )
+
+
+def _find_regressions(current: EvaluationSummary, previous: dict) -> List[str]:
+    """Compare a summary with the same version's summary of a previous run."""
+    regressions = []
+    if current.validity_rate < previous["validity_rate"]:
+        regressions.append(f"validity {previous['validity_rate']:.0%} -> {current.validity_rate:.0%}")
+    for metric in ("latency_p50", "latency_p90", "mean_input_tokens", "mean_output_tokens"):
+        before, after = previous[metric], getattr(current, metric)
+        if before and after > before * (1 + _REGRESSION_THRESHOLD_):
+            regressions.append(f"{metric} {before:.2f} -> {after:.2f}")
+    return regressions
+
+
+def _latest_results(results_dir: Path, mode: str) -> Optional[dict]:
+    """Return the latest stored run of a mode, as live and replay latencies are not comparable."""
+    for path in sorted(results_dir.glob("results-*.json"), reverse=True):
+        results = json.loads(path.read_text(encoding="utf-8"))
+        if results.get("mode") == mode:
+            return results
+    return None
+
+
+def run_evaluation(
+    versions: Optional[List[str]] = None,
+    suite: Optional[Path] = None,
+    replay: Optional[Path] = None,
+    replay_speed: float = 0.0,
+    record: Optional[Path] = None,
+    repeats: int = 1,
+    max_workers: int = 4,
+    results_dir: Optional[Path] = None,
+) -> Dict[str, EvaluationSummary]:
+    """
+    Run the evaluation suite against developer prompt versions.
+
+    Args:
+        versions (Optional[List[str]]): Versions to evaluate. Defaults to all discovered versions.
+        suite (Optional[Path]): Suite file. Defaults to `prompts/eval_suite.yaml`.
+        replay (Optional[Path]): Serve recorded generations from this file instead of OpenAI.
+        replay_speed (float): Fraction of the recorded latency to wait in replay mode.
+        record (Optional[Path]): Append live generations to this replay file.
+        repeats (int): Number of generations per case and version.
+        max_workers (int): Number of concurrent generations.
+        results_dir (Optional[Path]): Directory storing the results. Defaults to `data/eval`.
+    Returns:
+        Dict[str, EvaluationSummary]: The summary of each version.
+    """
+    available = discover_prompt_versions()
+    versions = versions or list(available)
+    unknown = [version for version in versions if version not in available]
+    if unknown:
+        raise ValueError(f"Unknown prompt versions {unknown}. Available: {list(available)}")
+    cases = load_suite(suite)
+    results_dir = Path(results_dir or _RESULTS_DIR_)
+
+    if replay:
+        replayer = ReplayGenerator(replay, speed=replay_speed)
+        generate = lambda version, case, run: replayer.generate(version, case, run)
+    else:
+        client = get_kestrabot_client()
+        generate = lambda version, case, run: _generate_live(client, version, available[version], case, run)
+
+    jobs = [(version, case, run) for version in versions for case in cases for run in range(repeats)]
+    logging.info(f"Evaluating {len(versions)} prompt version(s) on {len(cases)} case(s), {len(jobs)} generation(s)")
+    start_time = time.time()
+
+    results: List[EvaluationResult] = []
+    records: List[dict] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as generators, ProcessPoolExecutor() as validators:
+        futures = {generators.submit(generate, version, case, run): (version, case, run) for version, case, run in jobs}
+        validations = []
+        for future in as_completed(futures):
+            version, case, run = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                results.append(EvaluationResult(version=version, case=case.id, run=run, error=str(e)))
+                continue
+            records.append(record)
+            result = EvaluationResult(
+                version=version,
+                case=case.id,
+                run=run,
+                latency=record["latency"],
+                input_tokens=record["input_tokens"],
+                output_tokens=record["output_tokens"],
+                total_tokens=record["total_tokens"],
+            )
+            # Validate in the process pool while other generations are still running
+            validations.append((result, validators.submit(_validate_output, record["output"])))
+        for result, validation in validations:
+            result.error = validation.result()
+            result.valid = result.error is None
+            results.append(result)
+
+    if record and not replay:
+        record.parent.mkdir(parents=True, exist_ok=True)
+        with open(record, "a", encoding="utf-8") as f:
+            for item in records:
+                f.write(json.dumps(item) + "\n")
+
+    mode = "replay" if replay else "live"
+    previous = _latest_results(results_dir, mode)
+    summaries = {}
+    for version in versions:
+        summary = summarize(version, [r for r in results if r.version == version])
+        if previous and version in previous["summary"]:
+            summary.regressions = _find_regressions(summary, previous["summary"][version])
+        summaries[version] = summary
+
+    results_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    output = {
+        "created_at": timestamp,
+        "mode": mode,
+        "model": settings.openai_model,
+        "elapsed": time.time() - start_time,
+        "summary": {version: summary.model_dump() for version, summary in summaries.items()},
+        "results": [result.model_dump() for result in results],
+    }
+    path = results_dir / f"results-{timestamp}.json"
+    path.write_text(json.dumps(output, indent=1), encoding="utf-8")
+    logging.info(f"Stored evaluation results in {path}")
+    return summaries
+
+
+def format_report(summaries: Dict[str, EvaluationSummary]) -> str:
+    """Format the version summaries as a text table."""
+    lines = [f"{'version':<10} {'runs':>5} {'valid':>6} {'p50':>7} {'p90':>7} {'p99':>7} {'in tok':>8} {'out tok':>8}"]
+    for summary in summaries.values():
+        lines.append(
+            f"{summary.version:<10} {summary.runs:>5} {summary.validity_rate:>6.0%} "
+            f"{summary.latency_p50:>6.2f}s {summary.latency_p90:>6.2f}s {summary.latency_p99:>6.2f}s "
+            f"{summary.mean_input_tokens:>8.0f} {summary.mean_output_tokens:>8.0f}"
+        )
+        for regression in summary.regressions:
+            lines.append(f"  REGRESSION: {regression}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate Kestra developer prompt versions")
+    parser.add_argument("--versions", nargs="*", default=None, help="Prompt versions to evaluate, e.g. settings v1 v2")
+    parser.add_argument("--suite", type=Path, default=None, help="Evaluation suite YAML file")
+    parser.add_argument("--replay", type=Path, default=None, help="Replay recorded generations from this JSON-lines file")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="Fraction of the recorded latency to wait in replay mode")
+    parser.add_argument("--record", type=Path, default=None, help="Record live generations to this JSON-lines file")
+    parser.add_argument("--repeats", type=int, default=1, help="Generations per case and version")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent generations")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.get_logging_level(), format="%(levelname)s: %(message)s")
+    summaries = run_evaluation(
+        versions=args.versions,
+        suite=args.suite,
+        replay=args.replay,
+        replay_speed=args.replay_speed,
+        record=args.record,
+        repeats=args.repeats,
+        max_workers=args.workers,
+    )
+    print(format_report(summaries))
+
+
+if __name__ == "__main__":
+    main()
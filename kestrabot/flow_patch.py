@@ -0,0 +1,97 @@
+"""
+Kestra Flow Patch Module
+
+This module provides the structured patch format used by the flow edit mode. Instead of
+regenerating an entire Kestra Flow YAML for small changes, the model returns a list of
+search/replace edits which are applied locally, validated, and displayed as a diff.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import difflib
+from typing import List
+from pydantic import BaseModel, Field
+
+
+__all__ = [
+    "KestraFlowEdit",
+    "KestraFlowPatch",
+    "KESTRA_PATCH_INSTRUCTIONS",
+    "apply_flow_patch",
+    "flow_diff",
+]
+
+
+KESTRA_PATCH_INSTRUCTIONS = """
+# Edit Mode
+You are editing an existing Kestra YAML flow. The current flow is provided inside <current-flow> tags and the requested change inside <change-request> tags.
+These rules override the output format rules above:
+- Do NOT output the full flow. Output only a patch: a list of search/replace edits.
+- Each `search` must be an exact, verbatim snippet of the current flow (including indentation) that occurs exactly once.
+- Keep each `search` as small as possible while still being unique. Include whole lines only.
+- `replace` is the new text for that snippet. Use an empty `replace` to delete the snippet.
+- To insert new content, search for the line just before the insertion point and repeat it at the start of `replace`.
+- Edits are applied in order. The patched flow must remain valid Kestra YAML.
+- Put a one-sentence description of the change in `summary`.
+"""
+
+
+class KestraFlowEdit(BaseModel):
+    """A single search/replace edit on a Kestra Flow YAML document."""
+    search: str  = Field(..., description="Exact snippet of the current flow to replace. Must occur exactly once.")
+    replace: str = Field(..., description="Replacement text for the snippet. Empty to delete it.")
+
+
+class KestraFlowPatch(BaseModel):
+    """A structured patch returned by the model in edit mode."""
+    summary: str                = Field(..., description="One sentence describing the change.")
+    edits: List[KestraFlowEdit] = Field(..., description="Ordered list of search/replace edits to apply to the flow.")
+
+
+def apply_flow_patch(flow: str, patch: KestraFlowPatch) -> str:
+    """
+    Apply a structured patch to a Kestra Flow YAML document.
+
+    Args:
+        flow (str): The current Kestra Flow YAML content.
+        patch (KestraFlowPatch): The patch to apply.
+    Returns:
+        str: The patched Kestra Flow YAML content.
+    Raises:
+        ValueError: If the patch is empty or an edit cannot be applied unambiguously.
+    """
+    if not patch.edits:
+        raise ValueError("Patch does not contain any edits")
+
+    patched = flow
+    for index, edit in enumerate(patch.edits, start=1):
+        if not edit.search:
+            raise ValueError(f"Edit {index}: search text cannot be empty")
+        occurrences = patched.count(edit.search)
+        if occurrences == 0:
+            raise ValueError(f"Edit {index}: search text not found in flow:\n{edit.search}")
+        if occurrences > 1:
+            raise ValueError(f"Edit {index}: search text is ambiguous, found {occurrences} times:\n{edit.search}")
+        patched = patched.replace(edit.search, edit.replace, 1)
+    return patched
+
+
+def flow_diff(old: str, new: str, context: int = 3) -> str:
+    """
+    Return a unified diff between two versions of a Kestra Flow YAML document.
+
+    Args:
+        old (str): The original flow content.
+        new (str): The modified flow content.
+        context (int): Number of context lines around each change.
+    Returns:
+        str: The unified diff, or an empty string if the flows are identical.
+    """
+    diff = difflib.unified_diff(
+        old.splitlines(keepends=True),
+        new.splitlines(keepends=True),
+        fromfile="current",
+        tofile="modified",
+        n=context,
+    )
+    return "".join(diff)
@@ -0,0 +1,284 @@
+"""
+Kestra Bot Workspace Janitor Module
+
+This module keeps the local workspace directories (`data/tmp` and the Kestra task working
+directories under `data/kestra-wd/tmp`) from growing without bound. Each directory is
+scanned with `os.scandir`, its top-level entries, e.g. one per task run, are matched
+against age, size and count retention policies, and the expired entries are deleted in
+parallel. Recently modified entries, e.g. of running tasks, are always kept. A dry run only reports the disk usage and what would be deleted.
+The janitor can run periodically in the background of the app or from the command line.
+
+Usage:
+    python -m kestrabot.janitor [data/tmp data/kestra-wd/tmp] [--max-age-days 7] [--dry-run]
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import os
+import time
+import shutil
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+from pydantic import BaseModel, Field
+
+from kestrabot.settings import settings
+
+
+__all__ = [
+    "RetentionPolicy",
+    "JanitorEntry",
+    "JanitorReport",
+    "scan_directory",
+    "select_expired",
+    "delete_entries",
+    "run_janitor",
+]
+
+
+_DELETE_BATCH_SIZE_ = 256
+
+
+class RetentionPolicy(BaseModel):
+    """Retention policy applied to the top-level entries of a directory."""
+    max_age_days: Optional[float] = Field(None, description="Delete entries not modified for this many days.")
+    max_size_mb: Optional[float]  = Field(None, description="Delete the oldest entries until the directory fits in this size.")
+    max_entries: Optional[int]    = Field(None, description="Keep at most this many of the newest entries.")
+    min_age_minutes: float        = Field(10.0, description="Always keep entries modified this recently, e.g. of running tasks.")
+
+    @classmethod
+    def from_settings(cls) -> "RetentionPolicy":
+        """Build the policy configured in settings."""
+        return cls(
+            max_age_days=settings.janitor_max_age_days,
+            max_size_mb=settings.janitor_max_size_mb,
+            max_entries=settings.janitor_max_entries,
+        )
+
+
+class JanitorEntry(BaseModel):
+    """A top-level file or directory of a cleaned directory."""
+    path: str       = Field(..., description="Path of the entry.")
+    is_dir: bool    = Field(False, description="Whether the entry is a directory.")
+    size: int       = Field(0, description="Total size in bytes, including directory contents.")
+    files: int      = Field(1, description="Number of files, including directory contents.")
+    mtime: float    = Field(0.0, description="Latest modification time of the entry or its contents.")
+
+
+class JanitorReport(BaseModel):
+    """Result of cleaning a single directory."""
+    directory: str      = Field(..., description="The cleaned directory.")
+    entries: int        = Field(0, description="Number of top-level entries scanned.")
+    files: int          = Field(0, description="Number of files scanned.")
+    size: int           = Field(0, description="Disk usage of the directory in bytes before cleaning.")
+    deleted: int        = Field(0, description="Number of top-level entries deleted, or to delete in a dry run.")
+    freed: int          = Field(0, description="Bytes freed, or to free in a dry run.")
+    errors: int         = Field(0, description="Number of entries which could not be deleted.")
+    dry_run: bool       = Field(False, description="Whether the run only reported what would be deleted.")
+    elapsed: float      = Field(0.0, description="Time spent in seconds.")
+
+    def __str__(self) -> str:
+        action = "would delete" if self.dry_run else "deleted"
+        line = (
+            f"{self.directory}: {self.entries} entries, {self.files} files, {self.size / 1024 / 1024:.1f}MB; "
+            f"{action} {self.deleted} entries ({self.freed / 1024 / 1024:.1f}MB) in {self.elapsed:.2f}s"
+        )
+        return line + (f", {self.errors} errors" if self.errors else "")
+
+
+def _scan_entry(entry: os.DirEntry) -> JanitorEntry:
+    """Measure a top-level entry, walking directories with `os.scandir` without following links."""
+    stat = entry.stat(follow_symlinks=False)
+    if not entry.is_dir(follow_symlinks=False):
+        return JanitorEntry(path=entry.path, size=stat.st_size, mtime=stat.st_mtime)
+
+    size, files, mtime = 0, 0, stat.st_mtime
+    stack = [entry.path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for child in it:
+                    try:
+                        child_stat = child.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    mtime = max(mtime, child_stat.st_mtime)
+                    if child.is_dir(follow_symlinks=False):
+                        stack.append(child.path)
+                    else:
+                        size += child_stat.st_size
+                        files += 1
+        except OSError as e:
+            logging.debug(f"Cannot scan {entry.path}: {str(e)}")
+    return JanitorEntry(path=entry.path, is_dir=True, size=size, files=files, mtime=mtime)
+
+
+def scan_directory(directory: Union[str, Path], max_workers: Optional[int] = None) -> List[JanitorEntry]:
+    """
+    Scan the top-level entries of a directory, measuring sub-directories in parallel.
+
+    Args:
+        directory (Union[str, Path]): The directory to scan.
+        max_workers (Optional[int]): Maximum number of entries measured at the same time.
+    Returns:
+        List[JanitorEntry]: The entries, newest first.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except FileNotFoundError:
+        return []
+
+    def scan(entry: os.DirEntry) -> Optional[JanitorEntry]:
+        try:
+            return _scan_entry(entry)
+        except OSError:
+            # Removed while scanning
+            return None
+
+    # Files are measured inline, only directory walks are worth a thread
+    directories = [entry for entry in entries if entry.is_dir(follow_symlinks=False)]
+    scanned = [scan(entry) for entry in entries if not entry.is_dir(follow_symlinks=False)]
+    if directories:
+        with ThreadPoolExecutor(max_workers=max_workers or settings.janitor_max_workers) as executor:
+            scanned.extend(executor.map(scan, directories))
+    return sorted((entry for entry in scanned if entry is not None), key=lambda entry: entry.mtime, reverse=True)
+
+
+def select_expired(entries: List[JanitorEntry], policy: RetentionPolicy, now: Optional[float] = None) -> List[JanitorEntry]:
+    """
+    Select the entries a retention policy does not keep.
+
+    Entries are kept newest first while they are younger than `max_age_days`, fewer than
+    `max_entries` and fit in `max_size_mb`; every other entry expires. Entries modified
+    within `min_age_minutes` are always kept.
+
+    Args:
+        entries (List[JanitorEntry]): The entries, newest first.
+        policy (RetentionPolicy): The retention policy.
+        now (Optional[float]): Reference time. Defaults to the current time.
+    Returns:
+        List[JanitorEntry]: The expired entries.
+    """
+    now = now or time.time()
+    min_mtime = now - policy.max_age_days * 86400 if policy.max_age_days is not None else None
+    max_size = policy.max_size_mb * 1024 * 1024 if policy.max_size_mb is not None else None
+    active_mtime = now - policy.min_age_minutes * 60
+    expired, kept, kept_size, full = [], 0, 0, False
+    for entry in entries:
+        if entry.mtime >= active_mtime:
+            kept += 1
+            kept_size += entry.size
+            continue
+        # Once the size limit is reached, every older entry expires too
+        full = full or (max_size is not None and kept_size + entry.size > max_size)
+        if (
+            full
+            or (min_mtime is not None and entry.mtime < min_mtime)
+            or (policy.max_entries is not None and kept >= policy.max_entries)
+        ):
+            expired.append(entry)
+        else:
+            kept += 1
+            kept_size += entry.size
+    return expired
+
+
+def _delete_entry(entry: JanitorEntry) -> bool:
+    try:
+        if entry.is_dir:
+            shutil.rmtree(entry.path)
+        else:
+            os.unlink(entry.path)
+        return True
+    except FileNotFoundError:
+        return True
+    except OSError as e:
+        logging.warning(f"Cannot delete {entry.path}: {str(e)}")
+        return False
+
+
+def delete_entries(entries: List[JanitorEntry], max_workers: Optional[int] = None) -> int:
+    """
+    Delete entries in parallel.
+
+    Args:
+        entries (List[JanitorEntry]): The entries to delete.
+        max_workers (Optional[int]): Maximum number of entries deleted at the same time.
+    Returns:
+        int: Number of entries which could not be deleted.
+    """
+    if not entries:
+        return 0
+    # Files are deleted in batches to keep the per-task overhead low, directories one by one
+    files = [entry for entry in entries if not entry.is_dir]
+    batches = [files[i:i + _DELETE_BATCH_SIZE_] for i in range(0, len(files), _DELETE_BATCH_SIZE_)]
+    batches += [[entry] for entry in entries if entry.is_dir]
+    with ThreadPoolExecutor(max_workers=max_workers or settings.janitor_max_workers) as executor:
+        return sum(executor.map(lambda batch: sum(not _delete_entry(entry) for entry in batch), batches))
+
+
+def run_janitor(
+    directories: Optional[Iterable[Union[str, Path]]] = None,
+    policy: Optional[RetentionPolicy] = None,
+    dry_run: bool = False,
+    max_workers: Optional[int] = None,
+) -> List[JanitorReport]:
+    """
+    Apply a retention policy to workspace directories.
+
+    Args:
+        directories (Optional[Iterable[Union[str, Path]]]): Directories to clean. Defaults to settings.
+        policy (Optional[RetentionPolicy]): Retention policy. Defaults to settings.
+        dry_run (bool): Only report disk usage and what would be deleted.
+        max_workers (Optional[int]): Maximum number of parallel scans and deletes. Defaults to settings.
+    Returns:
+        List[JanitorReport]: One report per directory.
+    """
+    directories = settings.janitor_dirs if directories is None else directories
+    policy = policy or RetentionPolicy.from_settings()
+    reports = []
+    for directory in directories:
+        start_time = time.time()
+        entries = scan_directory(directory, max_workers)
+        expired = select_expired(entries, policy)
+        errors = 0 if dry_run else delete_entries(expired, max_workers)
+        # Only count what is actually gone
+        freed = expired if dry_run or not errors else [entry for entry in expired if not os.path.lexists(entry.path)]
+        report = JanitorReport(
+            directory=str(directory),
+            entries=len(entries),
+            files=sum(entry.files for entry in entries),
+            size=sum(entry.size for entry in entries),
+            deleted=len(expired) - errors,
+            freed=sum(entry.size for entry in freed),
+            errors=errors,
+            dry_run=dry_run,
+            elapsed=time.time() - start_time,
+        )
+        logging.info(f"Janitor: {report}")
+        reports.append(report)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply retention policies to the workspace directories")
+    parser.add_argument("directories", nargs="*", type=Path, help="Directories to clean. Defaults to settings")
+    parser.add_argument("--max-age-days", type=float, default=None, help="Delete entries not modified for this many days")
+    parser.add_argument("--max-size-mb", type=float, default=None, help="Delete the oldest entries above this directory size")
+    parser.add_argument("--max-entries", type=int, default=None, help="Keep at most this many of the newest entries")
+    parser.add_argument("--dry-run", action="store_true", help="Only report disk usage and what would be deleted")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.get_logging_level(), format="%(levelname)s: %(message)s")
+    policy = RetentionPolicy.from_settings()
+    if args.max_age_days is not None or args.max_size_mb is not None or args.max_entries is not None:
+        policy = RetentionPolicy(max_age_days=args.max_age_days, max_size_mb=args.max_size_mb, max_entries=args.max_entries)
+    for report in run_janitor(args.directories or None, policy=policy, dry_run=args.dry_run):
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
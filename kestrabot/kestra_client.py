@@ -0,0 +1,181 @@
+"""
+Kestra API Client Module
+
+This module provides a thin client for the Kestra server REST API. It keeps a single
+pooled HTTP connection pool for the whole application so that catalog exports,
+deployments and validations reuse connections instead of opening new ones per call.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import logging
+from typing import Any, Optional
+import httpx
+
+from kestrabot.settings import settings
+
+
+class KestraClient:
+    """
+    Kestra REST API client wrapper.
+
+    This class wraps a pooled `httpx.Client` pointed at the Kestra server configured in
+    settings, and builds tenant-aware API paths.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        tenant: Optional[str] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        timeout: float = 30.0,
+    ):
+        """
+        Initialize the Kestra API client.
+
+        Args:
+            url (Optional[str]): Kestra server URL. Defaults to `settings.kestra_url`.
+            tenant (Optional[str]): Kestra tenant. Defaults to `settings.kestra_tenant`.
+            username (Optional[str]): Basic auth user name, if basic auth is enabled.
+            password (Optional[str]): Basic auth password, if basic auth is enabled.
+            max_connections (Optional[int]): Size of the connection pool.
+            timeout (float): Request timeout in seconds.
+        """
+        self.url = (url or settings.kestra_url).rstrip("/")
+        self.tenant = settings.kestra_tenant if tenant is None else tenant
+        username = username or settings.kestra_username
+        password = password or settings.kestra_password
+        max_connections = max_connections or settings.kestra_max_connections
+        self.http = httpx.Client(
+            base_url=self.url,
+            auth=(username, password) if username and password else None,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+        logging.info(f"Kestra API client initialized for {self.url}")
+
+    def api_path(self, path: str, tenant: bool = True) -> str:
+        """
+        Build an API path, including the tenant segment when configured.
+
+        Args:
+            path (str): Path relative to the API root, e.g. `flows/validate`.
+            tenant (bool): Whether the endpoint is tenant-scoped.
+        Returns:
+            str: The absolute API path.
+        """
+        path = path.lstrip("/")
+        if tenant and self.tenant:
+            return f"/api/v1/{self.tenant}/{path}"
+        return f"/api/v1/{path}"
+
+    def get_json(self, path: str, tenant: bool = True, **params) -> Any:
+        """Send a GET request and return the decoded JSON body."""
+        response = self.http.get(self.api_path(path, tenant=tenant), params=params or None)
+        response.raise_for_status()
+        return response.json()
+
+    def list_plugins(self) -> list:
+        """List the plugins installed on the Kestra server."""
+        return self.get_json("plugins", tenant=False)
+
+    def get_plugin(self, cls: str) -> dict:
+        """Get the documentation and JSON schema of a plugin class."""
+        return self.get_json(f"plugins/{cls}", tenant=False)
+
+    def export_flows(self, namespace: str) -> bytes:
+        """Export the YAML source of all flows of a namespace as a zip archive."""
+        response = self.http.get(self.api_path("flows/export/by-query"), params={"namespace": namespace})
+        response.raise_for_status()
+        return response.content
+
+    def update_namespace_flows(self, namespace: str, source: str, delete: bool = False) -> list:
+        """
+        Create or update many flows of a namespace in a single request.
+
+        Args:
+            namespace (str): The target namespace.
+            source (str): Multi-document YAML with the flows to create or update.
+            delete (bool): Whether to delete flows of the namespace missing from the source.
+        Returns:
+            list: The flows returned by the server.
+        """
+        response = self.http.post(
+            self.api_path(f"flows/{namespace}"),
+            params={"delete": str(delete).lower()},
+            content=source.encode("utf-8"),
+            headers={"Content-Type": "application/x-yaml"},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def validate_flows(self, source: str) -> list:
+        """
+        Validate flows on the server without saving them.
+
+        Args:
+            source (str): Multi-document YAML with the flows to validate.
+        Returns:
+            list: One constraint violation report per flow, with `constraints` set when the flow is invalid.
+        """
+        response = self.http.post(
+            self.api_path("flows/validate"),
+            content=source.encode("utf-8"),
+            headers={"Content-Type": "application/x-yaml"},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def get_execution(self, execution_id: str) -> dict:
+        """Get an execution with its task runs and outputs."""
+        return self.get_json(f"executions/{execution_id}")
+
+    def get_file_metas(self, execution_id: str, uri: str) -> dict:
+        """Get the metadata, e.g. the size, of an execution file in the internal storage."""
+        response = self.http.get(self.api_path(f"executions/{execution_id}/file/metas"), params={"path": uri})
+        response.raise_for_status()
+        return response.json()
+
+    def stream_file(self, execution_id: str, uri: str, offset: int = 0):
+        """
+        Stream an execution file from the internal storage.
+
+        Args:
+            execution_id (str): The execution owning the file.
+            uri (str): The `kestra://` URI of the file.
+            offset (int): Byte offset to resume from, sent as a `Range` header.
+        Returns:
+            A context manager yielding the streamed `httpx.Response`.
+        """
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        return self.http.stream(
+            "GET",
+            self.api_path(f"executions/{execution_id}/file"),
+            params={"path": uri},
+            headers=headers,
+        )
+
+    def close(self) -> None:
+        """Close the underlying connection pool."""
+        self.http.close()
+
+
+kestra_client: Optional[KestraClient] = None
+
+
+def get_kestra_client() -> KestraClient:
+    """
+    Get the global Kestra API client instance.
+
+    This function initializes the KestraClient if it has not been created yet, so that
+    the whole application shares a single connection pool.
+
+    Returns:
+        KestraClient: The initialized Kestra API client instance.
+    """
+    global kestra_client
+    if kestra_client is None:
+        kestra_client = KestraClient()
+    return kestra_client
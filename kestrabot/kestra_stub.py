@@ -0,0 +1,172 @@
+"""
+Kestra Stand-in Server Module
+
+This module provides a small stand-in for the Kestra server API, built on the standard
+library HTTP server, so that flow validation can be developed and checked without a
+running Kestra instance. It answers `POST /api/v1[/<tenant>]/flows/validate` with the
+same report structure as Kestra, applying the basic structural checks Kestra performs,
+and can add an artificial latency to mimic a remote server.
+
+Usage:
+    python -m kestrabot.kestra_stub [--port 8099] [--latency 0.2]
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import re
+import json
+import time
+import yaml
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+from kestrabot.settings import settings
+
+
+__all__ = [
+    "KestraStubServer",
+    "validate_flow_documents",
+    "start_stub_server",
+]
+
+
+_VALIDATE_PATH_ = re.compile(r"^/api/v1(?:/[\w-]+)?/flows/validate/?$")
+_ID_PATTERN_ = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9._-]*$")
+
+
+def _task_constraints(tasks, path: str, seen: set) -> List[str]:
+    """Check a list of tasks and their nested tasks."""
+    if not isinstance(tasks, list) or not tasks:
+        return [f"{path}: must not be empty"]
+    constraints = []
+    for index, task in enumerate(tasks):
+        location = f"{path}[{index}]"
+        if not isinstance(task, dict):
+            constraints.append(f"{location}: must be a task")
+            continue
+        task_id = task.get("id")
+        if not task_id or not _ID_PATTERN_.match(str(task_id)):
+            constraints.append(f"{location}.id: must match \"{_ID_PATTERN_.pattern}\"")
+        elif task_id in seen:
+            constraints.append(f"{location}.id: duplicate task id '{task_id}'")
+        seen.add(task_id)
+        if not task.get("type"):
+            constraints.append(f"{location}.type: must not be null")
+        for key in ("tasks", "then", "else", "errors", "finally"):
+            if key in task:
+                constraints.extend(_task_constraints(task[key], f"{location}.{key}", seen))
+    return constraints
+
+
+def validate_flow_documents(source: str) -> List[dict]:
+    """
+    Validate a multi-document flow source the way the Kestra validation endpoint reports it.
+
+    Args:
+        source (str): Multi-document YAML with the flows to validate.
+    Returns:
+        List[dict]: One report per document, with `constraints` set when the flow is invalid.
+    """
+    try:
+        documents = list(yaml.safe_load_all(source))
+    except yaml.YAMLError as e:
+        return [{"index": 0, "constraints": f"Invalid YAML: {str(e)}", "outdated": False, "warnings": [], "infos": []}]
+
+    reports = []
+    for index, flow in enumerate(document for document in documents if document is not None):
+        report = {"index": index, "outdated": False, "warnings": [], "infos": [], "deprecationPaths": []}
+        if not isinstance(flow, dict):
+            report["constraints"] = "flow: must be a mapping"
+            reports.append(report)
+            continue
+        report["flow"], report["namespace"] = flow.get("id"), flow.get("namespace")
+        constraints = []
+        for key in ("id", "namespace"):
+            if not flow.get(key) or not _ID_PATTERN_.match(str(flow[key])):
+                constraints.append(f"{key}: must match \"{_ID_PATTERN_.pattern}\"")
+        constraints.extend(_task_constraints(flow.get("tasks"), "tasks", set()))
+        if constraints:
+            report["constraints"] = "\n".join(constraints)
+        reports.append(report)
+    return reports
+
+
+class KestraStubServer(ThreadingHTTPServer):
+    """Stand-in Kestra server counting the requests it served."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.0):
+        super().__init__(address, _KestraStubHandler)
+        self.latency = latency
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _KestraStubHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        self.server.requests += 1
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+        if not _VALIDATE_PATH_.match(self.path.split("?")[0]):
+            self._send(404, {"message": f"Not found: {self.path}"})
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self._send(200, validate_flow_documents(body))
+
+    def _send(self, status: int, payload) -> None:
+        content = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Kestra stub: {format % args}")
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0) -> KestraStubServer:
+    """
+    Start a stand-in Kestra server in a background thread.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on. 0 picks a free port.
+        latency (float): Artificial latency in seconds added to every validation.
+    Returns:
+        KestraStubServer: The running server. Call `shutdown()` to stop it.
+    """
+    server = KestraStubServer((host, port), latency=latency)
+    threading.Thread(target=server.serve_forever, name="kestra-stub", daemon=True).start()
+    logging.info(f"Kestra stand-in server listening on {server.url}")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stand-in Kestra server for flow validation")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8099, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial latency in seconds per validation")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.get_logging_level(), format="%(levelname)s: %(message)s")
+    server = KestraStubServer((args.host, args.port), latency=args.latency)
+    print(f"Kestra stand-in server listening on {server.url}, set kestra_url to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,8 @@ Kestra Demo OpenAI Integration Module
 
 This module provides integration with OpenAI's API for generating Kestra Flow YAML
 configurations from user prompts. It utilizes OpenAI's responses API with a
-pre-configured prompt for Kestra flow generation.
+pre-configured prompt for Kestra flow generation. Requests are routed to the generation
+backends configured in settings, e.g. a local OpenAI-compatible model server.
 
 Author: Parham (parham.parvizi@gmail.com)
 """
@@ -13,11 +14,22 @@ import os
 import yaml
 import time
 import logging
+import threading
 from typing import Optional
 from pydantic import BaseModel, Field, field_validator
-from openai import OpenAI
+from openai import OpenAI, BadRequestError, NotFoundError
 
 from kestrabot.settings import settings
+from kestrabot.backends import BackendRouter, GenerationBackend
+from kestrabot.search_policy import WebSearchDecision, get_search_policy
+from kestrabot.flow_patch import (
+    KestraFlowPatch,
+    KESTRA_PATCH_INSTRUCTIONS,
+    apply_flow_patch,
+    flow_diff,
+)
+from kestrabot.decompose import KestraFlowPlan, KESTRA_DECOMPOSE_INSTRUCTIONS
+from kestrabot.plugin_catalog import validate_flow_plugins
 
 
 # Load OpenAI API key from environment variable: $KESTRABOT_OPENAI_API_KEY
@@ -27,6 +39,14 @@ KESTRABOT_OPENAI_API_KEY = os.getenv("KESTRABOT_OPENAI_API_KEY", None)
 KESTRA_PROMPT_ID = "pmpt_686e75a5f28c8193b1100b441bcdca320f2c2115eba99734"
 KESTRA_PROMPT_VERSION = "7"
 
+# Instructions are not carried over by `previous_response_id`, so chained refinements
+# send this short reminder instead of the full developer prompt
+KESTRA_REFINE_INSTRUCTIONS = (
+    "You are refining the Kestra flow from your previous answer. Apply the requested change, "
+    "keep every other part of the flow and follow the same rules as before. "
+    "Return only the complete updated Kestra flow YAML."
+)
+
 
 class KestraBotFlowResponse(BaseModel):
     """
@@ -44,7 +64,16 @@ class KestraBotFlowResponse(BaseModel):
     output_tokens: int      = Field(..., description="The number of output tokens generated in the response.")
     total_tokens: int       = Field(..., description="The total number of tokens used (input + output).")
     model: str              = Field(..., description="The OpenAI model used for generating the response.")
+    backend: Optional[str]  = Field(None, description="The generation backend which served the request.")
     execution_time: Optional[float] = Field(0.0, description="Optional execution time for the OpenAI API call in seconds.")
+    diff: Optional[str]     = Field("", description="Unified diff between the previous and the modified flow, when generated in edit mode.")
+    previous_response_id: Optional[str] = Field(None, description="The response a refinement was chained to, if it was not sent as a fresh request.")
+    cached_tokens: int      = Field(0, description="The number of input tokens served from the prompt cache.")
+    input_bytes: int        = Field(0, description="The size in bytes of the instructions and input sent in the request.")
+    context_bytes: int      = Field(0, description="The size in bytes a fresh request with the full context would have sent.")
+    web_search: bool        = Field(False, description="Whether the web search tool was attached to the request.")
+    web_search_reason: str  = Field("", description="Why the web search tool was attached or not.")
+    web_search_calls: int   = Field(0, description="The number of web searches the model ran.")
 
     @field_validator("type")
     def validate_type(cls, v):
@@ -81,10 +110,52 @@ class KestraBotOpenAIClient:
                 "or set the OPENAI_API_KEY environment variable."
             )
         logging.info(f"Found OpenAI API key: '{'*' * 4}{api_key[-6:]}'")
-        self.client = OpenAI(api_key=api_key)
-        logging.info("Kestra OpenAI client initialized successfully")
-    
-    def generate_kestra_flow(self, user_input: str, metadata: Optional[str] = None) -> KestraBotFlowResponse:
+        self.router = BackendRouter(api_key=api_key)
+        logging.info(f"Kestra OpenAI client initialized successfully with backends: {', '.join(self.router.backends)}")
+
+    @property
+    def client(self) -> OpenAI:
+        """The OpenAI SDK client of the default generation backend."""
+        return self.router.get().client
+
+    def warm_up(self) -> None:
+        """
+        Open a connection to every routed generation backend ahead of the first generation.
+
+        This sends a cheap model lookup so that the DNS resolution and TLS handshake
+        are done and the connection is kept in the backend's pool for the first build.
+        Failures are logged and otherwise ignored.
+        """
+        names = {self.router.default, *(route.backend for route in self.router.routes)}
+        for name in sorted(names):
+            try:
+                self.router.get(name).warm_up()
+            except Exception as e:
+                logging.warning(f"Could not pre-warm backend '{name}': {str(e)}")
+
+    def _web_search(self, generation_backend: GenerationBackend, user_input: str, metadata: Optional[str], override: Optional[bool]) -> WebSearchDecision:
+        """Decide whether the request uses the web search tool, where the backend supports it."""
+        decision = get_search_policy().decide(user_input, metadata, override)
+        if decision.use_search and not generation_backend.config.web_search:
+            decision = WebSearchDecision(use_search=False, reason=f"not supported by backend '{generation_backend.name}'")
+        logging.info(f"Web search {decision}")
+        return decision
+
+    def _backend(self, operation: str, user_input: str, metadata: Optional[str], backend: Optional[str]) -> GenerationBackend:
+        """Return the requested backend, or the one the routing rules pick for the request."""
+        if backend:
+            return self.router.get(backend)
+        return self.router.route(operation, user_input, metadata)
+
+    def generate_kestra_flow(
+        self,
+        user_input: str,
+        metadata: Optional[str] = None,
+        developer_prompt: Optional[str] = None,
+        validate: bool = True,
+        backend: Optional[str] = None,
+        web_search: Optional[bool] = None,
+    ) -> KestraBotFlowResponse:
         """
         Generate a Kestra Flow YAML from user input.
         
@@ -96,6 +167,14 @@ class KestraBotOpenAIClient:
                             Kestra flow to accomplish.
             metadata (Optional[str]): Additional metadata information such as
                                     table schemas, data definitions, credentials, etc.
+            developer_prompt (Optional[str]): Developer prompt to use instead of the one
+                                    in settings, e.g. when evaluating prompt versions.
+            validate (bool): Whether to validate the generated YAML. When False, the
+                                    output is only cleaned of markdown formatting.
+            backend (Optional[str]): Name of the generation backend to use instead of
+                                    the one picked by the routing rules.
+            web_search (Optional[bool]): Force the web search tool on or off instead of
+                                    letting the web search policy decide.
         
         Returns:
             KestraFlowResponse: A response object containing the generated YAML and metadata.
@@ -129,13 +208,16 @@ class KestraBotOpenAIClient:
             )
 
         # Validate the developer prompt
-        if not settings.developer_prompt or not settings.developer_prompt.strip():
+        developer_prompt = developer_prompt or settings.developer_prompt
+        if not developer_prompt or not developer_prompt.strip():
             raise ValueError("Developer prompt is not set. Please configure it in settings. You can see the latest version under prompts/developer_prompt_v2.md")
         
-        # Set the OpenAI model
-        model = settings.openai_model or "o4-mini"
-        
         try:
+            # Pick the generation backend and model
+            generation_backend = self._backend("generate", user_input, metadata, backend)
+            model = generation_backend.model(settings.openai_model)
+            search = self._web_search(generation_backend, user_input, metadata, web_search)
+
             logging.info(f"Generating Kestra flow for user input:\n{user_input[:100]}\n...")
             start_time = time.time()
             
@@ -153,13 +235,12 @@ class KestraBotOpenAIClient:
             #     store=False,
             #     tools=[{"type": "web_search_preview", "search_context_size": "medium",}],
             # )
-            response = self.client.responses.create(
-                model=model,
-                instructions=settings.developer_prompt,
+            response = generation_backend.create(
+                instructions=developer_prompt,
                 input=input_data,
-                reasoning={"effort": "medium", "summary": "auto"} if model.startswith("o4-") else None,
-                tools=[{"type": "web_search_preview", "search_context_size": "medium"}],
-                store=True,
+                model=model,
+                effort="medium",
+                web_search=search.use_search,
             )
             
             # Calculate execution time
@@ -170,22 +251,21 @@ class KestraBotOpenAIClient:
             if not generated_content:
                 raise Exception("Could not extract output text content from OpenAI response")
             # Validate and cleanup response into valid Kestra YAML
-            generated_content = self.validate_response_yaml(generated_content)
+            if validate:
+                generated_content = self.validate_response_yaml(generated_content)
+            else:
+                generated_content = clean_response_yaml(generated_content)
 
             # Extract token usage information safely
-            input_tokens = 0
-            output_tokens = 0
-            total_tokens = 0
-            if response.usage:
-                input_tokens = getattr(response.usage, 'input_tokens', 0)
-                output_tokens = getattr(response.usage, 'output_tokens', 0)
-                total_tokens = getattr(response.usage, 'total_tokens', 0)
+            input_tokens, output_tokens, total_tokens = self._get_token_usage(response)
             
             # Extract model information safely
             model = getattr(response, 'model', 'unknown')
+            input_bytes = len(developer_prompt.encode("utf-8")) + len(input_data.encode("utf-8"))
+            get_search_policy().record(search.use_search, execution_time, total_tokens)
             
             logging.info(f"Token usage - Input: {input_tokens}, Output: {output_tokens}, Total: {total_tokens}")
-            logging.info(f"Execution time: {execution_time:.2f} seconds")
+            logging.info(f"Execution time: {execution_time:.2f} seconds on backend '{generation_backend.name}'")
             logging.info("Kestra flow generated successfully")
             
             # Construct and return KestraFlowResponse object
@@ -199,7 +279,14 @@ class KestraBotOpenAIClient:
                 output_tokens=output_tokens,
                 total_tokens=total_tokens,
                 model=model,
-                execution_time=execution_time
+                execution_time=execution_time,
+                backend=generation_backend.name,
+                cached_tokens=response.cached_tokens,
+                input_bytes=input_bytes,
+                context_bytes=input_bytes,
+                web_search=search.use_search,
+                web_search_reason=search.reason,
+                web_search_calls=response.web_search_calls,
             )
             # interested__events = {
             #     'response.created',
@@ -263,6 +350,354 @@ class KestraBotOpenAIClient:
             logging.error(f"Error generating Kestra flow: {str(e)}")
             raise Exception(f"Failed to generate Kestra flow: {str(e)}")
     
+    def modify_kestra_flow(
+        self,
+        flow: str,
+        change_request: str,
+        metadata: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> KestraBotFlowResponse:
+        """
+        Modify an existing Kestra Flow YAML using a structured patch.
+
+        Instead of regenerating the entire flow, the model is asked for a list of
+        search/replace edits which are applied locally. The patched flow is validated
+        and returned together with a unified diff against the current flow.
+
+        Args:
+            flow (str): The current Kestra Flow YAML content.
+            change_request (str): The user's description of the change to make.
+            metadata (Optional[str]): Additional metadata information such as
+                                    table schemas, data definitions, credentials, etc.
+            backend (Optional[str]): Name of the generation backend to use instead of
+                                    the one picked by the routing rules.
+
+        Returns:
+            KestraBotFlowResponse: A response object containing the patched YAML and the diff.
+
+        Raises:
+            ValueError: If the flow or change request is empty.
+            Exception: If OpenAI API call fails or the patch cannot be applied.
+        """
+        # Validate inputs
+        if not change_request or not change_request.strip():
+            raise ValueError("Change request cannot be empty")
+        flow = self.validate_response_yaml(flow)
+
+        # Prepare the input string for the OpenAI API
+        input_data = (
+            "<current-flow>\n"
+            f"{flow}\n"
+            "</current-flow>\n\n"
+            "<change-request>\n"
+            f"{change_request}\n"
+            "</change-request>"
+        )
+        if metadata and metadata.strip():
+            input_data += (
+                "\n\n"
+                "<metadata>\n"
+                f"{metadata}\n"
+                "</metadata>"
+            )
+
+        # Validate the developer prompt
+        if not settings.developer_prompt or not settings.developer_prompt.strip():
+            raise ValueError("Developer prompt is not set. Please configure it in settings. You can see the latest version under prompts/developer_prompt_v2.md")
+
+        try:
+            # Pick the generation backend and model
+            generation_backend = self._backend("modify", change_request, metadata, backend)
+            model = generation_backend.model(settings.openai_model)
+
+            logging.info(f"Modifying Kestra flow for change request:\n{change_request[:100]}\n...")
+            start_time = time.time()
+
+            # Ask for a structured patch instead of the full YAML
+            response = generation_backend.parse(
+                instructions=settings.developer_prompt + KESTRA_PATCH_INSTRUCTIONS,
+                input=input_data,
+                text_format=KestraFlowPatch,
+                model=model,
+                effort="medium",
+            )
+
+            # Calculate execution time
+            execution_time = time.time() - start_time
+
+            patch: Optional[KestraFlowPatch] = response.output_parsed
+            if patch is None:
+                raise Exception("Could not extract a flow patch from OpenAI response")
+            logging.info(f"Received patch with {len(patch.edits)} edit(s): {patch.summary}")
+
+            # Apply the patch locally and validate the result
+            patched_flow = apply_flow_patch(flow, patch)
+            patched_flow = self.validate_response_yaml(patched_flow)
+
+            # Extract token usage information safely
+            input_tokens, output_tokens, total_tokens = self._get_token_usage(response)
+
+            # Extract model information safely
+            model = getattr(response, 'model', 'unknown')
+
+            logging.info(f"Token usage - Input: {input_tokens}, Output: {output_tokens}, Total: {total_tokens}")
+            logging.info(f"Execution time: {execution_time:.2f} seconds")
+            logging.info("Kestra flow modified successfully")
+
+            return KestraBotFlowResponse(
+                id=(response.id or None),
+                type="completed",
+                input=change_request,
+                output=patched_flow,
+                metadata=(metadata or ""),
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=total_tokens,
+                model=model,
+                execution_time=execution_time,
+                diff=flow_diff(flow, patched_flow),
+                backend=generation_backend.name,
+            )
+        except Exception as e:
+            logging.error(f"Error modifying Kestra flow: {str(e)}")
+            raise Exception(f"Failed to modify Kestra flow: {str(e)}")
+
+    def refine_kestra_flow(
+        self,
+        flow: str,
+        instruction: str,
+        metadata: Optional[str] = None,
+        previous_response_id: Optional[str] = None,
+        backend: Optional[str] = None,
+        web_search: Optional[bool] = None,
+    ) -> KestraBotFlowResponse:
+        """
+        Refine a Kestra Flow YAML with a follow-up instruction.
+
+        When the flow is the output of a stored response, the instruction is chained to
+        it with `previous_response_id`, so only the new instruction is sent. Otherwise,
+        or when the chained response has expired, a fresh request is sent with the
+        developer prompt, the current flow, the instruction and the metadata.
+
+        Args:
+            flow (str): The current Kestra Flow YAML content.
+            instruction (str): The user's follow-up instruction.
+            metadata (Optional[str]): Additional metadata information such as
+                                    table schemas, data definitions, credentials, etc.
+            previous_response_id (Optional[str]): The stored response which generated the flow.
+            backend (Optional[str]): Name of the generation backend to use instead of
+                                    the one picked by the routing rules. Chained requests
+                                    must use the backend of the previous response.
+            web_search (Optional[bool]): Force the web search tool on or off instead of
+                                    letting the web search policy decide.
+
+        Returns:
+            KestraBotFlowResponse: A response object containing the refined YAML, the diff
+                                    and the request sizes.
+
+        Raises:
+            ValueError: If the flow or instruction is empty.
+            Exception: If OpenAI API call fails.
+        """
+        # Validate inputs
+        if not instruction or not instruction.strip():
+            raise ValueError("Refinement instruction cannot be empty")
+        flow = self.validate_response_yaml(flow)
+
+        # Validate the developer prompt
+        if not settings.developer_prompt or not settings.developer_prompt.strip():
+            raise ValueError("Developer prompt is not set. Please configure it in settings. You can see the latest version under prompts/developer_prompt_v2.md")
+
+        # The input of a fresh request with the full context
+        input_data = (
+            "<current-flow>\n"
+            f"{flow}\n"
+            "</current-flow>\n\n"
+            "<change-request>\n"
+            f"{instruction}\n"
+            "</change-request>"
+        )
+        if metadata and metadata.strip():
+            input_data += (
+                "\n\n"
+                "<metadata>\n"
+                f"{metadata}\n"
+                "</metadata>"
+            )
+        context_bytes = len(settings.developer_prompt.encode("utf-8")) + len(input_data.encode("utf-8"))
+
+        try:
+            # Pick the generation backend and model
+            generation_backend = self._backend("modify", instruction, metadata, backend)
+            model = generation_backend.model(settings.openai_model)
+            if not generation_backend.supports_chaining:
+                previous_response_id = None
+            search = self._web_search(generation_backend, instruction, metadata, web_search)
+
+            logging.info(f"Refining Kestra flow for instruction:\n{instruction[:100]}\n...")
+            start_time = time.time()
+
+            response = None
+            if previous_response_id:
+                try:
+                    response = generation_backend.create(
+                        instructions=KESTRA_REFINE_INSTRUCTIONS,
+                        input=instruction,
+                        model=model,
+                        effort="medium",
+                        web_search=search.use_search,
+                        previous_response_id=previous_response_id,
+                    )
+                    input_bytes = len(KESTRA_REFINE_INSTRUCTIONS.encode("utf-8")) + len(instruction.encode("utf-8"))
+                except (NotFoundError, BadRequestError) as e:
+                    if "previous" not in str(e).lower():
+                        raise
+                    logging.warning(f"Refinement chain expired, sending a fresh request: {str(e)}")
+                    previous_response_id = None
+            if response is None:
+                response = generation_backend.create(
+                    instructions=settings.developer_prompt,
+                    input=input_data,
+                    model=model,
+                    effort="medium",
+                    web_search=search.use_search,
+                )
+                input_bytes = context_bytes
+
+            # Calculate execution time
+            execution_time = time.time() - start_time
+
+            # Validate and cleanup response into valid Kestra YAML
+            if not response.output_text:
+                raise Exception("Could not extract output text content from OpenAI response")
+            refined_flow = self.validate_response_yaml(response.output_text)
+
+            # Extract token usage information safely
+            input_tokens, output_tokens, total_tokens = self._get_token_usage(response)
+
+            get_search_policy().record(search.use_search, execution_time, total_tokens)
+
+            logging.info(f"Token usage - Input: {input_tokens} ({response.cached_tokens} cached), Output: {output_tokens}, Total: {total_tokens}")
+            logging.info(f"Execution time: {execution_time:.2f} seconds, sent {input_bytes} of {context_bytes} bytes")
+            logging.info("Kestra flow refined successfully")
+
+            return KestraBotFlowResponse(
+                id=(response.id or None),
+                type="completed",
+                input=instruction,
+                output=refined_flow,
+                metadata=(metadata or ""),
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=total_tokens,
+                model=getattr(response, 'model', 'unknown'),
+                execution_time=execution_time,
+                diff=flow_diff(flow, refined_flow),
+                backend=generation_backend.name,
+                previous_response_id=previous_response_id,
+                cached_tokens=response.cached_tokens,
+                input_bytes=input_bytes,
+                context_bytes=context_bytes,
+                web_search=search.use_search,
+                web_search_reason=search.reason,
+                web_search_calls=response.web_search_calls,
+            )
+        except Exception as e:
+            logging.error(f"Error refining Kestra flow: {str(e)}")
+            raise Exception(f"Failed to refine Kestra flow: {str(e)}")
+
+    def decompose_kestra_flow(
+        self,
+        user_input: str,
+        metadata: Optional[str] = None,
+        backend: Optional[str] = None,
+    ) -> KestraBotFlowResponse:
+        """
+        Split a multi-part prompt into independent sections for concurrent sub-flow generation.
+
+        Args:
+            user_input (str): The user's prompt describing the ETL task.
+            metadata (Optional[str]): Additional metadata information such as
+                                    table schemas, data definitions, credentials, etc.
+            backend (Optional[str]): Name of the generation backend to use instead of
+                                    the one picked by the routing rules.
+
+        Returns:
+            KestraBotFlowResponse: A response object whose output is the KestraFlowPlan as JSON.
+
+        Raises:
+            ValueError: If user_input is empty or None.
+            Exception: If OpenAI API call fails.
+        """
+        # Validate user input
+        if not user_input or not user_input.strip():
+            raise ValueError("User input cannot be empty")
+
+        input_data = user_input
+        if metadata and metadata.strip():
+            input_data += (
+                "\n\n"
+                "<metadata>\n"
+                f"{metadata}\n"
+                "</metadata>"
+            )
+
+        try:
+            # Pick the generation backend and model
+            generation_backend = self._backend("decompose", user_input, metadata, backend)
+            model = generation_backend.model(settings.openai_model)
+
+            logging.info("Decomposing prompt into independent parts...")
+            start_time = time.time()
+
+            response = generation_backend.parse(
+                instructions=KESTRA_DECOMPOSE_INSTRUCTIONS,
+                input=input_data,
+                text_format=KestraFlowPlan,
+                model=model,
+                effort="low",
+            )
+
+            # Calculate execution time
+            execution_time = time.time() - start_time
+
+            plan: Optional[KestraFlowPlan] = response.output_parsed
+            if plan is None or not plan.parts:
+                raise Exception("Could not extract a decomposition plan from OpenAI response")
+
+            # Extract token usage information safely
+            input_tokens, output_tokens, total_tokens = self._get_token_usage(response)
+
+            return KestraBotFlowResponse(
+                id=(response.id or None),
+                type="completed",
+                input=user_input,
+                output=plan.model_dump_json(),
+                metadata=(metadata or ""),
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=total_tokens,
+                model=getattr(response, 'model', 'unknown'),
+                execution_time=execution_time,
+                backend=generation_backend.name,
+            )
+        except Exception as e:
+            logging.error(f"Error decomposing prompt: {str(e)}")
+            raise Exception(f"Failed to decompose prompt: {str(e)}")
+
+    def _get_token_usage(self, response) -> tuple[int, int, int]:
+        """
+        Extract token usage information safely from a backend response.
+
+        Returns:
+            tuple[int, int, int]: Input, output and total token counts.
+        """
+        return (
+            getattr(response, 'input_tokens', 0) or 0,
+            getattr(response, 'output_tokens', 0) or 0,
+            getattr(response, 'total_tokens', 0) or 0,
+        )
+
     def validate_response_yaml(self, content: str) -> str:
         """
         Validate the generated Kestra flow YAML content. Clean up the YAML content to remove any markdown formatting
@@ -277,8 +712,7 @@ class KestraBotOpenAIClient:
             raise ValueError("Kestra YAML Content cannot be empty")
         
         # Remove any markdown formatting
-        cleaned_content = content.strip().replace("```yaml", "").replace("```", "")
-        cleaned_content = cleaned_content.strip()
+        cleaned_content = clean_response_yaml(content)
 
         # Parse the cleaned content to ensure it's valid YAML
         try:
@@ -287,6 +721,8 @@ class KestraBotOpenAIClient:
             required_keys = ["id", "namespace", "tasks"]
             if any(key not in tmp for key in required_keys):
                 raise ValueError(f"Invalid Kestra YAML structure. Missing one of the required keys: {required_keys}")
+            # check the plugin types against the plugin catalog, if any; unknown types are only logged
+            validate_flow_plugins(tmp)
         except yaml.YAMLError as e:
             raise ValueError(f"Invalid Kestra YAML content: {str(e)}")
         
@@ -294,7 +730,20 @@ class KestraBotOpenAIClient:
 
 
 
+def clean_response_yaml(content: str) -> str:
+    """
+    Remove markdown code block formatting from a generated Kestra flow YAML.
+
+    Args:
+        content (str): The generated content.
+    Returns:
+        str: The YAML content without markdown fences.
+    """
+    return content.strip().replace("```yaml", "").replace("```", "").strip()
+
+
 client: Optional[KestraBotOpenAIClient] = None
+_client_lock = threading.Lock()
 
 
 def get_kestrabot_client() -> KestraBotOpenAIClient:
@@ -308,9 +757,11 @@ def get_kestrabot_client() -> KestraBotOpenAIClient:
         KestraOpenAIClient: The initialized Kestra OpenAI client instance.
     """
     global client
-    if client is None:
-        client = KestraBotOpenAIClient()
-        logging.info("Kestra OpenAI client instance created")
+    # The client may be created from a background thread while pre-warming
+    with _client_lock:
+        if client is None:
+            client = KestraBotOpenAIClient()
+            logging.info("Kestra OpenAI client instance created")
     return client
 
 
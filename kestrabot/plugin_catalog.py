@@ -0,0 +1,425 @@
+"""
+Kestra Plugin Catalog Module
+
+This module builds and reads an offline catalog of the Kestra plugin task types and
+their properties. The catalog is exported as a JSON snapshot from a running Kestra server
+(e.g. the local docker-compose server) and compiled into a compact, memory-mapped binary
+index which loads in milliseconds and supports binary-search type and property lookups.
+
+Usage:
+    python -m kestrabot.plugin_catalog export   # snapshot plugins from the Kestra server
+    python -m kestrabot.plugin_catalog build    # compile the snapshot into the index
+    python -m kestrabot.plugin_catalog lookup io.kestra.plugin.core.log.Log
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import json
+import mmap
+import struct
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, Optional
+
+from kestrabot.settings import settings
+from kestrabot.kestra_client import KestraClient, get_kestra_client
+
+
+__all__ = [
+    "PluginCatalog",
+    "export_plugin_snapshot",
+    "build_plugin_index",
+    "get_plugin_catalog",
+    "check_flow_plugins",
+    "validate_flow_plugins",
+]
+
+
+# Binary index layout (little endian):
+#   header:  magic(4s) version(H) reserved(H) type_count(I)
+#   offsets: type_count x record offset(I), sorted by type name
+#   record:  name_len(H) name(bytes) prop_count(H) [flags(B) prop_len(H) prop(bytes)] * prop_count
+_MAGIC_ = b"KBPC"
+_VERSION_ = 1
+_HEADER_ = struct.Struct("<4sHHI")
+_OFFSET_ = struct.Struct("<I")
+_LEN_ = struct.Struct("<H")
+_PROP_ = struct.Struct("<BH")
+_REQUIRED_FLAG_ = 0x01
+
+# Plugin groups whose classes are referenced by `type:` in a flow
+_PLUGIN_GROUPS_ = ("tasks", "triggers", "conditions", "taskRunners", "logExporters")
+
+# Properties accepted on any task or trigger, regardless of the plugin schema
+_COMMON_PROPERTIES_ = {"id", "type", "description"}
+
+_SNAPSHOT_FILE_ = "plugins.json"
+
+
+class PluginCatalog:
+    """
+    Read-only, memory-mapped Kestra plugin catalog.
+
+    Lookups binary-search the sorted offset table directly in the mapped file, so opening
+    the catalog does not parse or load the whole index into memory.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Open a plugin catalog index.
+
+        Args:
+            path (Path): Path to the binary index built by `build_plugin_index`.
+        Raises:
+            ValueError: If the file is not a valid plugin catalog index.
+        """
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count = _HEADER_.unpack_from(self._mm, 0)
+        if magic != _MAGIC_ or version != _VERSION_:
+            self.close()
+            raise ValueError(f"Invalid plugin catalog index: {self.path}")
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, plugin_type: str) -> bool:
+        return self._find(plugin_type) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the plugin types in sorted order."""
+        for index in range(self._count):
+            yield self._name_at(index).decode("utf-8")
+
+    def _record_offset(self, index: int) -> int:
+        return _OFFSET_.unpack_from(self._mm, _HEADER_.size + index * _OFFSET_.size)[0]
+
+    def _name_at(self, index: int) -> bytes:
+        offset = self._record_offset(index)
+        (length,) = _LEN_.unpack_from(self._mm, offset)
+        start = offset + _LEN_.size
+        return self._mm[start:start + length]
+
+    def _lower_bound(self, key: bytes) -> int:
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._name_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _find(self, plugin_type: str) -> Optional[int]:
+        key = plugin_type.encode("utf-8")
+        index = self._lower_bound(key)
+        if index < self._count and self._name_at(index) == key:
+            return index
+        return None
+
+    def get_properties(self, plugin_type: str) -> Optional[dict[str, bool]]:
+        """
+        Get the properties of a plugin type.
+
+        Args:
+            plugin_type (str): Fully qualified plugin class, e.g. `io.kestra.plugin.core.log.Log`.
+        Returns:
+            Optional[dict[str, bool]]: Property names mapped to whether they are required,
+                                       or None if the type is unknown.
+        """
+        index = self._find(plugin_type)
+        if index is None:
+            return None
+        offset = self._record_offset(index)
+        (length,) = _LEN_.unpack_from(self._mm, offset)
+        offset += _LEN_.size + length
+        (prop_count,) = _LEN_.unpack_from(self._mm, offset)
+        offset += _LEN_.size
+        properties = {}
+        for _ in range(prop_count):
+            flags, length = _PROP_.unpack_from(self._mm, offset)
+            offset += _PROP_.size
+            properties[self._mm[offset:offset + length].decode("utf-8")] = bool(flags & _REQUIRED_FLAG_)
+            offset += length
+        return properties
+
+    def complete(self, prefix: str, limit: int = 10) -> list[str]:
+        """
+        Complete a plugin type from a prefix.
+
+        Args:
+            prefix (str): The beginning of a plugin type.
+            limit (int): Maximum number of completions returned.
+        Returns:
+            list[str]: Matching plugin types in sorted order.
+        """
+        key = prefix.encode("utf-8")
+        matches = []
+        index = self._lower_bound(key)
+        while index < self._count and len(matches) < limit:
+            name = self._name_at(index)
+            if not name.startswith(key):
+                break
+            matches.append(name.decode("utf-8"))
+            index += 1
+        return matches
+
+    def close(self) -> None:
+        """Unmap and close the index file."""
+        self._mm.close()
+        self._file.close()
+
+
+def export_plugin_snapshot(client=None, path: Optional[Path] = None, max_workers: int = 8) -> Path:
+    """
+    Export a JSON snapshot of the plugin metadata of a running Kestra server.
+
+    Args:
+        client (Optional[KestraClient]): Kestra API client. Defaults to the global client.
+        path (Optional[Path]): Snapshot output path. Defaults to `plugins.json` next to the index.
+        max_workers (int): Number of concurrent plugin schema requests.
+    Returns:
+        Path: The path of the written snapshot.
+    """
+    if client is None:
+        client = get_kestra_client()
+    path = Path(path or settings.plugin_catalog_path.with_name(_SNAPSHOT_FILE_))
+
+    classes = set()
+    aliases: dict[str, str] = {}
+    for plugin in client.list_plugins():
+        # Renamed and deprecated type names are still accepted by Kestra
+        for alias in plugin.get("aliases") or []:
+            if isinstance(alias, dict) and alias.get("name") and alias.get("cls"):
+                aliases[alias["name"]] = alias["cls"]
+        for group in _PLUGIN_GROUPS_:
+            for item in plugin.get(group) or []:
+                cls = item.get("cls") if isinstance(item, dict) else item
+                if cls:
+                    classes.add(cls)
+    logging.info(f"Found {len(classes)} plugin types, fetching schemas...")
+
+    def fetch(cls: str) -> tuple[str, dict]:
+        plugin = client.get_plugin(cls)
+        schema = (plugin.get("schema") or {}).get("properties") or {}
+        return cls, {
+            "properties": sorted((schema.get("properties") or {}).keys()),
+            "required": sorted(schema.get("required") or []),
+            "aliases": sorted(alias for alias in plugin.get("aliases") or [] if isinstance(alias, str)),
+        }
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        types = dict(executor.map(fetch, sorted(classes)))
+    for cls, entry in types.items():
+        aliases.update((alias, cls) for alias in entry.pop("aliases"))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    snapshot = {"types": types, "aliases": {alias: cls for alias, cls in aliases.items() if alias not in types}}
+    path.write_text(json.dumps(snapshot, indent=1, sort_keys=True), encoding="utf-8")
+    logging.info(f"Wrote plugin snapshot with {len(types)} types and {len(snapshot['aliases'])} aliases to {path}")
+    return path
+
+
+def build_plugin_index(snapshot_path: Optional[Path] = None, index_path: Optional[Path] = None) -> Path:
+    """
+    Compile a plugin snapshot into the compact binary index.
+
+    Aliases of the snapshot are indexed as types with the properties of their target.
+
+    Args:
+        snapshot_path (Optional[Path]): JSON snapshot written by `export_plugin_snapshot`.
+        index_path (Optional[Path]): Output index path. Defaults to `settings.plugin_catalog_path`.
+    Returns:
+        Path: The path of the written index.
+    """
+    index_path = Path(index_path or settings.plugin_catalog_path)
+    snapshot_path = Path(snapshot_path or index_path.with_name(_SNAPSHOT_FILE_))
+    snapshot = json.loads(snapshot_path.read_text(encoding="utf-8"))
+    types = dict(snapshot["types"])
+    for alias, cls in (snapshot.get("aliases") or {}).items():
+        if cls in types:
+            types.setdefault(alias, types[cls])
+
+    records = []
+    for name in sorted(types, key=lambda n: n.encode("utf-8")):
+        required = set(types[name].get("required") or [])
+        properties = sorted(set(types[name].get("properties") or []) | required)
+        record = bytearray()
+        encoded = name.encode("utf-8")
+        record += _LEN_.pack(len(encoded)) + encoded
+        record += _LEN_.pack(len(properties))
+        for prop in properties:
+            encoded = prop.encode("utf-8")
+            record += _PROP_.pack(_REQUIRED_FLAG_ if prop in required else 0, len(encoded)) + encoded
+        records.append(bytes(record))
+
+    offset = _HEADER_.size + _OFFSET_.size * len(records)
+    offsets = bytearray()
+    for record in records:
+        offsets += _OFFSET_.pack(offset)
+        offset += len(record)
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(index_path, "wb") as f:
+        f.write(_HEADER_.pack(_MAGIC_, _VERSION_, 0, len(records)))
+        f.write(offsets)
+        for record in records:
+            f.write(record)
+    logging.info(f"Wrote plugin catalog index with {len(records)} types to {index_path}")
+    return index_path
+
+
+def _iter_plugin_objects(items) -> Iterator[dict]:
+    """Yield every object with a `type` in a list of tasks/triggers, including nested ones."""
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        if "type" in item:
+            yield item
+        for key in ("tasks", "then", "else", "errors", "finally", "defaults", "conditions"):
+            nested = item.get(key)
+            if isinstance(nested, list):
+                yield from _iter_plugin_objects(nested)
+        cases = item.get("cases")
+        if isinstance(cases, dict):
+            for nested in cases.values():
+                yield from _iter_plugin_objects(nested if isinstance(nested, list) else [nested])
+        runner = item.get("taskRunner")
+        if isinstance(runner, dict):
+            yield from _iter_plugin_objects([runner])
+
+
+def check_flow_plugins(flow: dict, catalog: PluginCatalog) -> tuple[list[str], list[str]]:
+    """
+    Check the plugin types and properties used by a parsed Kestra flow against the catalog.
+
+    Args:
+        flow (dict): The parsed Kestra flow.
+        catalog (PluginCatalog): The plugin catalog.
+    Returns:
+        tuple[list[str], list[str]]: Errors for unknown plugin types and warnings for
+                                     unknown or missing properties.
+    """
+    errors, warnings = [], []
+    items = []
+    for key in ("tasks", "triggers", "errors", "finally", "afterExecution"):
+        if isinstance(flow.get(key), list):
+            items.extend(flow[key])
+
+    for obj in _iter_plugin_objects(items):
+        plugin_type = obj.get("type")
+        name = obj.get("id", plugin_type)
+        if not isinstance(plugin_type, str):
+            continue
+        properties = catalog.get_properties(plugin_type)
+        if properties is None:
+            errors.append(f"'{name}': unknown plugin type '{plugin_type}'")
+            continue
+        for prop in obj:
+            if prop not in properties and prop not in _COMMON_PROPERTIES_:
+                warnings.append(f"'{name}': unknown property '{prop}' for '{plugin_type}'")
+        for prop, required in properties.items():
+            if required and prop not in obj:
+                warnings.append(f"'{name}': missing required property '{prop}' for '{plugin_type}'")
+    return errors, warnings
+
+
+def validate_flow_plugins(flow: dict) -> None:
+    """
+    Validate the plugins used by a parsed Kestra flow against the global catalog, if any.
+
+    Unknown plugin types and properties are logged as warnings and do not fail the flow:
+    the catalog snapshot may be older than the server, and the server validation reports
+    the types it really does not know.
+
+    Args:
+        flow (dict): The parsed Kestra flow.
+    """
+    catalog = get_plugin_catalog()
+    if catalog is None:
+        return
+    errors, warnings = check_flow_plugins(flow, catalog)
+    for warning in errors + warnings:
+        logging.warning(f"Flow '{flow.get('id')}': {warning}")
+
+
+plugin_catalog: Optional[PluginCatalog] = None
+# Path, modification time and size of the index file at the last failed or missing load
+_failed_load_: Optional[tuple] = None
+_catalog_lock = threading.Lock()
+
+
+def get_plugin_catalog() -> Optional[PluginCatalog]:
+    """
+    Get the global plugin catalog instance.
+
+    The catalog is optional: if no index has been built yet, this returns None and
+    plugin checks are skipped. A missing or invalid index is only retried once the
+    index file changes, as this is called on every cursor move of the flow editor.
+
+    Returns:
+        Optional[PluginCatalog]: The opened plugin catalog, or None if no index exists.
+    """
+    global plugin_catalog, _failed_load_
+    if plugin_catalog is not None:
+        return plugin_catalog
+    path = settings.plugin_catalog_path
+    try:
+        stat = path.stat()
+        state = (path, stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        state = (path, None, None)
+    with _catalog_lock:
+        if plugin_catalog is None and state != _failed_load_:
+            try:
+                if state[1] is None:
+                    raise FileNotFoundError(f"No plugin catalog index at {path}")
+                plugin_catalog = PluginCatalog(path)
+                logging.info(f"Loaded plugin catalog with {len(plugin_catalog)} types")
+            except FileNotFoundError as e:
+                _failed_load_ = state
+                logging.debug(str(e))
+            except Exception as e:
+                _failed_load_ = state
+                logging.warning(f"Could not load plugin catalog: {str(e)}")
+    return plugin_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kestra plugin catalog tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export a plugin snapshot from the Kestra server")
+    export_parser.add_argument("--url", default=None, help="Kestra server URL")
+    export_parser.add_argument("--out", type=Path, default=None, help="Snapshot output path")
+    build_parser = subparsers.add_parser("build", help="Build the binary index from a snapshot")
+    build_parser.add_argument("--snapshot", type=Path, default=None, help="Snapshot input path")
+    build_parser.add_argument("--out", type=Path, default=None, help="Index output path")
+    lookup_parser = subparsers.add_parser("lookup", help="Look up a plugin type or type prefix")
+    lookup_parser.add_argument("type", help="Plugin type or prefix")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.get_logging_level(), format="%(levelname)s: %(message)s")
+    if args.command == "export":
+        export_plugin_snapshot(KestraClient(url=args.url), args.out)
+    elif args.command == "build":
+        build_plugin_index(args.snapshot, args.out)
+    elif args.command == "lookup":
+        catalog = get_plugin_catalog()
+        if catalog is None:
+            print(f"No plugin catalog found at {settings.plugin_catalog_path}")
+            return
+        properties = catalog.get_properties(args.type)
+        if properties is None:
+            print("\n".join(catalog.complete(args.type, limit=50)) or "No matching plugin types")
+        else:
+            for prop, required in properties.items():
+                print(f"{prop}{' (required)' if required else ''}")
+
+
+if __name__ == "__main__":
+    main()
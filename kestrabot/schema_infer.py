@@ -0,0 +1,331 @@
+"""
+Kestra Bot Schema Inference Module
+
+This module builds compact schema metadata from local data files, so users do not have to
+hand-write table schemas or paste data samples into the Metadata tab. CSV and JSON-lines
+files are streamed line by line and only a bounded sample of rows is read, so memory use
+stays flat regardless of the file size. Files are processed in parallel.
+
+Usage:
+    python -m kestrabot.schema_infer data/input/ [--sample-rows 1000] [--max-files 200]
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import os
+import re
+import csv
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Union
+from pydantic import BaseModel, Field
+
+from kestrabot.settings import settings
+
+
+__all__ = [
+    "ColumnSchema",
+    "TableSchema",
+    "find_data_files",
+    "infer_file_schema",
+    "infer_schemas",
+    "format_schema_metadata",
+    "merge_schema_metadata",
+]
+
+
+_CSV_SUFFIXES_ = {".csv", ".tsv"}
+_JSONL_SUFFIXES_ = {".jsonl", ".ndjson"}
+
+# Directories of the app's own outputs and workspaces, which hold no input data
+_SKIPPED_DIRS_ = {"kestra-wd", "artifacts", "eval", "tmp", "benchmarks", "__pycache__"}
+
+# Types ordered from the most to the least specific; a column gets the most specific
+# type which accepts every sampled value
+_NUMERIC_TYPES_ = ["BOOLEAN", "INTEGER", "BIGINT", "DOUBLE PRECISION"]
+_TEMPORAL_TYPES_ = ["DATE", "TIMESTAMP"]
+
+_BOOLEAN_VALUES_ = {"true", "false", "t", "f", "yes", "no"}
+_INTEGER_PATTERN_ = re.compile(r"^[+-]?\d+$")
+_FLOAT_PATTERN_ = re.compile(r"^[+-]?(\d+\.\d*|\.\d+|\d+)([eE][+-]?\d+)?$")
+_DATE_PATTERN_ = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_TIMESTAMP_PATTERN_ = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?$")
+_INT32_MAX_ = 2**31 - 1
+
+_SCHEMA_MARKER_ = "inferred table schemas:"
+
+
+class ColumnSchema(BaseModel):
+    """Inferred schema of a single column."""
+    name: str       = Field(..., description="Column name.")
+    type: str       = Field("TEXT", description="Inferred Postgres type.")
+    nullable: bool  = Field(False, description="Whether empty or null values were sampled.")
+
+
+class TableSchema(BaseModel):
+    """Inferred schema of a data file."""
+    name: str                   = Field(..., description="Table name derived from the file name.")
+    path: str                   = Field(..., description="Path of the data file.")
+    format: str                 = Field(..., description="File format: csv or jsonl.")
+    columns: List[ColumnSchema] = Field(default_factory=list, description="Inferred columns in file order.")
+    sampled_rows: int           = Field(0, description="Number of rows read to infer the schema.")
+    size_bytes: int             = Field(0, description="Size of the file in bytes.")
+    inference_time: float       = Field(0.0, description="Time spent inferring the schema in seconds.")
+
+
+def _value_type(value) -> Optional[str]:
+    """Return the most specific type of a single value, or None for empty values."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "BOOLEAN"
+    if isinstance(value, int):
+        return "INTEGER" if abs(value) <= _INT32_MAX_ else "BIGINT"
+    if isinstance(value, float):
+        return "DOUBLE PRECISION"
+    if isinstance(value, (dict, list)):
+        return "JSONB"
+    text = str(value).strip()
+    if not text:
+        return None
+    if text.lower() in _BOOLEAN_VALUES_:
+        return "BOOLEAN"
+    if _INTEGER_PATTERN_.match(text):
+        return "INTEGER" if abs(int(text)) <= _INT32_MAX_ else "BIGINT"
+    if _FLOAT_PATTERN_.match(text):
+        return "DOUBLE PRECISION"
+    if _DATE_PATTERN_.match(text):
+        return "DATE"
+    if _TIMESTAMP_PATTERN_.match(text):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def _merge_types(current: Optional[str], new: Optional[str]) -> Optional[str]:
+    """Return the most specific type accepting values of both types."""
+    if current is None or current == new:
+        return new or current
+    if new is None:
+        return current
+    for family in (_NUMERIC_TYPES_, _TEMPORAL_TYPES_):
+        if current in family and new in family:
+            # Booleans do not widen into numbers
+            if "BOOLEAN" in (current, new):
+                return "TEXT"
+            return family[max(family.index(current), family.index(new))]
+    return "TEXT"
+
+
+def _table_name(path: Path) -> str:
+    name = re.sub(r"\W+", "_", path.name.split(".")[0]).strip("_").lower()
+    return name if name and not name[0].isdigit() else f"t_{name}"
+
+
+def _csv_rows(path: Path) -> Iterator[dict]:
+    # Sampled fields may be larger than the 128KB default limit, e.g. embedded documents
+    if csv.field_size_limit() < _INT32_MAX_:
+        csv.field_size_limit(_INT32_MAX_)
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        dialect = "excel-tab" if path.suffix.lower() == ".tsv" else "excel"
+        reader = csv.reader(f, dialect=dialect)
+        header = next(reader, None)
+        if not header:
+            return
+        header = [name.strip() or f"column_{i + 1}" for i, name in enumerate(header)]
+        for row in reader:
+            yield dict(zip(header, row))
+
+
+def _jsonl_rows(path: Path) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning(f"Skipping invalid JSON on line {line_no} of {path}")
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+def find_data_files(directory: Union[str, Path], max_files: Optional[int] = None) -> List[Path]:
+    """
+    Find the CSV and JSON-lines files of a directory, recursively.
+
+    Hidden directories and the app's workspace and output directories are not searched,
+    and the walk stops after `max_files` data files.
+
+    Args:
+        directory (Union[str, Path]): The directory to search.
+        max_files (Optional[int]): Maximum number of files to collect. Defaults to settings.
+    Returns:
+        List[Path]: The data files, sorted by path.
+    """
+    suffixes = _CSV_SUFFIXES_ | _JSONL_SUFFIXES_
+    max_files = max_files or settings.schema_max_files
+    files: List[Path] = []
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = sorted(name for name in dirs if name not in _SKIPPED_DIRS_ and not name.startswith("."))
+        for name in sorted(names):
+            if Path(name).suffix.lower() in suffixes:
+                files.append(Path(root) / name)
+                if len(files) >= max_files:
+                    logging.warning(f"Stopped searching {directory} after {max_files} data files")
+                    return sorted(files)
+    return sorted(files)
+
+
+def infer_file_schema(path: Union[str, Path], sample_rows: Optional[int] = None) -> TableSchema:
+    """
+    Infer the schema of a CSV or JSON-lines file from a bounded sample of rows.
+
+    The file is streamed and at most `sample_rows` rows are read, whatever its size.
+
+    Args:
+        path (Union[str, Path]): The data file.
+        sample_rows (Optional[int]): Maximum number of rows to sample. Defaults to settings.
+    Returns:
+        TableSchema: The inferred schema.
+    Raises:
+        ValueError: If the file format is not supported.
+    """
+    start_time = time.time()
+    path = Path(path)
+    sample_rows = sample_rows or settings.schema_sample_rows
+    suffix = path.suffix.lower()
+    if suffix in _CSV_SUFFIXES_:
+        file_format, rows = "csv", _csv_rows(path)
+    elif suffix in _JSONL_SUFFIXES_:
+        file_format, rows = "jsonl", _jsonl_rows(path)
+    else:
+        raise ValueError(f"Unsupported data file format: {path}")
+
+    types: dict[str, Optional[str]] = {}
+    nullable: dict[str, bool] = {}
+    sampled = 0
+    for row in islice(rows, sample_rows):
+        sampled += 1
+        # Columns missing from earlier JSON records are nullable
+        for name in row:
+            if name not in types:
+                types[name], nullable[name] = None, sampled > 1
+        for name in types:
+            value_type = _value_type(row.get(name))
+            if value_type is None:
+                nullable[name] = True
+            types[name] = _merge_types(types[name], value_type)
+    rows.close()
+
+    return TableSchema(
+        name=_table_name(path),
+        path=str(path),
+        format=file_format,
+        columns=[ColumnSchema(name=name, type=types[name] or "TEXT", nullable=nullable[name]) for name in types],
+        sampled_rows=sampled,
+        size_bytes=path.stat().st_size,
+        inference_time=time.time() - start_time,
+    )
+
+
+def infer_schemas(
+    paths: Iterable[Union[str, Path]],
+    sample_rows: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    max_files: Optional[int] = None,
+) -> List[TableSchema]:
+    """
+    Infer the schemas of many data files in parallel.
+
+    Directories are searched for CSV and JSON-lines files. Files which cannot be read
+    are logged and skipped.
+
+    Args:
+        paths (Iterable[Union[str, Path]]): Data files or directories.
+        sample_rows (Optional[int]): Maximum number of rows sampled per file. Defaults to settings.
+        max_workers (Optional[int]): Maximum number of files processed at the same time.
+        max_files (Optional[int]): Maximum number of files collected per directory. Defaults to settings.
+    Returns:
+        List[TableSchema]: The inferred schemas, in file order.
+    """
+    files: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(find_data_files(path, max_files))
+        elif path.exists():
+            files.append(path)
+        else:
+            logging.warning(f"Data path not found: {path}")
+    if not files:
+        return []
+
+    def infer(path: Path) -> Optional[TableSchema]:
+        try:
+            return infer_file_schema(path, sample_rows)
+        except (OSError, ValueError, csv.Error) as e:
+            # UnicodeDecodeError is a ValueError
+            logging.warning(f"Could not infer the schema of {path}: {str(e)}")
+            return None
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers or min(8, len(files))) as executor:
+        schemas = [schema for schema in executor.map(infer, files) if schema is not None]
+    logging.info(f"Inferred {len(schemas)} schema(s) from {len(files)} file(s) in {time.time() - start_time:.2f}s")
+    return schemas
+
+
+def format_schema_metadata(schemas: Iterable[TableSchema]) -> str:
+    """
+    Format schemas as compact metadata for the prompt.
+
+    Args:
+        schemas (Iterable[TableSchema]): The inferred schemas.
+    Returns:
+        str: One block per table with its source file and typed columns.
+    """
+    blocks = []
+    for schema in schemas:
+        # Nullability is only known for the sample, so it is not emitted as a constraint
+        columns = ", ".join(f"{column.name} {column.type}" for column in schema.columns)
+        blocks.append(f"table {schema.name} ({schema.format} file {schema.path}):\n  columns: {columns}")
+    return "\n".join(blocks)
+
+
+def merge_schema_metadata(metadata: str, schema_metadata: str) -> str:
+    """
+    Add inferred schema metadata to the user metadata, replacing a previously inferred block.
+
+    Args:
+        metadata (str): The current metadata.
+        schema_metadata (str): The formatted schema metadata.
+    Returns:
+        str: The metadata with a single inferred schemas block at the end.
+    """
+    metadata = metadata.split(_SCHEMA_MARKER_, 1)[0].rstrip()
+    return f"{metadata}\n\n{_SCHEMA_MARKER_}\n{schema_metadata}\n".lstrip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Infer table schemas from local CSV and JSON-lines files")
+    parser.add_argument("paths", nargs="*", type=Path, help="Data files or directories. Defaults to the data directory")
+    parser.add_argument("--sample-rows", type=int, default=None, help="Maximum number of rows sampled per file")
+    parser.add_argument("--max-files", type=int, default=None, help="Maximum number of files collected per directory")
+    parser.add_argument("--json", action="store_true", help="Print the schemas as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.get_logging_level(), format="%(levelname)s: %(message)s")
+    schemas = infer_schemas(args.paths or [settings.data_dir], sample_rows=args.sample_rows, max_files=args.max_files)
+    if args.json:
+        print(json.dumps([schema.model_dump() for schema in schemas], indent=2))
+    else:
+        print(format_schema_metadata(schemas))
+
+
+if __name__ == "__main__":
+    main()
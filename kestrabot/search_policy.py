@@ -0,0 +1,259 @@
+"""
+Kestra Bot Web Search Policy Module
+
+This module decides per request whether flow generation should attach the web search
+tool. Search adds round trips and input tokens, and the model already knows the standard
+patterns, so it is only enabled when the prompt needs information the bot does not have
+locally: plugin types missing from the plugin catalog (or from the developer prompt
+examples when no catalog is built), named technologies no installed plugin covers, or
+explicit requests for the latest documentation. The policy can be overridden
+per request or in settings, and keeps latency and token stats of builds with and without
+search to show its impact.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import re
+import logging
+import threading
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from kestrabot.settings import settings
+from kestrabot.plugin_catalog import get_plugin_catalog
+
+
+__all__ = [
+    "WebSearchDecision",
+    "WebSearchPolicy",
+    "get_search_policy",
+]
+
+
+_URL_PATTERN_ = re.compile(r"https?://[^\s`'\")<>]+")
+_PLUGIN_TYPE_PATTERN_ = re.compile(r"\bio\.kestra\.[\w.]+\w")
+_WORD_PATTERN_ = re.compile(r"[a-z0-9]+")
+# Prompts are split in sentences and list items, whose first word is capitalized whatever it is
+_SEGMENT_PATTERN_ = re.compile(r"\n|[.!?:;](?:\s+|$)")
+_TOKEN_PATTERN_ = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+_QUOTED_PATTERN_ = re.compile(r"`[^`]*`")
+
+# Technologies users name in prompts; one missing from the known set calls for a search
+_TECH_TERMS_ = {
+    "postgresql", "mysql", "mariadb", "oracle", "sqlserver", "mssql", "sqlite", "duckdb", "clickhouse",
+    "snowflake", "bigquery", "redshift", "databricks", "synapse", "trino", "presto", "druid", "pinot",
+    "vertica", "teradata", "db2", "cassandra", "scylladb", "mongodb", "couchbase", "dynamodb", "redis",
+    "elasticsearch", "opensearch", "neo4j", "influxdb", "questdb", "timescaledb", "cockroachdb", "supabase",
+    "s3", "gcs", "azure", "adls", "minio", "sftp", "ftp", "hdfs", "kafka", "pulsar", "rabbitmq", "amqp",
+    "mqtt", "nats", "kinesis", "sqs", "sns", "pubsub", "eventhubs", "spark", "flink", "airbyte",
+    "fivetran", "dbt", "dlt", "meltano", "debezium", "kubernetes", "docker", "terraform", "ansible",
+    "slack", "discord", "sendgrid", "twilio", "salesforce", "hubspot", "stripe", "shopify", "zendesk",
+    "jira", "airtable", "github", "gitlab", "openai", "huggingface", "parquet", "avro", "iceberg", "excel",
+}
+
+_TECH_ALIASES_ = {
+    "postgres": "postgresql",
+    "mongo": "mongodb",
+    "elastic": "elasticsearch",
+    "k8s": "kubernetes",
+    "rabbit": "rabbitmq",
+}
+
+# Covered by the developer prompt examples, known even without a plugin catalog
+_BUILTIN_KNOWN_ = {
+    "postgresql", "s3", "nats", "jdbc", "aws", "csv", "json", "ion", "http", "python", "jython",
+    "huggingface", "kestra",
+}
+
+# Capitalized words which do not name a technology: filler, common verbs and data terms
+_COMMON_NAMES_ = {
+    "a", "an", "the", "and", "or", "in", "into", "from", "to", "with", "via", "on", "of", "for", "then",
+    "also", "each", "all", "every", "please", "be", "sure", "if", "not", "no", "null", "true", "false",
+    "get", "post", "put", "copy", "create", "insert", "load", "download", "upload", "fetch", "use", "make",
+    "add", "run", "convert", "transform", "serialize", "deserialize", "parse", "enrich", "fan", "out",
+    "write", "read", "send", "store", "save", "generate", "filter", "merge", "join", "split", "sync",
+    "log", "print", "keep", "drop", "delete", "update", "rename", "check", "validate", "schedule",
+    "url", "uri", "api", "rest", "sql", "yaml", "id", "ids", "etl", "elt", "utf", "utc", "ok",
+    "table", "database", "flow", "flows", "task", "tasks", "input", "inputs", "output", "outputs",
+    "branch", "branches", "step", "steps", "file", "files", "record", "records", "row", "rows",
+}
+
+# A capitalized name followed by one of these is a data object, e.g. "the Sales table"
+_DATA_OBJECT_WORDS_ = {
+    "table", "tables", "schema", "database", "bucket", "column", "columns", "field", "fields",
+    "file", "files", "dataset", "folder", "directory", "namespace", "topic", "queue", "index",
+}
+
+_FRESHNESS_TERMS_ = {"latest", "newest", "documentation", "docs", "changelog", "deprecated"}
+
+
+class WebSearchDecision(BaseModel):
+    """Whether a request should use the web search tool, and why."""
+    use_search: bool           = Field(False, description="Whether the web search tool is attached to the request.")
+    reason: str                = Field("", description="Why search was enabled or disabled.")
+    unknown_terms: List[str]   = Field(default_factory=list, description="Plugin types and technologies not known locally.")
+
+    def __str__(self) -> str:
+        return f"{'on' if self.use_search else 'off'} ({self.reason})"
+
+
+class _SearchImpact:
+    """Latency and token totals of builds with or without search."""
+
+    def __init__(self):
+        self.builds = 0
+        self.latency = 0.0
+        self.tokens = 0
+
+    def __str__(self) -> str:
+        if not self.builds:
+            return "no builds"
+        return f"{self.latency / self.builds:.2f}s, {self.tokens // self.builds} tokens avg over {self.builds}"
+
+
+class WebSearchPolicy:
+    """Decides per request whether to attach the web search tool, and tracks its impact."""
+
+    def __init__(self, mode: Optional[str] = None):
+        """
+        Initialize the policy.
+
+        Args:
+            mode (Optional[str]): `auto`, `always` or `never`. Defaults to `settings.web_search`.
+        """
+        self.mode = mode or settings.web_search
+        self._known: Optional[set] = None
+        self._known_types: Optional[set] = None
+        self._lock = threading.Lock()
+        self._impact = {True: _SearchImpact(), False: _SearchImpact()}
+
+    @property
+    def known_terms(self) -> set:
+        """Technologies covered locally: the built-in set plus the plugin catalog package names."""
+        with self._lock:
+            if self._known is None:
+                known = set(_BUILTIN_KNOWN_)
+                catalog = get_plugin_catalog()
+                if catalog is not None:
+                    for plugin_type in catalog:
+                        known.update(segment.lower() for segment in plugin_type.split(".")[2:-1])
+                self._known = known
+            return self._known
+
+    @property
+    def known_types(self) -> Optional[set]:
+        """Plugin types of the developer prompt examples, used to check types when no catalog is built."""
+        with self._lock:
+            if self._known_types is None:
+                self._known_types = set(_PLUGIN_TYPE_PATTERN_.findall(settings.developer_prompt or ""))
+            return self._known_types
+
+    def _unknown_names(self, prompt: str) -> List[str]:
+        """
+        Proper names in the prompt no known plugin covers, e.g. "Qdrant" or "Google Sheets".
+
+        Names are runs of capitalized words. The first word of a sentence or list item,
+        all-caps words such as SQL keywords and acronyms, common words and names of data
+        objects, e.g. "the Sales table", are not names.
+        """
+        text = _QUOTED_PATTERN_.sub(" ", _PLUGIN_TYPE_PATTERN_.sub(" ", _URL_PATTERN_.sub(" ", prompt)))
+        known = self.known_terms | _COMMON_NAMES_
+        unknown = []
+        for segment in _SEGMENT_PATTERN_.split(text):
+            tokens = list(_TOKEN_PATTERN_.finditer(segment))[1:]
+            runs: List[List[re.Match]] = []
+            for index, token in enumerate(tokens):
+                word = token.group(0)
+                if not word[0].isupper() or word.isupper():
+                    continue
+                previous = tokens[index - 1] if index else None
+                if runs and previous is runs[-1][-1] and not segment[previous.end():token.start()].strip():
+                    runs[-1].append(token)
+                else:
+                    runs.append([token])
+            for run in runs:
+                after = segment[run[-1].end():].split(None, 1)
+                if after and after[0].lower() in _DATA_OBJECT_WORDS_:
+                    continue
+                parts = [_TECH_ALIASES_.get(token.group(0).lower(), token.group(0).lower()) for token in run]
+                parts = [part for part in parts if part not in _COMMON_NAMES_]
+                if not parts or "".join(parts) in known or all(part in known for part in parts):
+                    continue
+                unknown.append(" ".join(parts))
+        return list(dict.fromkeys(unknown))
+
+    def decide(self, prompt: str, metadata: Optional[str] = None, override: Optional[bool] = None) -> WebSearchDecision:
+        """
+        Decide whether a request should use web search.
+
+        Args:
+            prompt (str): The user prompt.
+            metadata (Optional[str]): The metadata sent with the prompt.
+            override (Optional[bool]): Force search on or off for this request.
+        Returns:
+            WebSearchDecision: The decision and its reason.
+        """
+        if override is not None:
+            return WebSearchDecision(use_search=override, reason="requested")
+        if self.mode in ("always", "never"):
+            return WebSearchDecision(use_search=self.mode == "always", reason=f"web_search: {self.mode}")
+
+        # URLs are data, not technologies
+        text = _URL_PATTERN_.sub(" ", f"{prompt}\n{metadata or ''}")
+        catalog = get_plugin_catalog()
+        known_types = catalog if catalog is not None else self.known_types
+        unknown_types = [
+            plugin_type for plugin_type in dict.fromkeys(_PLUGIN_TYPE_PATTERN_.findall(text))
+            if plugin_type not in known_types
+        ]
+        if unknown_types:
+            reason = "plugin types missing from the catalog" if catalog is not None else "plugin types not verifiable without a plugin catalog"
+            return WebSearchDecision(use_search=True, reason=reason, unknown_terms=unknown_types)
+
+        words = {_TECH_ALIASES_.get(word, word) for word in _WORD_PATTERN_.findall(_PLUGIN_TYPE_PATTERN_.sub(" ", text).lower())}
+        unknown_tech = sorted((words & _TECH_TERMS_) - self.known_terms)
+        unknown_tech += [name for name in self._unknown_names(prompt) if name not in unknown_tech]
+        if unknown_tech:
+            return WebSearchDecision(use_search=True, reason="technologies without a known plugin", unknown_terms=unknown_tech)
+        if words & _FRESHNESS_TERMS_:
+            return WebSearchDecision(use_search=True, reason="asks for current documentation")
+
+        # Imported here as the templates module depends on the OpenAI client module
+        from kestrabot.templates import match_template
+        match = match_template(prompt, metadata)
+        if match is not None and match.confidence >= settings.template_min_confidence:
+            return WebSearchDecision(use_search=False, reason=f"matches template {match.template.name}")
+        return WebSearchDecision(use_search=False, reason="known plugins and patterns only")
+
+    def record(self, use_search: bool, latency: float, total_tokens: int) -> None:
+        """Record the latency and token usage of a build with or without search."""
+        with self._lock:
+            impact = self._impact[use_search]
+            impact.builds += 1
+            impact.latency += latency
+            impact.tokens += total_tokens
+
+    def impact_summary(self) -> str:
+        """Average latency and tokens of builds with and without search."""
+        with self._lock:
+            return f"with search {self._impact[True]}; without {self._impact[False]}"
+
+
+search_policy: Optional[WebSearchPolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_search_policy() -> WebSearchPolicy:
+    """
+    Get the global web search policy instance.
+
+    Returns:
+        WebSearchPolicy: The initialized policy, sharing its impact stats across the application.
+    """
+    global search_policy
+    with _policy_lock:
+        if search_policy is None:
+            search_policy = WebSearchPolicy()
+            logging.info(f"Web search policy: {search_policy.mode}")
+    return search_policy
+
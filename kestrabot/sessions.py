@@ -0,0 +1,318 @@
+"""
+Kestra Bot Build Sessions
+
+This module provides named build sessions, each holding its own prompt, metadata, flow,
+build task and chain of stored responses to refine the flow with, and a supervisor which
+runs session builds concurrently with bounded parallelism while tracking every background
+task so it can be cleaned up on exit.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Coroutine, Optional
+
+
+__all__ = ["BuildSession", "BuildSupervisor", "PendingPatch", "RefinementChain", "SpeculativeBuild"]
+
+
+class BuildSession:
+    """A named build session with its own inputs, flow and build task."""
+
+    def __init__(self, name: str, prompt: str = "", metadata: str = "", flow: str = ""):
+        self.name = name
+        self.prompt = prompt
+        self.metadata = metadata
+        self.flow = flow
+        self.status = "idle"
+        self.task: Optional[asyncio.Task] = None
+        self.started_at: Optional[float] = None
+        self.elapsed: float = 0.0
+        self.refinement: Optional["RefinementChain"] = None
+        self.pending_patch: Optional["PendingPatch"] = None
+
+    @property
+    def busy(self) -> bool:
+        """Whether the session has a queued or running build."""
+        return self.task is not None and not self.task.done()
+
+    @property
+    def label(self) -> str:
+        """Display label with the session progress."""
+        if self.busy and self.started_at is not None:
+            return f"{self.name} ({self.status} {time.time() - self.started_at:.0f}s)"
+        if self.pending_patch is not None:
+            return f"{self.name} (patch to review)"
+        if self.status in ("done", "failed") and self.elapsed:
+            return f"{self.name} ({self.status} in {self.elapsed:.1f}s)"
+        return f"{self.name} ({self.status})"
+
+
+class PendingPatch:
+    """A flow patch waiting for the user to review it in its session."""
+
+    def __init__(self, summary: str, base_flow: str, flow: str, diff: str):
+        self.summary = summary
+        self.base_flow = base_flow
+        self.flow = flow
+        self.diff = diff
+
+
+class RefinementChain:
+    """
+    The chain of stored responses a session refines its flow with.
+
+    Follow-up instructions are chained to the last response while the session flow is
+    still the one it generated; per-turn sizes, cached tokens and latency are tracked.
+    """
+
+    def __init__(self, response_id: str, backend: Optional[str], flow: str):
+        self.response_id = response_id
+        self.backend = backend
+        self.flow = flow
+        self.length = 1
+        self.turns = 0
+        self.chained = 0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+        self.cached_tokens = 0
+        self.latency = 0.0
+
+    def continues(self, flow: str) -> bool:
+        """Whether a refinement of this flow can be chained to the last response."""
+        return self.flow == flow
+
+    def add_turn(self, response_id: str, flow: str, chained: bool, input_bytes: int, context_bytes: int, cached_tokens: int, latency: float) -> None:
+        """Record a refinement turn and make its response the end of the chain."""
+        self.response_id = response_id
+        self.flow = flow
+        self.length = self.length + 1 if chained else 1
+        self.turns += 1
+        self.chained += int(chained)
+        self.bytes_sent += input_bytes
+        self.bytes_saved += max(0, context_bytes - input_bytes)
+        self.cached_tokens += cached_tokens
+        self.latency += latency
+
+    def __str__(self) -> str:
+        average = self.latency / self.turns if self.turns else 0.0
+        return (
+            f"{self.turns} turn(s), {self.chained} chained, {self.bytes_sent / 1024:.1f}KB sent, "
+            f"{self.bytes_saved / 1024:.1f}KB saved, {self.cached_tokens} cached tokens, {average:.2f}s average latency"
+        )
+
+
+class SpeculativeBuild:
+    """A generation started in the background before the user asked for a build."""
+
+    def __init__(self, session: BuildSession, prompt: str, metadata: str, task: asyncio.Task):
+        self.session = session
+        self.prompt = prompt
+        self.metadata = metadata
+        self.task = task
+        self.started_at = time.time()
+
+    def matches(self, session: BuildSession, prompt: str, metadata: str) -> bool:
+        """Whether this run was started for the same session and inputs."""
+        return (
+            self.session is session
+            and self.prompt == prompt
+            and self.metadata == metadata
+            and not self.task.cancelled()
+        )
+
+
+class BuildSupervisor:
+    """
+    Runs session builds concurrently with bounded parallelism.
+
+    Every task started through the supervisor is tracked until it finishes, so that
+    failures are logged and pending tasks are cancelled on shutdown. Builds run their
+    blocking calls with `to_thread`, so that a cancelled build keeps its slot until its
+    worker threads return and the limit also bounds the model calls actually running.
+    """
+
+    def __init__(self, max_concurrent: int = 2, on_change: Optional[Callable[[BuildSession], None]] = None):
+        """
+        Initialize the supervisor.
+
+        Args:
+            max_concurrent (int): Maximum number of builds running at the same time.
+            on_change (Optional[Callable[[BuildSession], None]]): Called when a session's status changes.
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.on_change = on_change
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._tasks: set[asyncio.Task] = set()
+        # Worker threads of each build, keyed by session, or by (`speculative`, session) for speculative runs
+        self._workers: dict[Any, set[asyncio.Future]] = {}
+
+    @property
+    def running(self) -> int:
+        """Number of tracked tasks which have not finished yet."""
+        return len(self._tasks)
+
+    def _set_status(self, session: BuildSession, status: str) -> None:
+        session.status = status
+        if self.on_change:
+            self.on_change(session)
+
+    def submit(self, session: BuildSession, coro: Coroutine, description: str = "building") -> asyncio.Task:
+        """
+        Run a build coroutine for a session once a build slot is free.
+
+        Args:
+            session (BuildSession): The session owning the build.
+            coro (Coroutine): The build coroutine.
+            description (str): Status shown while the build runs.
+        Returns:
+            asyncio.Task: The tracked build task.
+        Raises:
+            RuntimeError: If the session already has a queued or running build.
+        """
+        if session.busy:
+            coro.close()
+            raise RuntimeError(f"Session '{session.name}' already has a build in progress")
+
+        async def run() -> Any:
+            acquired = False
+            try:
+                self._set_status(session, "queued")
+                session.started_at = time.time()
+                await self._semaphore.acquire()
+                acquired = True
+                self._set_status(session, description)
+                session.started_at = time.time()
+                result = await coro
+                # The build may have flagged itself as failed
+                if session.status == description:
+                    self._set_status(session, "done")
+                return result
+            except asyncio.CancelledError:
+                self._set_status(session, "cancelled")
+                raise
+            except Exception:
+                self._set_status(session, "failed")
+                raise
+            finally:
+                # Close the coroutine if it was cancelled before it started
+                coro.close()
+                if acquired:
+                    self._release_slot(session, session.name)
+                session.elapsed = time.time() - (session.started_at or time.time())
+
+        session.task = self.track(run(), name=f"build:{session.name}")
+        return session.task
+
+    async def to_thread(self, session: BuildSession, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking call of a session build in a worker thread.
+
+        A running thread cannot be interrupted, so if the build is cancelled the thread
+        keeps running and the build slot is only released once it returns.
+
+        Args:
+            session (BuildSession): The session owning the build.
+            func (Callable): The blocking function.
+            *args: Positional arguments of the function.
+            **kwargs: Keyword arguments of the function.
+        Returns:
+            Any: The function result.
+        """
+        return await self._to_thread(session, func, *args, **kwargs)
+
+    async def _to_thread(self, key: Any, func: Callable, *args, **kwargs) -> Any:
+        worker = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+        self._workers.setdefault(key, set()).add(worker)
+        worker.add_done_callback(self._on_worker_done)
+        return await asyncio.shield(worker)
+
+    def _on_worker_done(self, worker: asyncio.Future) -> None:
+        # Retrieve the result of abandoned workers so that their errors are not reported as unhandled
+        if not worker.cancelled() and worker.exception() is not None:
+            logging.debug(f"Worker thread failed: {worker.exception()}")
+
+    def speculate(self, session: BuildSession, func: Callable, *args, **kwargs) -> Optional[asyncio.Task]:
+        """
+        Run a speculative generation for a session in a free build slot.
+
+        Speculative work never waits for a slot: it is skipped when all slots are taken.
+        Like a build, a cancelled run keeps its slot until its worker thread returns.
+
+        Args:
+            session (BuildSession): The session the generation is for.
+            func (Callable): The blocking generation function.
+            *args: Positional arguments of the function.
+            **kwargs: Keyword arguments of the function.
+        Returns:
+            Optional[asyncio.Task]: The tracked task, resolving to None if the slot was taken
+                                    before it started, or None if no slot is free.
+        """
+        if self._semaphore.locked():
+            return None
+        key = ("speculative", session)
+
+        async def run() -> Any:
+            # A build may have taken the last slot before this task started
+            if self._semaphore.locked():
+                return None
+            await self._semaphore.acquire()
+            try:
+                return await self._to_thread(key, func, *args, **kwargs)
+            finally:
+                self._release_slot(key, f"speculative:{session.name}")
+
+        return self.track(run(), name=f"speculative:{session.name}")
+
+    def _release_slot(self, key: Any, name: str) -> None:
+        """Release a build slot once the worker threads started under `key` have returned."""
+        workers = [worker for worker in self._workers.pop(key, ()) if not worker.done()]
+        if not workers:
+            self._semaphore.release()
+            return
+        logging.info(f"Build slot of '{name}' is held until {len(workers)} worker thread(s) return")
+        remaining = len(workers)
+
+        def on_done(_: asyncio.Future) -> None:
+            nonlocal remaining
+            remaining -= 1
+            if remaining == 0:
+                self._semaphore.release()
+
+        for worker in workers:
+            worker.add_done_callback(on_done)
+
+    def track(self, coro: Coroutine, name: Optional[str] = None) -> asyncio.Task:
+        """
+        Start a background task and keep track of it until it finishes.
+
+        Args:
+            coro (Coroutine): The coroutine to run.
+            name (Optional[str]): Optional task name.
+        Returns:
+            asyncio.Task: The tracked task.
+        """
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        return task
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Background task '{task.get_name()}' failed: {task.exception()}")
+
+    def cancel(self, session: BuildSession) -> None:
+        """Cancel the build of a session, if any."""
+        if session.busy:
+            session.task.cancel()
+
+    async def shutdown(self) -> None:
+        """Cancel all tracked tasks and wait for them to finish."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
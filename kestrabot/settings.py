@@ -3,7 +3,7 @@ Application settings and logging configuration.
 """
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import (
     BaseSettings,
@@ -17,6 +17,7 @@ __all__ = ["settings"]
 
 _CURRENT_DIR_ = Path(__file__).parent.resolve()
 _SETTINGS_FILE_ = _CURRENT_DIR_ / "settings.yaml"
+_DATA_DIR_ = _CURRENT_DIR_.parent / "data"
 
 _MODELS_ = {
     "o4-mini",
@@ -27,10 +28,46 @@ _MODELS_ = {
 class Settings(BaseSettings):
     openai_api_key: Optional[str] = Field(..., description="API key for OpenAI. Do NOT set here. Must be provided by the `$KESTRABOT_OPENAI_API_KEY` environment variable.")
     openai_model: str = Field("o4-mini", description="Default OpenAI model to use for generating the Kestra Flow.")
+    backends: Dict[str, dict] = Field({}, description="Additional OpenAI-compatible generation backends by name, e.g. a local model server. See `kestrabot.backends.BackendConfig`.")
+    backend_routes: List[dict] = Field([], description="Rules routing requests to generation backends, first match wins. See `kestrabot.backends.BackendRoute`.")
+    default_backend: str = Field("openai", description="Generation backend used when no routing rule matches. `openai` is the public OpenAI API.")
+    web_search: Literal["auto", "always", "never"] = Field("auto", description="Web search tool policy: `auto` enables it only for plugin types or technologies not known locally.")
 
     developer_prompt: str = Field(..., description="Developer prompt for the OpenAI agen to generate the Kestra Flow from the user input.")
     metadata: Optional[str] = Field(None, description="Additional Metadata for the Kestra Flow.")
 
+    speculative_build: bool = Field(False, description="Start generating a flow in the background once the prompt has been idle for `speculative_debounce` seconds. It only runs in a free build slot of `max_concurrent_builds`.")
+    speculative_debounce: float = Field(3.0, description="Idle time in seconds after the last prompt edit before a speculative build starts.")
+    max_concurrent_builds: int = Field(2, description="Maximum number of session builds running at the same time. A cancelled build holds its slot until its model call returns.")
+    decompose_max_workers: int = Field(4, description="Maximum number of sub-flows generated concurrently when building with prompt decomposition.")
+    template_fast_path: bool = Field(False, description="Answer common flow requests from local flow templates without calling the model. Off by default, as templates cover a narrow vocabulary.")
+    template_min_confidence: float = Field(0.9, description="Minimum confidence of a template match for the template fast-path to be used.")
+    refine_max_turns: int = Field(10, description="Maximum number of refinements chained to a response before a fresh request restarts the chain.")
+
+    kestra_url: str = Field("http://localhost:8080", description="Base URL of the Kestra server.")
+    kestra_tenant: Optional[str] = Field("main", description="Kestra tenant used in API paths. Set to empty for servers without tenant-scoped APIs.")
+    kestra_username: Optional[str] = Field(None, description="Kestra basic auth user name, if basic auth is enabled.")
+    kestra_password: Optional[str] = Field(None, description="Kestra basic auth password, if basic auth is enabled.")
+    kestra_max_connections: int = Field(10, description="Size of the Kestra API connection pool.")
+    validation_debounce: float = Field(1.5, description="Idle time in seconds after the last flow edit before the flow is validated by the Kestra server. 0 disables it.")
+    validation_cache_size: int = Field(256, description="Maximum number of flow validation results cached by canonical flow hash.")
+
+    data_dir: Path = Field(_DATA_DIR_ / "input", description="Directory of local data files used to infer table schemas for the metadata.")
+    schema_sample_rows: int = Field(1000, description="Maximum number of rows sampled per data file when inferring table schemas.")
+    schema_max_files: int = Field(200, description="Maximum number of data files collected from a directory when inferring table schemas.")
+
+    artifacts_dir: Path = Field(_DATA_DIR_ / "artifacts", description="Directory where execution output files are downloaded, one sub-directory per execution.")
+    artifact_chunk_size: int = Field(1024 * 1024, description="Chunk size in bytes used to stream execution output files to disk.")
+
+    janitor_dirs: List[Path] = Field([_DATA_DIR_ / "tmp", _DATA_DIR_ / "kestra-wd" / "tmp"], description="Workspace directories cleaned by the janitor. Kestra creates one task working directory per task run under `kestra-wd/tmp` (see `docker-compose.yml`).")
+    janitor_max_age_days: Optional[float] = Field(7.0, description="Janitor retention: delete entries not modified for this many days.")
+    janitor_max_size_mb: Optional[float] = Field(None, description="Janitor retention: delete the oldest entries until a directory fits in this size.")
+    janitor_max_entries: Optional[int] = Field(None, description="Janitor retention: keep at most this many of the newest entries per directory.")
+    janitor_interval: float = Field(0.0, description="Interval in minutes between background janitor runs in the app. 0 disables them.")
+    janitor_max_workers: int = Field(8, description="Maximum number of parallel scans and deletes of the janitor.")
+
+    plugin_catalog_path: Path = Field(_DATA_DIR_ / "plugins.idx", description="Path to the compact Kestra plugin catalog index built by `python -m kestrabot.plugin_catalog`.")
+
     logging_level: str = Field("INFO", description="Python logging level for the application. Defaults to INFO.")
 
     model_config = SettingsConfigDict(
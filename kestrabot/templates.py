@@ -0,0 +1,354 @@
+"""
+Kestra Flow Templates Module
+
+This module answers common flow requests locally, without calling the LLM. It holds
+parameterized flow templates for the patterns of the developer prompt examples, and a
+local intent/slot matcher which picks a template and extracts its parameters (URL, table,
+columns, connection info, labels, namespace) from the prompt and metadata. Prompt words
+outside the vocabulary of the templates lower the confidence, since they may ask for
+something the template does not do. Only confident matches are used; everything else
+falls back to the model.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import re
+import time
+import logging
+from string import Template
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from kestrabot.settings import settings
+from kestrabot.decompose import validate_flow_bundle
+from kestrabot.openai_bot import KestraBotFlowResponse
+
+
+__all__ = [
+    "FlowTemplate",
+    "TemplateMatch",
+    "FLOW_TEMPLATES",
+    "match_template",
+    "render_template_flow",
+]
+
+
+_URL_PATTERN_ = re.compile(r"https?://[^\s`'\")<>]+")
+_TABLE_PATTERN_ = re.compile(r"(?:table|into)\s+(?:called\s+|named\s+)?`?([A-Za-z_][\w]*\.[A-Za-z_][\w]*)`?", re.IGNORECASE)
+_COLUMNS_PATTERNS_ = [
+    re.compile(r"columns?[^(\n]*\(([^)]+)\)", re.IGNORECASE),
+    re.compile(r"(?:fields|columns)(?:\s+are)?\s*:\s*([^\n]+)", re.IGNORECASE),
+]
+_COLUMN_PATTERN_ = re.compile(r"^[A-Za-z_][\w-]*$")
+_JDBC_URL_PATTERN_ = re.compile(r"(jdbc:postgresql://[^\s`'\"]+)")
+_USER_PATTERN_ = re.compile(r"\buser(?:name)?\s*:\s*(\S+)", re.IGNORECASE)
+_PASSWORD_PATTERN_ = re.compile(r"\bpassword\s*:\s*(\S+)", re.IGNORECASE)
+_LABEL_PATTERN_ = re.compile(r"^\s*(\w+)\s+label\s*:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
+_NAMESPACE_PATTERN_ = re.compile(r"\bnamespace\s*:?\s*`?([a-z0-9][\w-]*(?:\.[\w-]+)+)`?", re.IGNORECASE)
+_QUOTED_PATTERN_ = re.compile(r"`[^`]*`")
+# The templates create their table `IF NOT EXISTS`; any other negation may undo a template step
+_IF_NOT_EXISTS_PATTERN_ = re.compile(r"\bif\s+(?:it\s+|they\s+)?(?:does\s*n[o'’]t|do\s*n[o'’]t|not)\s+exists?\b")
+_NEGATION_PATTERN_ = re.compile(r"\b(?:not|no|never|without|nor|none|dont|doesnt|isnt|arent|wont|cant|shouldnt)\b|n[’']t\b")
+
+# Operations none of the templates implement: their presence rules out a template match
+_UNSUPPORTED_TERMS_ = {
+    "s3", "upload", "parallel", "branch", "branches", "python", "pandas", "script", "jython",
+    "enrich", "transform", "faker", "generate", "kafka", "nats", "email", "slack", "notify",
+    "preview", "select", "join", "aggregate", "filter", "dedup", "deduplicate", "merge",
+    "schedule", "cron", "trigger", "every", "loop", "foreach", "api key", "secret", "delete",
+    "update", "upsert", "mysql", "snowflake", "bigquery", "duckdb", "excel", "parquet",
+}
+
+# Vocabulary the templates account for. Any other prompt word may be a requirement the
+# template does not implement, e.g. "truncate", "delimiter" or "skip", and lowers the confidence
+_COVERED_WORDS_ = {
+    # filler
+    "a", "an", "the", "and", "or", "from", "to", "into", "in", "on", "of", "for", "with", "via", "by",
+    "as", "at", "it", "its", "is", "are", "be", "been", "that", "this", "these", "those", "then",
+    "using", "use", "used", "if", "s", "exist", "exists", "sure", "please",
+    "make", "them", "their", "there", "which", "each", "all", "i", "we", "want", "need", "should",
+    "would", "like", "can", "will", "also", "new", "so", "any", "same", "given", "provided", "following",
+    # source
+    "download", "downloaded", "downloads", "fetch", "fetched", "get", "http", "https", "request",
+    "call", "file", "files", "csv", "json", "api", "endpoint", "response", "url", "uri", "web",
+    # load
+    "data", "dataset", "rows", "records", "load", "loads", "loaded", "loading", "insert", "inserted",
+    "inserting", "ingest", "import", "store", "save", "write", "copy", "fast", "mechanism", "bulk",
+    "postgres", "postgresql", "database", "db", "jdbc", "table", "create", "created", "column",
+    "columns", "header", "headers", "matching", "match", "schema", "public", "convert", "converted",
+    "conversion", "format", "ion", "called", "named", "name", "types", "type",
+    # flow
+    "user", "input", "inputs", "connection", "info", "information", "credentials", "flow", "kestra",
+    "build", "pipeline", "etl", "namespace", "label", "labels",
+}
+
+# Confidence lost per prompt word outside the template vocabulary
+_UNCOVERED_PENALTY_ = 0.25
+
+# Confidence factor of prompts with a negation, keeping them below the fast-path threshold
+_NEGATION_FACTOR_ = 0.5
+
+_SQL_TYPES_ = {
+    "int", "integer", "bigint", "smallint", "real", "double", "float", "numeric", "decimal",
+    "text", "varchar", "boolean", "bool", "date", "timestamp", "timestamptz", "json", "jsonb",
+}
+
+_DEFAULT_DB_URL_ = "jdbc:postgresql://localhost:5432/postgres"
+
+
+class FlowTemplate(BaseModel):
+    """A parameterized Kestra flow template and the intents it answers."""
+    name: str                  = Field(..., description="Template name, shown in the execution history.")
+    description: str           = Field(..., description="Short description of the pattern.")
+    intents: List[List[str]]   = Field(..., description="Keyword groups which must all be present. Each group matches if any keyword is present.")
+    body: str                  = Field(..., description="Flow YAML with `$slot` placeholders.")
+
+
+class TemplateMatch(BaseModel):
+    """A template matched against a prompt, with its extracted slots."""
+    template: FlowTemplate      = Field(..., description="The matched template.")
+    confidence: float           = Field(..., description="Match confidence between 0 and 1.")
+    slots: Dict[str, str]       = Field(default_factory=dict, description="Values extracted for the template placeholders.")
+    uncovered: List[str]        = Field(default_factory=list, description="Prompt words outside the template vocabulary.")
+
+
+_HEADER_ = """id: $flow_id
+namespace: $namespace
+
+labels:
+$labels
+inputs:
+  - id: download_url
+    type: STRING
+    defaults: "$url"
+    displayName: "File to download"
+  - id: db_url
+    type: STRING
+    defaults: "$db_url"
+    displayName: "Database connection URL"
+  - id: db_user
+    type: STRING
+    defaults: "$db_user"
+    displayName: "Database user name"
+  - id: db_pass
+    type: STRING
+    defaults: "$db_pass"
+    displayName: "Database password"
+  - id: table
+    type: STRING
+    defaults: "$table"
+    displayName: "Target table name"
+
+tasks:
+  - id: download
+    type: io.kestra.plugin.core.http.Download
+    uri: "{{ inputs.download_url }}"
+"""
+
+_LOAD_ = """
+  - id: create_table
+    type: io.kestra.plugin.jdbc.postgresql.Query
+    url: "{{ inputs.db_url }}"
+    username: "{{ inputs.db_user }}"
+    password: "{{ inputs.db_pass }}"
+    sql: |
+      CREATE TABLE IF NOT EXISTS {{ inputs.table }} (
+$columns
+      );
+
+  - id: load_to_postgres
+    type: io.kestra.plugin.jdbc.postgresql.CopyIn
+    url: "{{ inputs.db_url }}"
+    username: "{{ inputs.db_user }}"
+    password: "{{ inputs.db_pass }}"
+    format: CSV
+    header: true
+    from: "{{ outputs.$csv_task.uri }}"
+    table: "{{ inputs.table }}"
+"""
+
+FLOW_TEMPLATES: List[FlowTemplate] = [
+    FlowTemplate(
+        name="http-csv-to-postgres",
+        description="HTTP download of a CSV file, CREATE TABLE and Postgres COPY IN.",
+        intents=[["csv"], ["postgres", "copy"], ["download", "http", "get"]],
+        body=_HEADER_ + Template(_LOAD_).safe_substitute(csv_task="download"),
+    ),
+    FlowTemplate(
+        name="api-json-to-postgres",
+        description="HTTP download of a JSON API response, conversion to CSV, CREATE TABLE and Postgres COPY IN.",
+        intents=[["json", "api"], ["postgres", "copy"], ["download", "http", "get", "fetch"]],
+        body=_HEADER_ + """
+  - id: ion
+    type: io.kestra.plugin.serdes.json.JsonToIon
+    from: "{{ outputs.download.uri }}"
+    newLine: false
+
+  - id: csv
+    type: io.kestra.plugin.serdes.csv.IonToCsv
+    from: "{{ outputs.ion.uri }}"
+    header: true
+""" + Template(_LOAD_).safe_substitute(csv_task="csv"),
+    ),
+]
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9_]+", text.lower()))
+
+
+def _has_term(text: str, words: set, term: str) -> bool:
+    return term in text if " " in term else term in words
+
+
+def _parse_columns(prompt: str, metadata: str, table: Optional[str] = None) -> Optional[List[tuple]]:
+    """Extract `(name, type)` column pairs from the prompt, falling back to the metadata."""
+    texts = [prompt, metadata]
+    if table:
+        # Prefer the schema block of the target table, as emitted by `schema_infer`
+        block = re.search(rf"^table {re.escape(table.split('.')[-1])}\b[^\n]*\n(\s+columns:[^\n]+)", metadata, re.MULTILINE)
+        if block:
+            texts.insert(1, block.group(1))
+    for text in texts:
+        for pattern in _COLUMNS_PATTERNS_:
+            match = pattern.search(text)
+            if not match:
+                continue
+            columns = []
+            for item in match.group(1).split(","):
+                parts = item.strip().strip("`.").split()
+                if not parts or not _COLUMN_PATTERN_.match(parts[0]):
+                    columns = []
+                    break
+                sql_type = " ".join(parts[1:]).upper()
+                if sql_type and sql_type.split()[0].split("(")[0].lower() not in _SQL_TYPES_:
+                    columns = []
+                    break
+                columns.append((parts[0], sql_type or "VARCHAR"))
+            if columns:
+                return columns
+    return None
+
+
+def _extract_slots(prompt: str, metadata: str) -> Dict[str, str]:
+    """Extract the template slots from a prompt and its metadata."""
+    slots: Dict[str, str] = {}
+    urls = _URL_PATTERN_.findall(prompt)
+    if len(urls) == 1:
+        slots["url"] = urls[0].rstrip(".,;")
+    tables = set(_TABLE_PATTERN_.findall(prompt))
+    if len(tables) == 1:
+        slots["table"] = tables.pop()
+    columns = _parse_columns(prompt, metadata, slots.get("table"))
+    if columns:
+        names = [f'"{name}"' if "-" in name else name for name, _ in columns]
+        width = max(len(name) for name in names)
+        slots["columns"] = ",\n".join(
+            f"        {name:<{width}}  {sql_type}" for name, (_, sql_type) in zip(names, columns)
+        )
+
+    # Connection info and labels come from the metadata, with the developer prompt defaults
+    match = _JDBC_URL_PATTERN_.search(metadata)
+    slots["db_url"] = match.group(1) if match else _DEFAULT_DB_URL_
+    match = _USER_PATTERN_.search(metadata)
+    slots["db_user"] = match.group(1) if match else "kestra"
+    match = _PASSWORD_PATTERN_.search(metadata)
+    slots["db_pass"] = match.group(1) if match else "k3str4"
+    labels = _LABEL_PATTERN_.findall(metadata) or [("team", "data_engineering")]
+    slots["labels"] = "".join(f"  {name}: {value}\n" for name, value in labels)
+    # The namespace of the developer prompt examples, unless one is asked for
+    match = _NAMESPACE_PATTERN_.search(prompt) or _NAMESPACE_PATTERN_.search(metadata)
+    slots["namespace"] = match.group(1) if match else "company.team"
+    if "table" in slots:
+        slots["flow_id"] = "load-" + slots["table"].split(".")[-1].replace("_", "-")
+    return slots
+
+
+def match_template(prompt: str, metadata: Optional[str] = None) -> Optional[TemplateMatch]:
+    """
+    Match a prompt against the flow templates.
+
+    The confidence is the share of the template intents and required slots found in the
+    prompt, reduced for every prompt word outside the template vocabulary and halved for
+    prompts with a negation, e.g. "don't create the table", which the templates cannot
+    honor. Prompts mentioning operations no template implements never match.
+
+    Args:
+        prompt (str): The user prompt.
+        metadata (Optional[str]): The metadata sent with the prompt.
+    Returns:
+        Optional[TemplateMatch]: The best match, or None if nothing matched.
+    """
+    text = prompt.lower()
+    words = _words(prompt)
+    # URLs and column lists are data, not requested operations
+    scan = _URL_PATTERN_.sub(" ", text)
+    for pattern in _COLUMNS_PATTERNS_:
+        scan = pattern.sub(" ", scan)
+    unsupported = [term for term in _UNSUPPORTED_TERMS_ if _has_term(scan, _words(scan), term)]
+    if unsupported:
+        logging.debug(f"No template match, unsupported operations: {unsupported}")
+        return None
+
+    slots = _extract_slots(prompt, metadata or "")
+    # Quoted values, the table and the namespace are parameters, not requirements
+    scan = _IF_NOT_EXISTS_PATTERN_.sub(" ", _QUOTED_PATTERN_.sub(" ", scan))
+    values = _words(" ".join(slots.get(slot, "") for slot in ("table", "namespace")))
+    uncovered = sorted(_words(scan) - _COVERED_WORDS_ - values)
+    coverage = max(0.0, 1.0 - _UNCOVERED_PENALTY_ * len(uncovered))
+    negations = _NEGATION_PATTERN_.findall(scan)
+    if negations:
+        logging.debug(f"Template match lowered by negations: {negations}")
+        coverage *= _NEGATION_FACTOR_
+
+    required_slots = ("url", "table", "columns")
+    best: Optional[TemplateMatch] = None
+    for template in FLOW_TEMPLATES:
+        intents = sum(any(_has_term(text, words, term) for term in group) for group in template.intents)
+        found = sum(slot in slots for slot in required_slots)
+        confidence = coverage * (intents + found) / (len(template.intents) + len(required_slots))
+        if best is None or confidence > best.confidence:
+            best = TemplateMatch(template=template, confidence=confidence, slots=slots, uncovered=uncovered)
+    if uncovered:
+        logging.debug(f"Template match lowered by uncovered prompt words: {uncovered}")
+    return best
+
+
+def render_template_flow(prompt: str, metadata: Optional[str] = None, min_confidence: Optional[float] = None) -> Optional[KestraBotFlowResponse]:
+    """
+    Produce a validated flow from a template when the prompt matches one confidently.
+
+    Args:
+        prompt (str): The user prompt.
+        metadata (Optional[str]): The metadata sent with the prompt.
+        min_confidence (Optional[float]): Minimum match confidence. Defaults to settings.
+    Returns:
+        Optional[KestraBotFlowResponse]: The rendered flow, or None to fall back to the model.
+    """
+    start_time = time.time()
+    min_confidence = settings.template_min_confidence if min_confidence is None else min_confidence
+    match = match_template(prompt, metadata)
+    if match is None or match.confidence < min_confidence:
+        return None
+
+    try:
+        output = Template(match.template.body).substitute(match.slots)
+        output = validate_flow_bundle(output)
+    except (KeyError, ValueError) as e:
+        logging.warning(f"Template '{match.template.name}' could not be rendered: {str(e)}")
+        return None
+
+    execution_time = time.time() - start_time
+    logging.info(f"Flow rendered from template '{match.template.name}' (confidence {match.confidence:.2f}) in {execution_time * 1000:.1f}ms")
+    return KestraBotFlowResponse(
+        id=f"template-{match.template.name}",
+        type="completed",
+        input=prompt,
+        output=output,
+        metadata=(metadata or ""),
+        input_tokens=0,
+        output_tokens=0,
+        total_tokens=0,
+        model=f"template:{match.template.name}",
+        execution_time=execution_time,
+    )
@@ -0,0 +1,335 @@
+"""
+Kestra Bot UI Benchmark Module
+
+This module measures the responsiveness of the Textual UI under load. It drives the real
+`KestraBotApp` widgets headlessly with Textual's test pilot through scripted scenarios:
+a large flow in the Kestra Flow editor, thousands of execution history entries, bursts of
+console log lines and rapid tab switching. For every scenario it records the latency until
+the first frame after each input, the time until the app is idle again, and the memory
+growth. Results are stored as JSON and compared with the previous run to catch UI
+performance regressions.
+
+Usage:
+    python -m kestrabot.ui_benchmark [--scenarios large_flow tab_switching] [--scale 1.0]
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import gc
+import json
+import time
+import asyncio
+import logging
+import argparse
+import resource
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from textual.widgets import TextArea
+
+from kestrabot.app import KestraBotApp
+from kestrabot.templates import FLOW_TEMPLATES
+
+
+__all__ = [
+    "BenchmarkResult",
+    "BENCHMARK_SCENARIOS",
+    "run_benchmarks",
+    "format_report",
+]
+
+
+_RESULTS_DIR_ = Path(__file__).parent.parent / "data" / "benchmarks"
+_REGRESSION_THRESHOLD_ = 0.2
+# Absolute changes below these are noise, whatever the relative change
+_REGRESSION_MIN_DELTA_ = {"frame_p95": 20.0, "settle_p50": 20.0, "settle_p95": 20.0, "memory_growth_mb": 10.0}
+_TERMINAL_SIZE_ = (160, 50)
+
+
+class BenchmarkResult(BaseModel):
+    """Measurements of a single UI benchmark scenario."""
+    scenario: str               = Field(..., description="Scenario name.")
+    operations: int             = Field(0, description="Number of timed operations.")
+    frame_p50: float            = Field(0.0, description="Median latency from an input to the next frame, in milliseconds.")
+    frame_p95: float            = Field(0.0, description="95th percentile latency from an input to the next frame, in milliseconds.")
+    settle_p50: float           = Field(0.0, description="Median time from an input until the app is idle, in milliseconds.")
+    settle_p95: float           = Field(0.0, description="95th percentile time from an input until the app is idle, in milliseconds.")
+    settle_max: float           = Field(0.0, description="Longest time from an input until the app is idle, in milliseconds.")
+    frames: int                 = Field(0, description="Number of frames rendered during the scenario.")
+    total_time: float           = Field(0.0, description="Wall time of the scenario in seconds.")
+    memory_growth_mb: float     = Field(0.0, description="Resident memory growth over the scenario in MB.")
+    details: dict               = Field(default_factory=dict, description="Scenario specific measurements.")
+
+
+class _BenchmarkApp(KestraBotApp):
+    """KestraBotApp recording the time of every rendered frame, without network access."""
+
+    def __init__(self):
+        super().__init__()
+        self.frame_times: List[float] = []
+
+    def post_display_hook(self) -> None:
+        self.frame_times.append(time.perf_counter())
+
+    def _warm_up_client(self) -> None:
+        # The benchmark measures the UI only
+        pass
+
+    def start_validation(self) -> None:
+        # No server-side validation round trips either
+        pass
+
+
+class _Recorder:
+    """Times pilot operations against the frames rendered by the app."""
+
+    def __init__(self, app: _BenchmarkApp, pilot):
+        self.app = app
+        self.pilot = pilot
+        self.frame_latencies: List[float] = []
+        self.settle_times: List[float] = []
+
+    async def measure(self, operation: Callable[[], Awaitable[None]]) -> float:
+        """Run an operation, wait until the app is idle and record its latencies."""
+        frames = len(self.app.frame_times)
+        start = time.perf_counter()
+        await operation()
+        await self.pilot.pause()
+        settle = time.perf_counter() - start
+        self.settle_times.append(settle * 1000)
+        if len(self.app.frame_times) == frames:
+            # Nothing rendered yet; wait for the next frame
+            await self.app.wait_for_refresh()
+        if len(self.app.frame_times) > frames:
+            self.frame_latencies.append((self.app.frame_times[frames] - start) * 1000)
+        return settle
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _rss_mb() -> float:
+    """Current resident memory in MB, falling back to the peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _large_flow(lines: int) -> str:
+    """Build a flow of about `lines` lines by repeating the template tasks."""
+    template = FLOW_TEMPLATES[0]
+    header, tasks = template.body.split("tasks:\n", 1)
+    blocks, count, index = [header, "tasks:\n"], header.count("\n"), 0
+    while count < lines:
+        block = tasks.replace("id: ", f"id: t{index}_")
+        blocks.append(block)
+        count += block.count("\n")
+        index += 1
+    return "".join(blocks)
+
+
+async def _set_text(textarea: TextArea, text: str) -> None:
+    textarea.text = text
+
+
+async def _scenario_large_flow(app: _BenchmarkApp, recorder: _Recorder, scale: float) -> dict:
+    """Load a large flow into the editor, then scroll and type in it."""
+    lines = int(20000 * scale)
+    flow = _large_flow(lines)
+    await recorder.measure(lambda: app.switch_tab("flow"))
+    textarea = app.query_one("#flow-textarea", TextArea)
+    load_time = await recorder.measure(lambda: _set_text(textarea, flow))
+    textarea.focus()
+    for key in ["pagedown"] * int(50 * scale) + ["ctrl+end", "ctrl+home"]:
+        await recorder.measure(lambda key=key: recorder.pilot.press(key))
+    for char in "# benchmark edit"[: max(1, int(16 * scale))]:
+        await recorder.measure(lambda char=char: recorder.pilot.press(char if char != " " else "space"))
+    return {"lines": flow.count("\n"), "bytes": len(flow), "load_ms": load_time * 1000}
+
+
+async def _scenario_execution_history(app: _BenchmarkApp, recorder: _Recorder, scale: float) -> dict:
+    """Add thousands of execution history entries, then open the logs tab."""
+    entries, batch = int(2000 * scale), 100
+    content = "Completed. Time: 12.34s\nInput tokens: 1200, Output tokens: 800, Total tokens: 2000\nModel: o4-mini"
+
+    async def add_batch(start: int) -> None:
+        for i in range(start, min(start + batch, entries)):
+            await app.add_execution_log(f"bench-{i}", content)
+
+    for start in range(0, entries, batch):
+        await recorder.measure(lambda start=start: add_batch(start))
+    switch_time = await recorder.measure(lambda: app.switch_tab("logs"))
+    return {"entries": entries, "batch_size": batch, "open_logs_ms": switch_time * 1000}
+
+
+async def _scenario_log_burst(app: _BenchmarkApp, recorder: _Recorder, scale: float) -> dict:
+    """Write bursts of console log lines while the logs tab is visible."""
+    lines, burst = int(10000 * scale), 500
+    await recorder.measure(lambda: app.switch_tab("logs"))
+
+    async def write_burst(start: int) -> None:
+        for i in range(start, min(start + burst, lines)):
+            logging.info(f"Benchmark log line {i}: task download finished in 0.123s")
+
+    for start in range(0, lines, burst):
+        await recorder.measure(lambda start=start: write_burst(start))
+    return {"lines": lines, "burst_size": burst}
+
+
+async def _scenario_tab_switching(app: _BenchmarkApp, recorder: _Recorder, scale: float) -> dict:
+    """Switch tabs rapidly with the number keys."""
+    rounds = int(20 * scale)
+    app.query_one("#prompt-textarea", TextArea).blur()
+    for _ in range(rounds):
+        for key in "12345":
+            await recorder.measure(lambda key=key: recorder.pilot.press(key))
+    return {"switches": rounds * 5}
+
+
+BENCHMARK_SCENARIOS: Dict[str, Callable[[_BenchmarkApp, _Recorder, float], Awaitable[dict]]] = {
+    "large_flow": _scenario_large_flow,
+    "execution_history": _scenario_execution_history,
+    "log_burst": _scenario_log_burst,
+    "tab_switching": _scenario_tab_switching,
+}
+
+
+async def _run_scenario(name: str, scale: float) -> BenchmarkResult:
+    """Run a scenario against a fresh headless app."""
+    app = _BenchmarkApp()
+    async with app.run_test(size=_TERMINAL_SIZE_) as pilot:
+        await pilot.pause()
+        gc.collect()
+        memory_before = _rss_mb()
+        frames_before = len(app.frame_times)
+        recorder = _Recorder(app, pilot)
+        start = time.perf_counter()
+        details = await BENCHMARK_SCENARIOS[name](app, recorder, scale)
+        total_time = time.perf_counter() - start
+        gc.collect()
+        memory_growth = _rss_mb() - memory_before
+        frames = len(app.frame_times) - frames_before
+        await app.supervisor.shutdown()
+
+    return BenchmarkResult(
+        scenario=name,
+        operations=len(recorder.settle_times),
+        frame_p50=_percentile(recorder.frame_latencies, 50),
+        frame_p95=_percentile(recorder.frame_latencies, 95),
+        settle_p50=_percentile(recorder.settle_times, 50),
+        settle_p95=_percentile(recorder.settle_times, 95),
+        settle_max=max(recorder.settle_times, default=0.0),
+        frames=frames,
+        total_time=total_time,
+        memory_growth_mb=memory_growth,
+        details=details,
+    )
+
+
+def _find_regressions(current: BenchmarkResult, previous: dict) -> List[str]:
+    """Compare a result with the same scenario's result of a previous run."""
+    regressions = []
+    for metric, min_delta in _REGRESSION_MIN_DELTA_.items():
+        before, after = previous.get(metric, 0.0), getattr(current, metric)
+        if after > before * (1 + _REGRESSION_THRESHOLD_) and after - before > min_delta:
+            regressions.append(f"{metric} {before:.2f} -> {after:.2f}")
+    return regressions
+
+
+def _latest_results(results_dir: Path) -> Optional[dict]:
+    files = sorted(results_dir.glob("ui-*.json"))
+    return json.loads(files[-1].read_text(encoding="utf-8")) if files else None
+
+
+def run_benchmarks(
+    scenarios: Optional[List[str]] = None,
+    scale: float = 1.0,
+    results_dir: Optional[Path] = None,
+) -> dict:
+    """
+    Run the UI benchmark scenarios and store the results.
+
+    Each scenario runs against a fresh headless app. Results are compared with the latest
+    stored run; a metric more than 20% worse, beyond a noise floor, is reported as a
+    regression.
+
+    Args:
+        scenarios (Optional[List[str]]): Scenario names. Defaults to all scenarios.
+        scale (float): Multiplier for the scenario sizes.
+        results_dir (Optional[Path]): Directory for the JSON results. Defaults to `data/benchmarks`.
+    Returns:
+        dict: The results per scenario, the regressions and the path of the stored results.
+    """
+    scenarios = scenarios or list(BENCHMARK_SCENARIOS)
+    unknown = set(scenarios) - set(BENCHMARK_SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown benchmark scenarios: {', '.join(sorted(unknown))}")
+    results_dir = results_dir or _RESULTS_DIR_
+    previous = _latest_results(results_dir) if results_dir.exists() else None
+
+    results: Dict[str, BenchmarkResult] = {}
+    for name in scenarios:
+        logging.info(f"Running UI benchmark scenario {name}...")
+        results[name] = asyncio.run(_run_scenario(name, scale))
+
+    regressions = {}
+    if previous and previous.get("scale") == scale:
+        for name, result in results.items():
+            if name in previous["results"]:
+                found = _find_regressions(result, previous["results"][name])
+                if found:
+                    regressions[name] = found
+
+    results_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    path = results_dir / f"ui-{timestamp}.json"
+    report = {
+        "timestamp": timestamp,
+        "scale": scale,
+        "results": {name: result.model_dump() for name, result in results.items()},
+        "regressions": regressions,
+    }
+    path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    report["path"] = str(path)
+    return report
+
+
+def format_report(report: dict) -> str:
+    """Format benchmark results as a table with the regressions."""
+    lines = [
+        f"{'scenario':<18} {'ops':>5} {'frame p50':>10} {'frame p95':>10} {'settle p50':>11} {'settle p95':>11} {'settle max':>11} {'mem MB':>8}"
+    ]
+    for name, result in report["results"].items():
+        lines.append(
+            f"{name:<18} {result['operations']:>5} {result['frame_p50']:>8.1f}ms {result['frame_p95']:>8.1f}ms "
+            f"{result['settle_p50']:>9.1f}ms {result['settle_p95']:>9.1f}ms {result['settle_max']:>9.1f}ms {result['memory_growth_mb']:>8.1f}"
+        )
+    for name, regressions in report["regressions"].items():
+        lines.append(f"REGRESSION {name}: {', '.join(regressions)}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the responsiveness of the Kestra Bot UI")
+    parser.add_argument("--scenarios", nargs="*", default=None, choices=list(BENCHMARK_SCENARIOS), help="Scenarios to run")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for the scenario sizes")
+    parser.add_argument("--results-dir", type=Path, default=None, help="Directory for the JSON results")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.scenarios, scale=args.scale, results_dir=args.results_dir)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    print(f"Results stored in {report['path']}")
+    raise SystemExit(1 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Kestra Flow Validation Module
+
+This module validates flows with the Kestra server's flow validation endpoint, which
+catches what local YAML checks cannot: unknown properties, invalid expressions, missing
+plugin options and so on. Results are cached by the hash of the canonicalized flow, so
+re-validating an unchanged flow, e.g. after formatting or comment edits, skips the round
+trip. The app runs it debounced in the background as the flow is edited.
+
+Usage:
+    python -m kestrabot.validation flow.yml [--url http://localhost:8080]
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import time
+import yaml
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from kestrabot.settings import settings
+from kestrabot.kestra_client import KestraClient, get_kestra_client
+from kestrabot.deploy import canonicalize_flow
+
+
+__all__ = [
+    "FlowValidationResult",
+    "FlowValidationService",
+    "source_hash",
+    "get_validation_service",
+]
+
+
+class FlowValidationResult(BaseModel):
+    """Result of validating the flows of a YAML source."""
+    hash: str            = Field(..., description="SHA-256 of the canonicalized flows.")
+    valid: bool          = Field(True, description="Whether every flow is valid.")
+    errors: List[str]    = Field(default_factory=list, description="Validation errors, prefixed with the flow id.")
+    warnings: List[str]  = Field(default_factory=list, description="Validation warnings, e.g. deprecated properties.")
+    latency: float       = Field(0.0, description="Validation round trip time in seconds.")
+    cached: bool         = Field(False, description="Whether the result was served from the cache.")
+    local: bool          = Field(False, description="Whether the source was rejected locally, without calling the server.")
+
+    def __str__(self) -> str:
+        source = "cached" if self.cached else ("local" if self.local else f"server {self.latency:.2f}s")
+        if self.valid:
+            text = f"Valid ({source})"
+            return text + (f", {len(self.warnings)} warning(s): " + "; ".join(self.warnings) if self.warnings else "")
+        return f"{len(self.errors)} error(s) ({source}): " + "; ".join(self.errors)
+
+
+def source_hash(source: str) -> str:
+    """
+    Return the SHA-256 hex digest of the canonicalized flows of a YAML source.
+
+    Raises:
+        ValueError: If the source is not valid YAML or a document is not a mapping.
+    """
+    try:
+        documents = [document for document in yaml.safe_load_all(source) if document is not None]
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid Kestra YAML content: {str(e)}")
+    if not documents:
+        raise ValueError("Kestra YAML Content cannot be empty")
+    canonical = "\n".join(canonicalize_flow(document) for document in documents)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FlowValidationService:
+    """
+    Validates flows with the Kestra server, caching results by canonical flow hash.
+
+    The service is thread-safe: the app calls it from worker threads.
+    """
+
+    def __init__(self, client: Optional[KestraClient] = None, cache_size: Optional[int] = None):
+        """
+        Initialize the validation service.
+
+        Args:
+            client (Optional[KestraClient]): Kestra API client. Defaults to the global pooled client.
+            cache_size (Optional[int]): Maximum number of cached results. Defaults to settings.
+        """
+        self._client = client
+        self.cache_size = cache_size or settings.validation_cache_size
+        self._cache: OrderedDict[str, FlowValidationResult] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def client(self) -> KestraClient:
+        """The Kestra API client, the global pooled client unless one was given."""
+        return self._client or get_kestra_client()
+
+    def validate(self, source: str) -> FlowValidationResult:
+        """
+        Validate the flows of a YAML source.
+
+        Sources which do not parse are rejected locally. Server errors, e.g. when Kestra
+        is not reachable, are raised and not cached.
+
+        Args:
+            source (str): The flow YAML source, possibly with several documents.
+        Returns:
+            FlowValidationResult: The validation result.
+        """
+        try:
+            key = source_hash(source)
+        except ValueError as e:
+            return FlowValidationResult(hash="", valid=False, errors=[str(e)], local=True)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached.model_copy(update={"cached": True})
+            self.misses += 1
+
+        start_time = time.time()
+        reports = self.client.validate_flows(source)
+        result = FlowValidationResult(hash=key, latency=time.time() - start_time)
+        for report in reports:
+            name = ".".join(str(part) for part in (report.get("namespace"), report.get("flow")) if part) or f"flow {report.get('index', 0)}"
+            if report.get("constraints"):
+                result.errors.extend(f"{name}: {line}" for line in str(report["constraints"]).splitlines() if line.strip())
+            result.warnings.extend(f"{name}: {warning}" for warning in report.get("warnings") or [])
+            if report.get("outdated"):
+                result.warnings.append(f"{name}: a newer revision exists on the server")
+        result.valid = not result.errors
+        logging.debug(f"Validated flows {key[:12]} in {result.latency:.2f}s: {result}")
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+
+validation_service: Optional[FlowValidationService] = None
+_service_lock = threading.Lock()
+
+
+def get_validation_service() -> FlowValidationService:
+    """
+    Get the global flow validation service instance.
+
+    Returns:
+        FlowValidationService: The initialized flow validation service, sharing its cache across the application.
+    """
+    global validation_service
+    with _service_lock:
+        if validation_service is None:
+            validation_service = FlowValidationService()
+    return validation_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate Kestra flows with the Kestra server")
+    parser.add_argument("paths", nargs="+", type=Path, help="Flow files")
+    parser.add_argument("--url", default=None, help="Kestra server URL")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.get_logging_level(), format="%(levelname)s: %(message)s")
+    service = FlowValidationService(client=KestraClient(url=args.url) if args.url else None)
+    failed = False
+    for path in args.paths:
+        result = service.validate(path.read_text(encoding="utf-8"))
+        failed = failed or not result.valid
+        print(f"{path}: {result}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
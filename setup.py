@@ -1,5 +1,7 @@
+import os
 import sys
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import shutil
 
 
@@ -20,25 +22,24 @@ def create_dirs():
     print(f"Created dirs")
 
 
+def _remove(entry):
+    if entry.is_dir(follow_symlinks=False):
+        shutil.rmtree(entry.path)
+    else:
+        os.unlink(entry.path)
+
+
 def cleanup_dirs():
-    tmp_dir = DATA_DIR / "tmp"
-    kestra_wd_dir = DATA_DIR / "kestra-wd"
-    # Cleanup temporary directory
-    if tmp_dir.exists():
-        for item in tmp_dir.iterdir():
-            if item.is_dir():
-                shutil.rmtree(item)
-            else:
-                item.unlink()
-        print(f"Cleaned up tmp dir: {tmp_dir}")
-    # Cleanup kestra working directory
-    if kestra_wd_dir.exists():
-        for item in kestra_wd_dir.iterdir():
-            if item.is_dir():
-                shutil.rmtree(item)
-            else:
-                item.unlink()
-        print(f"Cleaned up kestra-wd dir: {kestra_wd_dir}")
+    # Retention based cleanup is done by `python -m kestrabot.janitor`; setup wipes everything
+    for name in ("tmp", "kestra-wd"):
+        path = DATA_DIR / name
+        if not path.exists():
+            continue
+        with os.scandir(path) as it:
+            entries = list(it)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(_remove, entries))
+        print(f"Cleaned up {name} dir: {path}")
 
 
 def setup():
@@ -0,0 +1,9 @@
+"""
+Test configuration: settings require an OpenAI API key, which the tests never use.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import os
+
+os.environ.setdefault("KESTRABOT_OPENAI_API_KEY", "test")
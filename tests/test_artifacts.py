@@ -0,0 +1,52 @@
+"""
+Tests of the resumable artifact downloads.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import httpx
+import pytest
+
+from kestrabot.artifacts import KestraArtifact, download_artifact
+from kestrabot.kestra_client import KestraClient
+
+_CONTENT_ = b"id,name\n" + b"".join(f"{i},row {i}\n".encode() for i in range(200))
+_ARTIFACT_ = KestraArtifact(task_id="extract", taskrun_id="tr1", uri="kestra:///ns/flow/executions/e1/tasks/extract/tr1/out.csv")
+
+
+def _client(with_size=True):
+    """Create a client served by a mock Kestra storage API honouring `Range` headers."""
+    def handler(request):
+        if request.url.path.endswith("/metas"):
+            return httpx.Response(200, json={"size": len(_CONTENT_)} if with_size else {})
+        start = int(request.headers.get("Range", "bytes=0-")[len("bytes="):-1])
+        if start >= len(_CONTENT_):
+            return httpx.Response(416)
+        return httpx.Response(206 if start else 200, content=_CONTENT_[start:])
+
+    client = KestraClient(url="http://kestra")
+    client.http = httpx.Client(base_url="http://kestra", transport=httpx.MockTransport(handler))
+    return client
+
+
+def _part_file(tmp_path, content):
+    """Write a `.part` file left over by an earlier download."""
+    part = tmp_path / _ARTIFACT_.relative_path.with_name("out.csv.part")
+    part.parent.mkdir(parents=True)
+    part.write_bytes(content)
+
+
+def test_resumes_partial_download(tmp_path):
+    _part_file(tmp_path, _CONTENT_[:100])
+    result = download_artifact("e1", _ARTIFACT_, tmp_path, client=_client())
+    assert result.resumed_from == 100
+    assert (tmp_path / _ARTIFACT_.relative_path).read_bytes() == _CONTENT_
+
+
+@pytest.mark.parametrize("with_size", [True, False])
+def test_restarts_when_stale_part_is_larger(tmp_path, with_size):
+    _part_file(tmp_path, b"x" * (len(_CONTENT_) + 50))
+    result = download_artifact("e1", _ARTIFACT_, tmp_path, client=_client(with_size), retries=0)
+    assert result.resumed_from == 0
+    assert (tmp_path / _ARTIFACT_.relative_path).read_bytes() == _CONTENT_
+    assert not (tmp_path / _ARTIFACT_.relative_path.with_name("out.csv.part")).exists()
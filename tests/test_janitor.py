@@ -0,0 +1,37 @@
+"""
+Tests of the workspace janitor retention policies.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import os
+import time
+
+from kestrabot.janitor import RetentionPolicy, run_janitor
+
+
+def _task_dir(root, name, age_days, size=1024):
+    """Create a task working directory with one file, last modified `age_days` ago."""
+    path = root / name
+    path.mkdir(parents=True)
+    (path / "data.csv").write_bytes(b"x" * size)
+    mtime = time.time() - age_days * 86400
+    for item in (path / "data.csv", path):
+        os.utime(item, (mtime, mtime))
+    return path
+
+
+def test_age_policy_removes_old_task_directories(tmp_path):
+    old = [_task_dir(tmp_path, f"old{i}", age_days=10) for i in range(3)]
+    recent = _task_dir(tmp_path, "recent", age_days=1)
+    report, = run_janitor([tmp_path], policy=RetentionPolicy(max_age_days=7))
+    assert report.entries == 4 and report.deleted == 3
+    assert not any(path.exists() for path in old) and recent.exists()
+
+
+def test_size_and_count_policies_keep_running_tasks(tmp_path):
+    old = [_task_dir(tmp_path, f"old{i}", age_days=1 + i) for i in range(3)]
+    running = _task_dir(tmp_path, "running", age_days=0)
+    report, = run_janitor([tmp_path], policy=RetentionPolicy(max_size_mb=0, max_entries=1))
+    assert report.deleted == 3
+    assert running.exists() and not any(path.exists() for path in old)
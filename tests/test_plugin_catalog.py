@@ -0,0 +1,63 @@
+"""
+Tests of the offline plugin catalog.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import json
+
+import pytest
+
+from kestrabot import plugin_catalog
+from kestrabot.plugin_catalog import PluginCatalog, build_plugin_index, validate_flow_plugins
+
+
+_LOG_TYPE_ = "io.kestra.plugin.core.log.Log"
+_LOG_ALIAS_ = "io.kestra.core.tasks.log.Log"
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    snapshot = tmp_path / "plugins.json"
+    snapshot.write_text(json.dumps({
+        "types": {_LOG_TYPE_: {"properties": ["level", "message"], "required": ["message"]}},
+        "aliases": {_LOG_ALIAS_: _LOG_TYPE_},
+    }), encoding="utf-8")
+    catalog = PluginCatalog(build_plugin_index(snapshot, tmp_path / "plugins.idx"))
+    yield catalog
+    catalog.close()
+
+
+def test_aliases_are_indexed(catalog):
+    assert list(catalog) == [_LOG_ALIAS_, _LOG_TYPE_]
+    assert catalog.get_properties(_LOG_ALIAS_) == {"level": False, "message": True}
+
+
+def test_unknown_types_do_not_fail_the_flow(catalog, monkeypatch, caplog):
+    monkeypatch.setattr(plugin_catalog, "get_plugin_catalog", lambda: catalog)
+    flow = {"id": "f", "namespace": "company.team", "tasks": [
+        {"id": "log", "type": _LOG_ALIAS_, "message": "hi"},
+        {"id": "new", "type": "io.kestra.plugin.core.log.Brand"},
+    ]}
+    validate_flow_plugins(flow)
+    assert "unknown plugin type 'io.kestra.plugin.core.log.Brand'" in caplog.text
+    assert _LOG_ALIAS_ not in caplog.text
+
+
+def test_failed_load_is_retried_only_when_the_index_changes(tmp_path, monkeypatch, caplog):
+    index = tmp_path / "plugins.idx"
+    index.write_bytes(b"not an index")
+    monkeypatch.setattr(plugin_catalog.settings, "plugin_catalog_path", index)
+    monkeypatch.setattr(plugin_catalog, "plugin_catalog", None)
+    monkeypatch.setattr(plugin_catalog, "_failed_load_", None)
+
+    assert plugin_catalog.get_plugin_catalog() is None
+    assert plugin_catalog.get_plugin_catalog() is None
+    assert caplog.text.count("Could not load plugin catalog") == 1
+
+    snapshot = tmp_path / "plugins.json"
+    snapshot.write_text(json.dumps({"types": {_LOG_TYPE_: {"properties": ["message"]}}}), encoding="utf-8")
+    build_plugin_index(snapshot, index)
+    catalog = plugin_catalog.get_plugin_catalog()
+    assert catalog is not None and _LOG_TYPE_ in catalog
+    catalog.close()
@@ -0,0 +1,29 @@
+"""
+Tests of the schema inference of local data files.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import csv
+
+from kestrabot import schema_infer
+from kestrabot.schema_infer import infer_schemas
+
+
+def test_large_fields_are_sampled(tmp_path):
+    (tmp_path / "docs.csv").write_text(f"id,body\n1,{'x' * 200_000}\n", encoding="utf-8")
+    schemas = infer_schemas([tmp_path])
+    assert [(column.name, column.type) for column in schemas[0].columns] == [("id", "INTEGER"), ("body", "TEXT")]
+
+
+def test_unreadable_files_are_skipped(tmp_path, monkeypatch):
+    (tmp_path / "bad.csv").write_text("id\n1\n", encoding="utf-8")
+    (tmp_path / "good.jsonl").write_text('{"id": 1}\n', encoding="utf-8")
+
+    def broken_rows(path):
+        raise csv.Error("field larger than field limit")
+        yield
+
+    monkeypatch.setattr(schema_infer, "_csv_rows", broken_rows)
+    schemas = infer_schemas([tmp_path])
+    assert [schema.name for schema in schemas] == ["good"]
@@ -0,0 +1,82 @@
+"""
+Tests of the web search policy decisions in `auto` mode.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import pytest
+
+from kestrabot import search_policy
+from kestrabot.search_policy import WebSearchPolicy
+from kestrabot.evaluation import load_suite
+
+
+# The prompt of `kestrabot.openai_bot.test()`
+_FAN_OUT_PROMPT_ = (
+    "* **Fetch users from API:**\n"
+    "  “GET `https://gorest.co.in/public/v2/users`.”\n"
+    "\n"
+    "* **Convert JSON → Ion:**\n"
+    "  “Transform that JSON into Ion format (no new-line splitting).”\n"
+    "\n"
+    "* **Convert Ion → JSON:**\n"
+    "  “Serialize the Ion back into line-delimited JSON.”\n"
+    "\n"
+    "* **Enrich each record:**\n"
+    "  “Run a Jython script on each row to log it and add `inserted_at = current UTC timestamp`.”\n"
+    "\n"
+    "* **Fan out two branches in parallel:**\n"
+    "\n"
+    "  **• Postgres branch:**\n"
+    "\n"
+    "  1. “Convert enriched Ion to CSV with header.”\n"
+    "  2. “CREATE TABLE IF NOT EXISTS `public.raw_users` (id, name, email, gender, status, inserted\\_at).”\n"
+    "  3. “COPY IN the CSV into Postgres `public.raw_users` via JDBC.”\n"
+    "\n"
+    "  **• S3 branch:**\n"
+    "\n"
+    "  1. “Convert enriched Ion to JSON lines.”\n"
+    "  2. “Upload `users.json` to S3 bucket `kestraio` using AWS creds from secrets.”\n"
+)
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    # Decide without a plugin catalog, the default until one is built
+    monkeypatch.setattr(search_policy, "get_plugin_catalog", lambda: None)
+    return WebSearchPolicy(mode="auto")
+
+
+@pytest.mark.parametrize("prompt", [
+    "Load vectors from Pinecone into Qdrant",
+    "Sync Notion pages to Google Sheets",
+    "Write the orders to a Microsoft Fabric lakehouse and index them in Weaviate",
+])
+def test_unknown_technologies_use_search(policy, prompt):
+    decision = policy.decide(prompt)
+    assert decision.use_search, decision
+    assert decision.unknown_terms
+
+
+def test_unknown_plugin_type_without_catalog_uses_search(policy):
+    decision = policy.decide("Use io.kestra.plugin.foo.Bar to load the file")
+    assert decision.use_search
+    assert decision.unknown_terms == ["io.kestra.plugin.foo.Bar"]
+
+
+@pytest.mark.parametrize("prompt", [
+    "Download a CSV via HTTP GET and load it into Postgres with COPY IN",
+    "Download the orders CSV from the Hugging Face dataset URL via HTTP GET into a Postgres table",
+    "Download the CSV and load it into the Sales table",
+    "Use io.kestra.plugin.jdbc.postgresql.CopyIn to load the file",
+    _FAN_OUT_PROMPT_,
+])
+def test_known_patterns_skip_search(policy, prompt):
+    decision = policy.decide(prompt)
+    assert not decision.use_search, decision
+
+
+@pytest.mark.parametrize("case", [case for case in load_suite() if case.id in ("gorest-users-csv", "gorest-fan-out")], ids=lambda case: case.id)
+def test_eval_cases_skip_search(policy, case):
+    decision = policy.decide(case.prompt, case.metadata)
+    assert not decision.use_search, decision
@@ -0,0 +1,64 @@
+"""
+Tests of the build supervisor slots.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import time
+import asyncio
+import threading
+
+from kestrabot.sessions import BuildSession, BuildSupervisor
+
+
+class _Calls:
+    """Blocking stand-in for a model call, counting the calls running at the same time."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, duration: float) -> float:
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(duration)
+        with self._lock:
+            self.active -= 1
+        return duration
+
+
+def test_cancelled_build_holds_its_slot_until_the_thread_returns():
+    async def scenario():
+        calls, supervisor = _Calls(), BuildSupervisor(max_concurrent=1)
+        first, second = BuildSession("first"), BuildSession("second")
+        supervisor.submit(first, supervisor.to_thread(first, calls, 0.3))
+        await asyncio.sleep(0.05)
+        task = supervisor.submit(second, supervisor.to_thread(second, calls, 0.05))
+        supervisor.cancel(first)
+        await asyncio.sleep(0.05)
+        assert second.status == "queued"
+        assert await task == 0.05
+        return calls.peak
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_speculative_runs_are_bounded_by_the_build_slots():
+    async def scenario():
+        calls, supervisor = _Calls(), BuildSupervisor(max_concurrent=1)
+        session = BuildSession("session")
+        first = supervisor.speculate(session, calls, 0.2)
+        await asyncio.sleep(0.05)
+        # All slots are taken, even after the first run is cancelled
+        assert supervisor.speculate(session, calls, 0.2) is None
+        first.cancel()
+        await asyncio.sleep(0.05)
+        assert supervisor.speculate(session, calls, 0.2) is None
+        await asyncio.sleep(0.2)
+        second = supervisor.speculate(session, calls, 0.01)
+        assert await second == 0.01
+        return calls.peak
+
+    assert asyncio.run(scenario()) == 1
@@ -0,0 +1,37 @@
+"""
+Tests of the flow template matcher.
+
+Author: Parham (parham.parvizi@gmail.com)
+"""
+
+import pytest
+
+from kestrabot.settings import settings
+from kestrabot.templates import match_template
+
+
+_ORDERS_PROMPT_ = (
+    "Download the orders CSV from https://huggingface.co/datasets/kestra/datasets/raw/main/csv/orders.csv via HTTP GET "
+    "and load it into the Postgres table public.orders with columns (order_id int, customer_name text, price numeric) "
+    "using COPY IN. Create the table if it doesn't exist."
+)
+
+
+def test_covered_prompt_matches():
+    match = match_template(_ORDERS_PROMPT_)
+    assert match.template.name == "http-csv-to-postgres"
+    assert match.confidence == 1.0
+
+
+@pytest.mark.parametrize("extra", [
+    " Rename the column b to c after loading, and truncate the table first.",
+    " The delimiter is ';'.",
+    " Skip the first 3 lines.",
+    " Call it using basic auth header.",
+    " Don't create the table.",
+    " The file is not a CSV with header.",
+    " Do not use a header.",
+])
+def test_uncovered_requirements_fall_back_to_the_model(extra):
+    match = match_template(_ORDERS_PROMPT_ + extra)
+    assert match is None or match.confidence < settings.template_min_confidence, match